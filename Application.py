@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Application:
     """
 
@@ -14,6 +17,11 @@ class Application:
         Возвращает список из всех атрибутов класса
 
     """
+    __slots__ = ('number', 'app_time', 'place_in_queue', 'stay_in_queue', 'start_service', 'service_time',
+                 'end_time')
+    dtype = np.dtype([('number', np.int64), ('app_time', float), ('place_in_queue', np.int64),
+                      ('stay_in_queue', float), ('start_service', float), ('service_time', float),
+                      ('end_time', float)])
 
     def __init__(self, number=0, application_time=0, place_in_queue=0, staying_in_queue=-1, start_service=-1,
                  service_time=-1, end_time=-1):
@@ -35,11 +43,10 @@ class Application:
         self.start_service = start_service
         self.service_time = service_time
         self.end_time = end_time
-        self._data_len = 7
 
     def __len__(self):
         """Возвращает количество атрибутов в классе."""
-        return self._data_len
+        return len(self.__slots__)
 
     def get_data_for_report(self):
         """Возвращает список из всех атрибутов класса."""
@@ -0,0 +1,128 @@
+"""
+Столбцовое хранилище таблиц событий и заявок
+
+Строки хранятся в структурированном массиве NumPy, который заранее выделяется и растет удвоением.
+Для совместимости строка доступна как RecordView с атрибутами Event / Application.
+
+"""
+import numpy as np
+
+CAPACITY = 1024
+
+
+class RecordView:
+    """
+
+    Строка ColumnarTable с атрибутами записи (Event, Application)
+
+    Чтение и запись атрибутов идут прямо в массив таблицы
+
+    """
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index: int):
+        object.__setattr__(self, '_table', table)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, name):
+        try:
+            return self._table.data[name][self._index].item()
+        except (KeyError, ValueError):
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        if name not in self._table.names:
+            raise AttributeError(name)
+        self._table.data[name][self._index] = value
+
+    def __len__(self):
+        """Возвращает количество атрибутов в записи."""
+        return len(self._table.names)
+
+    def __repr__(self):
+        return ', '.join(str(value) for value in self.get_data_for_report())
+
+    def get_data_for_report(self):
+        """Возвращает список из всех атрибутов записи."""
+        return list(self._table.data[self._index].item())
+
+
+class ColumnarTable:
+    """
+
+    Таблица записей record_class (Event, Application) в структурированном массиве
+
+    Атрибуты
+    --------
+    record_class : type
+            Класс записи, его атрибут dtype задает столбцы
+    names : tuple[str]
+            Имена столбцов
+    data : np.ndarray
+            Заполненная часть массива (представление, без копирования)
+
+    table[i] - строка RecordView, table['name'] - столбец без копирования.
+    Столбцы, полученные до роста таблицы, продолжают ссылаться на старый массив.
+
+    """
+
+    def __init__(self, record_class, capacity: int = CAPACITY):
+        self.record_class = record_class
+        self.names = record_class.dtype.names
+        self._array = np.zeros(max(capacity, 1), dtype=record_class.dtype)
+        self._size = 0
+
+    @classmethod
+    def from_columns(cls, record_class, columns: dict[str, np.ndarray]):
+        """Создает таблицу из готовых столбцов"""
+        size = len(next(iter(columns.values())))
+        table = cls(record_class, size)
+        for name in table.names:
+            table._array[name][:size] = columns[name]
+        table._size = size
+        return table
+
+    @classmethod
+    def from_array(cls, record_class, array: np.ndarray):
+        """Создает таблицу из структурированного массива с dtype record_class"""
+        return cls.from_columns(record_class, {name: array[name] for name in record_class.dtype.names})
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f'ColumnarTable({self.record_class.__name__}, {self._size} строк)'
+
+    def __getstate__(self):
+        """Сохраняется только заполненная часть массива, при добавлении строк он вырастет снова"""
+        state = self.__dict__.copy()
+        state['_array'] = self._array[:max(self._size, 1)]
+        return state
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError('индекс вне таблицы')
+        return RecordView(self, key)
+
+    def __iter__(self):
+        return (RecordView(self, i) for i in range(self._size))
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._array[:self._size]
+
+    def append(self, *values):
+        """Добавляет строку, значения идут в порядке столбцов"""
+        if self._size == len(self._array):
+            self._grow(2 * len(self._array))
+        self._array[self._size] = values
+        self._size += 1
+
+    def _grow(self, capacity: int):
+        array = np.zeros(capacity, dtype=self._array.dtype)
+        array[:self._size] = self._array[:self._size]
+        self._array = array
@@ -11,12 +11,18 @@
 import numpy as np
 import json
 import os
-from collections import deque, Counter
+import pickle
+import tempfile
+from collections import deque
 
 from Event import Event
 from Application import Application
+from ColumnarTable import ColumnarTable
+from StreamingStatistics import StreamingStatistics
 from Device import Device
 from DeviceData import DeviceData
+from event_log import EventLog
+from sampler import BlockSampler, get_samplers
 
 
 class Controller_SMO:
@@ -55,15 +61,15 @@ class Controller_SMO:
 
         devices_list : list[Device]  (default [])
                 Список подчиненных приборов
-        event_table : list[Event] (default [])
+        event_table : ColumnarTable (default пустая таблица Event)
                 Таблица событий
-        application_table : list[Application] (default [])
+        application_table : ColumnarTable (default пустая таблица Application)
                 Таблица заявок
         _app_list_need_to_complete : list[int] (default [])
                 Номера заявок, которые надо завершить
 
         q :   deque (default deque())
-                Очередь заявок
+                Очередь заявок (номер заявки, момент поступления, время обслуживания)
 
         selection : dict (default {})
                 Выборка данный, для работы приборов. Нужна чтоб повторить прошлый результат выполнения программы
@@ -73,8 +79,21 @@ class Controller_SMO:
                     True : Файл нужно записать
                     False : Файл с выборкой записан, записывать не надо
 
-        f_name_with_selection : str (default' selection.txt')
+        f_name_with_selection : str | None (default' selection.txt')
                 Имя файла в котором, либо содержится выборка, либо ее надо в него записать\
+                None : выборка не читается и не записывается
+        arrival_sampler : BlockSampler
+                Генератор времени между заявками
+        service_sampler : BlockSampler
+                Генератор времени обслуживания
+        statistics : StreamingStatistics | None (default None)
+                Накопители статистики в потоковом режиме. В этом режиме таблицы событий и заявок не хранятся
+                (event_table и application_table равны None), а выборка запоминается, только если ее надо
+                записать в файл. С event_log события и заявки сначала записываются на диск,
+                затем попадают в statistics
+        metrics : instrumentation.Metrics | None (default None)
+                Профилирование по этапам и счетчики. Методы оборачиваются только у этого объекта
+                и только если metrics задан
        Методы
        ------
         ***
@@ -88,16 +107,49 @@ class Controller_SMO:
     selection = {}
     f_selection_to_file = True
 
-    def __init__(self, num: int, type_: int, f_name: str):
+    def __init__(self, num: int, type_: int, f_name: str | None,
+                 samplers: tuple[BlockSampler, BlockSampler] | None = None,
+                 streaming: bool = False, keep_last: int = 0, event_log: EventLog | None = None, metrics=None):
+        """
+
+        :param streaming: потоковый режим, статистика накапливается без хранения таблиц (default False).
+            Файл выборки f_name хранит все времена в памяти, поэтому в потоковом режиме нужен f_name=None,
+            а выборка записывается и повторяется двоичной трассой (selection_trace.record_trace, open_trace)
+        :param keep_last: сколько последних событий хранить в потоковом режиме для отладки (default 0)
+        :param event_log: запись таблиц событий и заявок на диск, включает потоковый режим (default None)
+        :param metrics: instrumentation.Metrics для профилирования (default None - без профилирования)
+
+        """
+        streaming = streaming or event_log is not None
+        if streaming and f_name is not None:
+            raise Exception('В потоковом режиме файл выборки не поддерживается, нужен f_name=None '
+                            '(выборку записывает selection_trace.record_trace)')
 
         self.num_devices = num
-        self.devices_list: list[Device] = [Device(number=i) for i in range(num)]
+        self.devices_list: list[Device] = [Device(number=i, keep_history=not streaming) for i in range(num)]
         self.type_system = type_
+        self.arrival_sampler, self.service_sampler = get_samplers(type_) if samplers is None else samplers
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.instrument_controller(self)
         self.selection = {}
         self._get_selection(f_name)
         self.f_name_with_selection = f_name
-        self.event_table: list[Event] = []
-        self.application_table: list[Application] = []
+        if streaming:
+            self.statistics = StreamingStatistics(keep_last)
+            self.event_table = None
+            self.application_table = None
+            stage = self.statistics if event_log is None else event_log.attach(self.statistics)
+            self._add_event = stage.add_event
+            self._add_application = stage.add_application
+            self._start_application = stage.start_application
+        else:
+            self.statistics = None
+            self.event_table = ColumnarTable(Event)
+            self.application_table = ColumnarTable(Application)
+            self._add_event = self.event_table.append
+            self._add_application = self.application_table.append
+            self._start_application = self._start_application_in_table
         self.q = deque()
 
         self.min_app_service_time = 0.
@@ -112,6 +164,57 @@ class Controller_SMO:
     def __repr__(self):
         return f'{self.devices_list}'
 
+    def __getstate__(self):
+        """Состояние без методов записи событий: вместо них сохраняется ступень, в которую они пишут"""
+        state = self.__dict__.copy()
+        for name in _STAGE_METHODS:
+            del state[name]
+        state['_stage'] = self._add_event.__self__ if self.statistics is not None else None
+        return state
+
+    def __setstate__(self, state: dict):
+        state = state.copy()
+        stage = state.pop('_stage')
+        self.__dict__.update(state)
+        if stage is not None:
+            self._add_event = stage.add_event
+            self._add_application = stage.add_application
+            self._start_application = stage.start_application
+        else:
+            self._add_event = self.event_table.append
+            self._add_application = self.application_table.append
+            self._start_application = self._start_application_in_table
+
+    def save_checkpoint(self, path: str):
+        """
+        Сохраняет полное состояние моделирования (приборы, очередь, часы, статистику,
+        состояние генераторов случайных чисел) в файл path
+
+        Файл заменяется атомарно: при сбое во время записи остается прежний чекпойнт
+        """
+        if self.metrics is not None:
+            raise Exception('Чекпойнт контроллера с профилированием (metrics) не поддерживается')
+        descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load_checkpoint(self, path: str):
+        """Восстанавливает состояние, сохраненное save_checkpoint, в этот контроллер"""
+        with open(path, 'rb') as file:
+            saved = pickle.load(file)
+        if type(saved) is not type(self) or saved.num_devices != self.num_devices \
+                or saved.type_system != self.type_system:
+            raise Exception(f'Чекпойнт {path} сохранен другим контроллером: {type(saved).__name__}, '
+                            f'приборов: {saved.num_devices}, тип системы: {saved.type_system}')
+        metrics = self.metrics
+        self.__setstate__(saved.__getstate__())
+        self.metrics = metrics
+
     def service_first_app(self):
         """Пришла заявка, обрабатываем ее"""
 
@@ -119,19 +222,17 @@ class Controller_SMO:
         self.min_app_service_time = self.selection['1'][1]
         self.time_arrival_next_app = self.selection['1'][2]
 
-        event = Event(self.current_event_number, self.event_start_time, 1, 1, self.min_app_service_time, self.time_arrival_next_app, 1)
-
         device = self._search_free_device()
-        device.give_task(self.current_app_number, self.min_app_service_time)
+        self._give_task(device, self.current_app_number, self.min_app_service_time)
 
-        end_time = event.event_time + event.time_until_end_service
+        end_time = self.event_start_time + self.min_app_service_time
         self.number_app_now = 1
-        app = Application(self.number_app_now, event.event_time, 0, 0, event.event_time, event.time_until_end_service, end_time)
-        self._app_list_need_to_complete.append(self.current_app_number)
-        self.event_table.append(event)
-        self.application_table.append(app)
+        self._add_event(self.current_event_number, self.event_start_time, 1, 1, self.min_app_service_time,
+                        self.time_arrival_next_app, 1)
+        self._add_application(self.number_app_now, self.event_start_time, 0, 0, self.event_start_time,
+                              self.min_app_service_time, end_time)
 
-    def _get_selection(self, f_name: str):
+    def _get_selection(self, f_name: str | None):
         """
         Получаем начальные данные из файла или генерируем их
 
@@ -139,25 +240,49 @@ class Controller_SMO:
 
         """
 
-        if os.path.exists(f_name):
+        if f_name is not None and os.path.exists(f_name):
             self.f_selection_to_file = False
             self.selection = _load_selection(f_name)
         else:
             self.f_selection_to_file = True
-            self.selection = {'1': [_get_time_between_applications(self.type_system),
-                                    _get_service_time_by_requests(self.type_system),
-                                    _get_time_between_applications(self.type_system)]}
+            self.selection = {'1': [self.arrival_sampler.next(),
+                                    self.service_sampler.next(),
+                                    self.arrival_sampler.next()]}
+
+    def start_system(self, num_event: int, checkpoint: str | None = None, checkpoint_interval: int | None = None):
+        """
+        Запустить моделирование событий
 
-    def start_system(self, num_event: int):
-        """Запустить моделирование событий"""
+        :param checkpoint: файл чекпойнта. Если он есть, моделирование продолжается с сохраненного события
+                           (траектория совпадает с непрерывным запуском), в конце состояние сохраняется в него
+        :param checkpoint_interval: сохранять чекпойнт каждые checkpoint_interval событий (default - только в конце)
+        """
 
-        self.service_first_app()  # обработка 1-й заявки
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.load_checkpoint(checkpoint)
+        else:
+            self.service_first_app()  # обработка 1-й заявки
+        if checkpoint is None:
+            self.continue_system(num_event)
+        else:
+            step = checkpoint_interval or num_event
+            while True:
+                self.continue_system(min(num_event, self.current_event_number + step))
+                self.save_checkpoint(checkpoint)
+                if self.current_event_number >= num_event:
+                    break
+
+        if self.f_name_with_selection is not None:
+            if checkpoint is not None and self.f_selection_to_file and os.path.exists(self.f_name_with_selection):
+                os.remove(self.f_name_with_selection)  # выборка продолжена с чекпойнта и длиннее записанной ранее
+            _selection_to_file(self.selection, self.f_name_with_selection)
+        return [self.event_table, self.application_table]
+
+    def continue_system(self, num_event: int):
+        """Продолжает начатое start_system моделирование до события с номером num_event"""
         while self.current_event_number < num_event:
             self._define_event_type()
 
-        _selection_to_file(self.selection, self.f_name_with_selection)
-        return [self.event_table, self.application_table]
-
     def _define_event_type(self):
         """
         Определяет тип события
@@ -245,6 +370,17 @@ class Controller_SMO:
             self.min_app_service_time = -1
             self.device_id_completing_app = -1
 
+    def _give_task(self, device: Device, num_app: int, service_time: float):
+        """Поручает прибору заявку и запоминает, что ее надо завершить"""
+        device.give_task(num_app, service_time)
+        self._app_list_need_to_complete.append(num_app)
+
+    def _end_task(self, device: Device) -> int:
+        """Освобождает прибор и возвращает номер завершенной заявки"""
+        app_num = device.end_task()
+        self._app_list_need_to_complete.remove(app_num)
+        return app_num
+
     def _processing_application(self, device):
         """ Обрабатывает полученную заявку или достает ее из очереди"""
         pass
@@ -261,35 +397,15 @@ class Controller_SMO:
         else:
             self._update_min_app_service_time(0)
 
-        if self.f_selection_to_file:
-            time_until_end_service = _get_service_time_by_requests(self.type_system)
-            self.time_arrival_next_app = _get_time_between_applications(self.type_system)
-            self.selection[str(self.current_event_number)] = [time_until_end_service, self.time_arrival_next_app]
-        else:
-            time_until_end_service = self.selection[str(self.current_event_number)][0]
-            self.time_arrival_next_app = self.selection[str(self.current_event_number)][1]
-        self._app_list_need_to_complete.append(self.current_app_number)
+        time_until_end_service, self.time_arrival_next_app = self._get_times_for_current_app()
 
-        device.give_task(self.current_app_number, time_until_end_service)
+        self._give_task(device, self.current_app_number, time_until_end_service)
         self._update_min_app_service_time(0)
-        event = Event(number=self.current_event_number,
-                      event_time=self.event_start_time,
-                      event_type=1,
-                      status_system=self.number_app_now,
-                      time_until_end_service=self.min_app_service_time,
-                      wait_time=self.time_arrival_next_app,
-                      number_application=self.current_app_number,
-                      )
-        app = Application(number=self.current_app_number,
-                          application_time=self.event_start_time,
-                          place_in_queue=0,
-                          staying_in_queue=0,
-                          start_service=self.event_start_time,
-                          service_time=time_until_end_service,
-                          end_time=self.event_start_time + time_until_end_service,
-                          )
-        self.event_table.append(event)
-        self.application_table.append(app)
+        # столбцы Event и Application
+        self._add_event(self.current_event_number, self.event_start_time, 1, self.number_app_now,
+                        self.min_app_service_time, self.time_arrival_next_app, self.current_app_number)
+        self._add_application(self.current_app_number, self.event_start_time, 0, 0, self.event_start_time,
+                              time_until_end_service, self.event_start_time + time_until_end_service)
 
     def _completes_app_processing(self, device: Device):
         """Завершает обработку заявки"""
@@ -298,35 +414,25 @@ class Controller_SMO:
 
         self.event_start_time = self.event_start_time + self.min_app_service_time
         self.time_arrival_next_app = self.time_arrival_next_app - self.min_app_service_time
+        app_num = self._end_task(device)
         self._update_min_app_service_time(self.min_app_service_time)
-        app_num = device.end_task()
-        event = Event(number=self.current_event_number,
-                      event_time=self.event_start_time,
-                      event_type=2,
-                      status_system=self.number_app_now,
-                      time_until_end_service=self.min_app_service_time,
-                      wait_time=self.time_arrival_next_app,
-                      number_application=app_num,
-                      )
-        self.event_table.append(event)
-        self._app_list_need_to_complete.remove(app_num)
+        self._add_event(self.current_event_number, self.event_start_time, 2, self.number_app_now,
+                        self.min_app_service_time, self.time_arrival_next_app, app_num)
 
     def _process_app_from_queue(self, device: Device):
         """Обрабатывает заявку из очереди"""
-        num_app, num_event = self.q.popleft()
-        if self.f_selection_to_file:
-            service_time = self.selection[str(num_event)][0]
-            self.selection[str(num_event)] = [service_time, self.selection[str(num_event)][1]]
-        else:
-            service_time = self.selection[str(num_event)][0]
+        num_app, app_time, service_time = self.q.popleft()
 
-        device.give_task(num_app, service_time)
-        self._app_list_need_to_complete.append(num_app)
+        self._give_task(device, num_app, service_time)
+        self._start_application(num_app, app_time, self.event_start_time, service_time)
+
+    def _start_application_in_table(self, num_app: int, app_time: float, start_service: float, service_time: float):
+        """Записывает в таблицу заявок начало обслуживания заявки из очереди"""
         app = self.application_table[num_app - 1]
-        app.start_service = self.event_start_time
-        app.stay_in_queue = app.start_service - app.app_time
+        app.start_service = start_service
+        app.stay_in_queue = start_service - app_time
         app.service_time = service_time
-        app.end_time = app.start_service + app.service_time
+        app.end_time = start_service + service_time
 
     def _add_app_to_queue(self):
         """Добавляем заявку в очередь"""
@@ -336,39 +442,39 @@ class Controller_SMO:
 
         self.event_start_time = self.event_start_time + self.time_arrival_next_app
         self._update_min_app_service_time(self.time_arrival_next_app)
-        if self.f_selection_to_file:
-            service_time = _get_service_time_by_requests(self.type_system)
-            self.time_arrival_next_app = _get_time_between_applications(self.type_system)
-            self.selection[str(self.current_event_number)] = [service_time, self.time_arrival_next_app]
-        else:
-            self.time_arrival_next_app = self.selection[str(self.current_event_number)][1]
-
-        self.q.append((self.current_app_number, self.current_event_number))
-
-        event = Event(number=self.current_event_number,
-                      event_time=self.event_start_time,
-                      event_type=1,
-                      status_system=self.number_app_now,
-                      time_until_end_service=self.min_app_service_time,
-                      wait_time=self.time_arrival_next_app,
-                      number_application=self.current_app_number,
-                      )
-        app = Application(number=self.current_app_number,
-                          application_time=self.event_start_time,
-                          place_in_queue=len(self.q),
-                          )
-        self.event_table.append(event)
-        self.application_table.append(app)
+        service_time, self.time_arrival_next_app = self._get_times_for_current_app()
+
+        self.q.append((self.current_app_number, self.event_start_time, service_time))
+
+        # столбцы Event и Application, заявка еще не обслуживается
+        self._add_event(self.current_event_number, self.event_start_time, 1, self.number_app_now,
+                        self.min_app_service_time, self.time_arrival_next_app, self.current_app_number)
+        self._add_application(self.current_app_number, self.event_start_time, len(self.q), -1, -1, -1, -1)
+
+    def _get_times_for_current_app(self) -> tuple[float, float]:
+        """
+        Время обслуживания поступившей заявки и время до прихода следующей
+
+        Берутся из выборки или генерируются. Сгенерированные значения запоминаются,
+        только если выборку надо записать в файл
+        """
+        if not self.f_selection_to_file:
+            service_time, time_arrival_next_app = self.selection[str(self.current_event_number)]
+            return service_time, time_arrival_next_app
+
+        service_time = self.service_sampler.next()
+        time_arrival_next_app = self.arrival_sampler.next()
+        if self.f_name_with_selection is not None:
+            self.selection[str(self.current_event_number)] = [service_time, time_arrival_next_app]
+        return service_time, time_arrival_next_app
 
     def get_frequency_table(self):
 
-        table_1 = []
-        reversed_table_1 = []
-        for elem1 in self.event_table:
-            table_1.append(elem1.get_data_for_report())
-        for i, row in enumerate(zip(*table_1)):
-            reversed_table_1.append(list(row))
-        counter_states = Counter(sorted(reversed_table_1[3]))  # количество входа в определенное состояние
+        if self.statistics is not None:
+            counter_states = self.statistics.get_state_counts()
+        else:
+            states, counts = np.unique(self.event_table['status_system'], return_counts=True)
+            counter_states = dict(zip(states.tolist(), counts.tolist()))  # количество входа в определенное состояние
 
         frequency_states = _get_frequency_states(counter_states)[:]
 
@@ -378,11 +484,17 @@ class Controller_SMO:
         """Собирает с прибора данные, необходимые для отчета"""
         table: list[DeviceData] = []
         for device in self.devices_list:
-            work_time = self.event_table[-1].event_time
+            work_time = self.get_work_time()
             device.device_data.calculate_device_downtime_ratio(work_time)
             table.append(device.device_data.get_data_for_report())
         return table
 
+    def get_work_time(self) -> float:
+        """Момент последнего события"""
+        if self.statistics is not None:
+            return self.statistics.event_time
+        return self.event_table[-1].event_time
+
     def get_column_for_table_5(self):
         num_apps_received = 0  # Число поступивших на обслуживание заявок
         num_apps_served = 0  # Число обслуженных заявок
@@ -391,30 +503,34 @@ class Controller_SMO:
             num_apps_served += device.device_data.num_applications_served
         num_apps_received += len(self.q)
 
-        sum_column_status_system = 0.
-        queue_time = 0.
-        application_time_in_smp = 0.
-        for event in self.event_table:
-            sum_column_status_system += event.status_system
-        for app in self.application_table:
-            if app.stay_in_queue != -1:
-                queue_time += app.stay_in_queue
-                application_time_in_smp += app.service_time
+        if self.statistics is not None:
+            sum_column_status_system = self.statistics.sum_status
+            queue_time = self.statistics.wait_time.total
+            application_time_in_smp = self.statistics.service_time.total
+        else:
+            sum_column_status_system = float(self.event_table['status_system'].sum())
+            started = self.application_table['stay_in_queue'] != -1
+            queue_time = float(self.application_table['stay_in_queue'][started].sum())
+            application_time_in_smp = float(self.application_table['service_time'][started].sum())
 
         return [num_apps_received, num_apps_served,
-                sum_column_status_system / 100,
+                sum_column_status_system / self.current_event_number,
                 queue_time / num_apps_served,
                 application_time_in_smp / num_apps_served,
                 ]
 
 
+_STAGE_METHODS = ('_add_event', '_add_application', '_start_application')
+
+
 def _get_frequency_states(counter_states: dict) -> list:
     """ Находит частоты состояний СМО"""
 
     frequency_states_1 = {}
     frequency_states = []  # .clean
+    num_events = sum(counter_states.values())
     for state in counter_states:
-        frequency_states_1[state] = counter_states[state] / 100
+        frequency_states_1[state] = counter_states[state] / num_events
     try:
         frequency_states_1[0]
     except:
@@ -426,24 +542,6 @@ def _get_frequency_states(counter_states: dict) -> list:
     return frequency_states
 
 
-def _get_time_between_applications(data):
-    """получить время между заявками."""
-    from constants import DELTA_T, LAMBD
-    if data in (2, 3):
-        return abs(np.random.exponential(1 / LAMBD))
-    elif data == 1:
-        return DELTA_T
-
-
-def _get_service_time_by_requests(data):
-    """получить время обслуживания заявками."""
-    from constants import SERVICE_TIME, MU
-    if data in (1, 3):
-        return abs(np.random.exponential(1 / MU))
-    elif data == 2:
-        return SERVICE_TIME
-
-
 def _load_selection(f_name, dir_='') -> dict[str: float]:
     """Загружает выборку из файла"""
     if os.path.exists(dir_ + f_name):
@@ -0,0 +1,104 @@
+"""
+    Контроллер СМО с календарем событий на куче
+
+    - моменты окончания обслуживания хранятся в абсолютном времени в очереди с приоритетом
+    - свободные приборы хранятся в куче по номеру прибора, так что заявку получает
+      свободный прибор с наименьшим номером
+
+    Каждое событие стоит O(log n) вместо O(n) у Controller_SMO, таблицы событий и заявок совпадают.
+
+"""
+import heapq
+from copy import copy
+
+from Controller_SMO import Controller_SMO
+from Device import Device
+from DeviceData import DeviceData
+from event_log import EventLog
+from sampler import BlockSampler
+
+
+class Controller_SMO_heap(Controller_SMO):
+    """
+
+       Controller_SMO, в котором приборы не опрашиваются на каждом событии
+
+        ...
+
+       Атрибуты
+       --------
+        _free_devices : list[int] (default [0, ..., num - 1])
+                Куча номеров свободных приборов
+        _calendar : list[tuple[float, int, int, float]] (default [])
+                Куча (момент окончания обслуживания, номер прибора, номер заявки, момент начала обслуживания)
+        _app_list_need_to_complete : set[int] (default set())
+                Номера заявок, которые надо завершить
+
+       """
+
+    def __init__(self, num: int, type_: int, f_name: str | None,
+                 samplers: tuple[BlockSampler, BlockSampler] | None = None,
+                 streaming: bool = False, keep_last: int = 0, event_log: EventLog | None = None, metrics=None):
+        super().__init__(num, type_, f_name, samplers, streaming, keep_last, event_log, metrics)
+        self._free_devices: list[int] = list(range(num))
+        self._calendar: list[tuple[float, int, int, float]] = []
+        self._app_list_need_to_complete = set()
+
+    def _search_free_device(self) -> Device | None:
+        """ Свободный прибор с наименьшим номером """
+        if self._free_devices:
+            return self.devices_list[self._free_devices[0]]
+
+        return None
+
+    def _update_min_app_service_time(self, time):
+        """
+        Берет ближайшее окончание обслуживания из календаря
+
+        Время time не нужно: моменты окончания хранятся в абсолютном времени
+
+        Изменяет
+            self.min_app_service_time
+            self.device_id_completing_app
+        """
+        if self._calendar:
+            end_time, number, _, _ = self._calendar[0]
+            self.min_app_service_time = end_time - self.event_start_time
+            self.device_id_completing_app = number
+        else:  # все приборы свободны
+            self.min_app_service_time = -1
+            self.device_id_completing_app = -1
+
+    def _give_task(self, device: Device, num_app: int, service_time: float):
+        """Поручает прибору заявку и заносит момент ее окончания в календарь"""
+        number = heapq.heappop(self._free_devices)
+        if number != device.get_number():
+            raise Exception(f'Прибор №{device.get_number()} не является свободным прибором с наименьшим номером')
+        device.give_task(num_app, service_time)
+        heapq.heappush(self._calendar,
+                       (self.event_start_time + service_time, number, num_app, self.event_start_time))
+        self._app_list_need_to_complete.add(num_app)
+
+    def _end_task(self, device: Device) -> int:
+        """Освобождает прибор, который первым заканчивает обслуживание"""
+        end_time, number, _, start_time = heapq.heappop(self._calendar)
+        if number != device.get_number():
+            raise Exception(f'Прибор №{device.get_number()} не заканчивает обслуживание первым')
+        app_num = device.end_task()
+        device.device_data.operating_time += end_time - start_time
+        heapq.heappush(self._free_devices, number)
+        self._app_list_need_to_complete.discard(app_num)
+        return app_num
+
+    def get_data_for_report(self):
+        """Собирает с прибора данные, необходимые для отчета"""
+        work_time = self.get_work_time()
+        in_service = {number: start_time for _, number, _, start_time in self._calendar}
+        table: list[DeviceData] = []
+        for device in self.devices_list:
+            device_data = copy(device.device_data)
+            if device.get_number() in in_service:  # заявка еще обслуживается
+                device_data.operating_time += work_time - in_service[device.get_number()]
+            device_data.calculate_device_downtime_ratio(work_time)
+            table.append(device_data.get_data_for_report())
+        return table
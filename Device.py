@@ -20,7 +20,7 @@ class Device:
         _time_until_end_service_app : float (default 0.)
                 Время до окончания обслуживания заявки
         _num_serviced_applications : list (default [])
-                Список заявок, которые были обслужены прибором
+                Список заявок, которые были обслужены прибором, ведется при keep_history=True
 
         _busy_time : float (default 0.)
                 Время работы (занятости) прибора
@@ -35,8 +35,9 @@ class Device:
 
        """
 
-    def __init__(self, number=0):
+    def __init__(self, number=0, keep_history=True):
         self._number = number
+        self._keep_history = keep_history
         self._num_app = 0
         self._free = True
         self._time_until_end_service_app = 0.0
@@ -58,7 +59,8 @@ class Device:
         self.device_data.num_applications_received += 1
 
     def end_task(self):
-        self._num_serviced_applications.append(self._num_app)
+        if self._keep_history:
+            self._num_serviced_applications.append(self._num_app)
         self.device_data.num_applications_served += 1
         tmp = self._num_app
         self._num_app = -1
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Event:
     """
 
@@ -14,6 +17,10 @@ class Event:
         Возвращает список из всех атрибутов класса
 
     """
+    __slots__ = ('num', 'event_time', 'event_type', 'status_system', 'time_until_end_service', 'wait_time',
+                 'num_application')
+    dtype = np.dtype([('num', np.int64), ('event_time', float), ('event_type', np.int64), ('status_system', np.int64),
+                      ('time_until_end_service', float), ('wait_time', float), ('num_application', np.int64)])
 
     def __init__(self, number=0, event_time=0., event_type=0, status_system=0, time_until_end_service=0., wait_time=0.,
                  number_application=0):
@@ -35,11 +42,10 @@ class Event:
         self.time_until_end_service = time_until_end_service
         self.wait_time = wait_time
         self.num_application = number_application
-        self._data_len = 7
 
     def __len__(self):
         """Возвращает количество атрибутов в классе."""
-        return self._data_len
+        return len(self.__slots__)
 
     def __repr__(self):
         return f'{self.num}, {self.event_time}, {self.event_type}, {self.status_system}, {self.time_until_end_service},' \
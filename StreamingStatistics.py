@@ -0,0 +1,127 @@
+from collections import deque
+
+from Event import Event
+
+
+class RunningStatistic:
+    """
+
+    Сумма, среднее и дисперсия последовательности по алгоритму Уэлфорда
+
+    Атрибуты
+    --------
+    count : int (default 0)
+            Количество значений
+    total : float (default 0.)
+            Сумма значений
+    mean : float (default 0.)
+            Среднее
+    _m2 : float (default 0.)
+            Сумма квадратов отклонений от среднего
+
+    """
+    __slots__ = ('count', 'total', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.mean = 0.
+        self._m2 = 0.
+
+    def __repr__(self):
+        return f'n={self.count}, mean={self.mean}, variance={self.variance}'
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Несмещенная оценка дисперсии"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.
+
+
+class StreamingStatistics:
+    """
+
+    Накопители статистики СМО, которые обновляются на каждом событии вместо хранения таблиц
+
+    Память не зависит от количества событий: гистограммы растут только до наибольшего состояния СМО
+
+    Атрибуты
+    --------
+    num_events : int (default 0)
+            Количество событий
+    sum_status : int (default 0)
+            Сумма состояний СМО по событиям
+    state_counts : list[int] (default [])
+            Количество событий, после которых СМО находилась в состоянии k
+    state_time : list[float] (default [])
+            Время пребывания СМО в состоянии k
+    num_apps_received : int (default 0)
+            Количество поступивших в СМО заявок
+    wait_time : RunningStatistic
+            Время пребывания в очереди заявок, поступивших на обслуживание
+    service_time : RunningStatistic
+            Время обслуживания заявок, поступивших на обслуживание
+    event_time : float (default 0.)
+            Момент последнего события
+    last_events : deque[tuple] (default deque(maxlen=keep_last))
+            Последние keep_last событий в порядке столбцов Event, для отладки
+
+    """
+
+    def __init__(self, keep_last: int = 0):
+        self.num_events = 0
+        self.sum_status = 0
+        self.state_counts: list[int] = []
+        self.state_time: list[float] = []
+        self.num_apps_received = 0
+        self.wait_time = RunningStatistic()
+        self.service_time = RunningStatistic()
+        self.event_time = 0.
+        self._status = 0
+        self.last_events: deque[tuple] = deque(maxlen=keep_last)
+
+    def __repr__(self):
+        return f'событий: {self.num_events}, заявок: {self.num_apps_received}, ' \
+               f'ожидание: ({self.wait_time}), обслуживание: ({self.service_time})'
+
+    def add_event(self, *values):
+        """Учитывает событие, значения идут в порядке столбцов Event"""
+        event_time, status = values[1], values[3]
+        if self.num_events:
+            self.state_time[self._status] += event_time - self.event_time
+        while len(self.state_counts) <= status:
+            self.state_counts.append(0)
+            self.state_time.append(0.)
+        self.state_counts[status] += 1
+        self.num_events += 1
+        self.sum_status += status
+        self.event_time = event_time
+        self._status = status
+        if self.last_events.maxlen:
+            self.last_events.append(values)
+
+    def add_application(self, *values):
+        """Учитывает поступившую заявку, значения идут в порядке столбцов Application"""
+        self.num_apps_received += 1
+        if values[3] != -1:  # заявка сразу поступила на обслуживание
+            self.wait_time.add(values[3])
+            self.service_time.add(values[5])
+
+    def start_application(self, num_app: int, app_time: float, start_service: float, service_time: float):
+        """Учитывает заявку, которая поступила на обслуживание из очереди"""
+        self.wait_time.add(start_service - app_time)
+        self.service_time.add(service_time)
+
+    def get_state_counts(self) -> dict[int, int]:
+        """Количество событий, после которых СМО находилась в каждом из состояний"""
+        return {state: count for state, count in enumerate(self.state_counts) if count}
+
+    def get_last_events(self) -> list[Event]:
+        """Последние события в виде списка Event"""
+        return [Event(*values) for values in self.last_events]
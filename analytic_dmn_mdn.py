@@ -0,0 +1,241 @@
+"""
+Численное решение СМО (D|M|n) и (M|D|n)
+
+- (D|M|n) - частный случай GI/M/n: в моменты прихода заявок число заявок в СМО образует цепь Маркова,
+  ее стационарное распределение pi_j = C * sigma^(j - n) при j >= n - 1, где sigma - корень уравнения
+  sigma = exp(-n * mu * delta_t * (1 - sigma)). Вероятности pi_0..pi_{n-2} находятся из уравнений равновесия,
+  переходы из состояний j >= n (сумма геометрического хвоста) считаются одним интегралом по квадратуре Гаусса
+- (M|D|n) - метод Кроммелина: число заявок через каждые service_time образует цепь
+  X' = max(X - n, 0) + A, A ~ Пуассон(lambd * service_time), ее стационарное распределение совпадает
+  с распределением в произвольный момент. Цепь обрезается там, где хвост (геометрический со знаменателем 1 / z,
+  z^n = exp(lambd * service_time * (z - 1))) становится пренебрежимо мал
+- показатели те же, что у analytic_mmn.get_metrics, плюс среднее состояние СМО по событиям
+  (столбец таблицы 5): событие прихода и событие ухода заявки видят одно и то же распределение
+  числа заявок перед приходом, поэтому среднее по событиям равно среднему перед приходом + 1/2
+- для неустойчивых систем (загрузка >= 1) показатели, кроме загрузки, равны nan
+
+Решения - система линейных уравнений размера n (D|M|n) или длины обрезанной цепи (M|D|n),
+поэтому модуль рассчитан на десятки и сотни приборов, а не на 10^5, как analytic_mmn.
+
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from analytic_mmn import MMn, get_log_factorials
+
+TAIL_EPSILON = 1e-14  # пренебрежимая вероятность хвоста
+MAX_STATES = 5000  # наибольшая длина обрезанной цепи (M|D|n)
+QUADRATURE_NODES = 16  # узлов квадратуры Гаусса - Лежандра на отрезке
+MAX_SEGMENTS = 4096
+
+# показатели MMn (wait_probability - доля времени, когда заняты все приборы),
+# arrival_wait_probability - вероятность того, что поступившая заявка будет ждать,
+# event_status - среднее число заявок в СМО после события
+QueueMetrics = namedtuple('QueueMetrics', MMn._fields + ('arrival_wait_probability', 'event_status'))
+
+
+def _log_binomial_pmf(m: int, j: np.ndarray, log_p: np.ndarray, log_q: np.ndarray) -> np.ndarray:
+    """ln P(Bin(m, p) = j), log_p и log_q = ln p и ln (1 - p), допускаются -inf"""
+    log_factorials = get_log_factorials(m)
+    with np.errstate(invalid='ignore'):
+        success = np.where(j == 0, 0., j * log_p)
+        failure = np.where(j == m, 0., (m - j) * log_q)
+    return log_factorials[m] - log_factorials[j] - log_factorials[m - j] + success + failure
+
+
+def _log_poisson_pmf(k: np.ndarray, a: float) -> np.ndarray:
+    log_factorials = get_log_factorials(int(k.max()))
+    return (k * math.log(a) if a > 0 else np.where(k == 0, 0., -np.inf)) - a - log_factorials[k]
+
+
+def _unstable_metrics(utilisation: float) -> QueueMetrics:
+    """Показатели неустойчивой системы: известна только загрузка (как в analytic_mmn)"""
+    return QueueMetrics(utilisation, *(math.nan,) * (len(QueueMetrics._fields) - 1))
+
+
+def get_sigma(delta_t: float, mu: float, n: int) -> float:
+    """
+    Корень sigma из (0, 1) уравнения sigma = exp(-n * mu * delta_t * (1 - sigma))
+
+    Метод Ньютона от 0: функция sigma - exp(...) вогнута, поэтому приближения растут и не перескакивают корень
+
+    """
+    b = n * mu * delta_t
+    if b <= 1:
+        raise Exception('Система неустойчива: n * mu * delta_t <= 1')
+    sigma = 0.
+    for _ in range(200):
+        g = math.exp(-b * (1 - sigma))
+        step = (sigma - g) / (1 - b * g)
+        sigma -= step
+        if abs(step) < 1e-16:
+            break
+    return sigma
+
+
+def _get_tail_transitions(delta_t: float, mu: float, n: int, sigma: float) -> np.ndarray:
+    """
+    T_j = sum_{m>=0} sigma^m P(после прихода n + 1 + m заявок -> перед следующим приходом j), j = 0..n-1
+
+    Время, за которое n + 1 + m заявок уменьшатся до n - 1, распределено по Эрлангу (m + 2, n * mu),
+    взвешенная сумма плотностей - h(t) = n * mu * exp(-n * mu * t) * (exp(sigma * n * mu * t) - 1) / sigma.
+    За оставшееся время каждая из n - 1 заявок остается с вероятностью exp(-mu * (delta_t - t))
+
+    """
+    rate = n * mu
+    segments = min(MAX_SEGMENTS, max(1, math.ceil(rate * delta_t / 4)))
+    nodes, weights = np.polynomial.legendre.leggauss(QUADRATURE_NODES)
+    edges = np.linspace(0., delta_t, segments + 1)
+    half = np.diff(edges)[:, None] / 2
+    t = ((edges[:-1, None] + edges[1:, None]) / 2 + half * nodes).ravel()
+    w = (half * weights).ravel()
+    log_h = math.log(rate) - rate * t + np.log(np.expm1(sigma * rate * t) / sigma)
+    remaining = delta_t - t
+    j = np.arange(n)
+    with np.errstate(divide='ignore'):
+        log_pmf = _log_binomial_pmf(n - 1, j, -mu * remaining[:, None], np.log(-np.expm1(-mu * remaining))[:, None])
+    return (w * np.exp(log_h)) @ np.exp(log_pmf)
+
+
+def get_arrival_distribution_dmn(delta_t: float, mu: float, n: int) -> tuple[np.ndarray, float, float]:
+    """
+    Распределение числа заявок перед приходом заявки в (D|M|n)
+
+    Возвращает (pi_0..pi_{n-1}, C, sigma): pi_j = C * sigma^(j - n) при j >= n - 1
+
+    """
+    sigma = get_sigma(delta_t, mu, n)
+    # после прихода i + 1 <= n заявок: каждая остается с вероятностью exp(-mu * delta_t)
+    i = np.arange(n)[:, None]
+    j = np.arange(n)[None, :]
+    log_q = math.log(-math.expm1(-mu * delta_t))
+    log_factorials = get_log_factorials(n)
+    with np.errstate(invalid='ignore'):
+        log_pmf = (log_factorials[i + 1] - log_factorials[np.minimum(j, i + 1)]
+                   - log_factorials[np.maximum(i + 1 - j, 0)]
+                   - mu * delta_t * j + np.where(i + 1 == j, 0., (i + 1 - j) * log_q))
+    transitions = np.where(j <= i + 1, np.exp(log_pmf), 0.)
+    tail = _get_tail_transitions(delta_t, mu, n, sigma)
+
+    # неизвестные pi_0..pi_{n-1}, C; уравнения равновесия j = 0..n-1, pi_{n-1} = C / sigma, сумма = 1
+    system = np.zeros((n + 2, n + 1))
+    system[:n, :n] = transitions.T - np.eye(n)
+    system[:n, n] = tail
+    system[n, n - 1], system[n, n] = sigma, -1.
+    system[n + 1, :n], system[n + 1, n] = 1., 1 / (1 - sigma)
+    right = np.zeros(n + 2)
+    right[n + 1] = 1.
+    solution = np.linalg.lstsq(system, right, rcond=None)[0]
+    return np.maximum(solution[:n], 0.), float(solution[n]), sigma
+
+
+def get_metrics_dmn(delta_t: float, mu: float, n: int) -> QueueMetrics:
+    """Показатели СМО (D|M|n) в установившемся режиме"""
+    if n < 1:
+        raise Exception('Количество приборов должно быть не меньше 1')
+    lambd = 1 / delta_t
+    utilisation = lambd / (n * mu)
+    if utilisation >= 1:
+        return _unstable_metrics(utilisation)
+    head, c, sigma = get_arrival_distribution_dmn(delta_t, mu, n)
+    arrival_wait_probability = c / (1 - sigma)
+    wq = c / ((1 - sigma) ** 2 * n * mu)
+    lq = lambd * wq
+    # доля времени в состоянии j >= 1 из равенства потоков через уровень: lambd * pi_{j-1} = min(j, n) * mu * p_j
+    time_head = lambd * head[:n - 1] / (np.arange(1, n) * mu)
+    wait_probability = lambd * (head[n - 1] + arrival_wait_probability) / (n * mu)
+    wait_probability = float(wait_probability)
+    r0 = 1 - float(time_head.sum()) - wait_probability
+    k = np.arange(n)
+    arrival_status = float(head @ k) + c * (n / (1 - sigma) + sigma / (1 - sigma) ** 2)
+    return QueueMetrics(utilisation, wait_probability, lq, wq, lq + lambd / mu, wq + 1 / mu, r0,
+                        arrival_wait_probability, arrival_status + 0.5)
+
+
+def get_tail_root_mdn(lambd: float, service_time: float, n: int) -> float:
+    """Корень z > 1 уравнения z^n = exp(lambd * service_time * (z - 1)), хвост распределения ~ z^(-j)"""
+    a = lambd * service_time
+    # n * ln z - a * (z - 1) вогнута, справа от корня (где она отрицательна) Ньютон сходится монотонно
+    z = 2 * n / a
+    while n * math.log(z) - a * (z - 1) >= 0:
+        z *= 2
+    for _ in range(200):
+        step = (n * math.log(z) - a * (z - 1)) / (n / z - a)
+        z -= step
+        if abs(step) < 1e-15 * z:
+            break
+    return z
+
+
+def get_distribution_mdn(lambd: float, service_time: float, n: int) -> np.ndarray:
+    """Вероятности p_j того, что в СМО (M|D|n) находится j заявок, до пренебрежимо малого хвоста"""
+    a = lambd * service_time
+    if a >= n:
+        raise Exception('Система неустойчива: lambd * service_time >= n')
+    z = get_tail_root_mdn(lambd, service_time, n)
+    tail = math.ceil(math.log(TAIL_EPSILON) / -math.log(z))
+    size = n + tail + math.ceil(a + 10 * math.sqrt(a) + 10)
+    if size > MAX_STATES:
+        raise Exception(f'Слишком большая загрузка для (M|D|n): нужно {size} состояний, допустимо {MAX_STATES}')
+    arrivals = np.exp(_log_poisson_pmf(np.arange(size), a))
+    transitions = np.zeros((size, size))
+    for i in range(size):
+        base = max(i - n, 0)
+        transitions[i, base:] = arrivals[:size - base]
+    system = transitions.T - np.eye(size)
+    system[-1] = 1.
+    right = np.zeros(size)
+    right[-1] = 1.
+    return np.maximum(np.linalg.solve(system, right), 0.)
+
+
+def get_metrics_mdn(lambd: float, service_time: float, n: int) -> QueueMetrics:
+    """Показатели СМО (M|D|n) в установившемся режиме"""
+    if n < 1:
+        raise Exception('Количество приборов должно быть не меньше 1')
+    utilisation = lambd * service_time / n
+    if utilisation >= 1:
+        return _unstable_metrics(utilisation)
+    probability = get_distribution_mdn(lambd, service_time, n)
+    k = np.arange(len(probability))
+    lq = float(probability @ np.maximum(k - n, 0))
+    wq = lq / lambd
+    wait_probability = float(probability[n:].sum())
+    l = lq + lambd * service_time
+    # пуассоновский поток видит распределение в произвольный момент
+    return QueueMetrics(utilisation, wait_probability, lq, wq, l, wq + service_time, float(probability[0]),
+                        wait_probability, l + 0.5)
+
+
+def get_metrics(type_system: int, parameters=None) -> QueueMetrics:
+    """Показатели СМО типа type_system (1 - D|M|n, 2 - M|D|n, 3 - M|M|n), параметры - из parameters или constants"""
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    if type_system == 1:
+        return get_metrics_dmn(parameters.delta_t, parameters.mu, parameters.num_smo)
+    if type_system == 2:
+        return get_metrics_mdn(parameters.lambd, parameters.service_time, parameters.num_smo)
+    if type_system == 3:
+        from analytic_mmn import get_metrics as get_metrics_mmn
+        metrics = get_metrics_mmn(parameters.lambd, parameters.mu, parameters.num_smo)
+        values = [float(value) for value in metrics]
+        # пуассоновский поток видит распределение в произвольный момент
+        return QueueMetrics(*values, metrics.wait_probability.item(), values[4] + 0.5)
+    raise Exception(f'Нет аналитического решения для типа системы {type_system}')
+
+
+def get_column_for_table_5(type_system: int, num_events: int, parameters=None) -> list[float]:
+    """
+    Ожидаемые значения столбца таблицы 5 (как Controller_SMO.get_column_for_table_5) для num_events событий
+
+    Приходов и уходов за num_events событий поровну, кроме заявок, оставшихся в СМО в конце
+    (в среднем event_status). Переходный режим от пустой СМО не учитывается.
+
+    """
+    metrics = get_metrics(type_system, parameters)
+    num_apps_received = (num_events + metrics.event_status) / 2
+    num_apps_served = (num_events - metrics.event_status) / 2
+    return [num_apps_received, num_apps_served, metrics.event_status, metrics.wq, metrics.w - metrics.wq]
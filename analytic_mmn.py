@@ -0,0 +1,132 @@
+"""
+Аналитическое решение СМО (M|M|n)
+
+- вероятности состояний r_k, вероятность ожидания (формула Эрланга C), Lq, Wq и загрузка
+  считаются в логарифмах, поэтому не переполняются при n до 10^5 и больше
+- все функции векторизованы: lambd, mu и n могут быть массивами одной формы (или приводимыми к ней),
+  тогда тысячи конфигураций считаются за один вызов
+- для неустойчивых систем (lambd >= n * mu) показатели равны nan
+
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+_MAX_TERMS = 1 << 20  # слагаемых в одной порции при суммировании по конфигурациям
+_WINDOW_LOG_DROP = 45.  # на сколько ln слагаемого на краю окна суммирования меньше наибольшего
+_log_factorials = np.zeros(1)  # _log_factorials[k] = ln k!
+
+MMn = namedtuple('MMn', ['utilisation', 'wait_probability', 'lq', 'wq', 'l', 'w', 'r0'])
+
+
+def get_log_factorials(max_k: int) -> np.ndarray:
+    """ln k! для k = 0..max_k, таблица дополняется по мере надобности"""
+    global _log_factorials
+    if len(_log_factorials) <= max_k:
+        new = np.array([math.lgamma(k + 1) for k in range(len(_log_factorials), 2 * max_k + 1)])
+        _log_factorials = np.concatenate((_log_factorials, new))
+    return _log_factorials[:max_k + 1]
+
+
+def _k_log(k, log_a):
+    """k * ln a с 0 * ln 0 = 0"""
+    return np.where(k == 0, 0., k * np.where(k == 0, 0., log_a))
+
+
+def _log_head_sum(log_a: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    ln sum_{k=0}^{n-1} a^k / k! для каждой конфигурации
+
+    Слагаемые всех конфигураций лежат в одном массиве, суммы по отрезкам считаются через reduceat
+    со сдвигом на максимум отрезка (logsumexp). Берутся только слагаемые в окне
+    peak_k +- width, width = sqrt(2 _WINDOW_LOG_DROP a) + 2 _WINDOW_LOG_DROP, вокруг наибольшего
+    (peak_k = min(a, n - 1)): вне окна ln слагаемого меньше максимума больше чем на
+    (k - a)^2 / (2 max(k, a)) >= _WINDOW_LOG_DROP, и их вклад меньше точности float
+
+    """
+    result = np.empty(len(n))
+    log_factorials = get_log_factorials(int(n.max()))
+    a = np.exp(log_a)
+    width = np.ceil(np.sqrt(2 * _WINDOW_LOG_DROP * a) + 2 * _WINDOW_LOG_DROP).astype(np.int64)
+    peak_k = np.minimum(np.floor(a), n - 1).astype(np.int64)
+    low = np.maximum(peak_k - width, 0)
+    high = np.minimum(peak_k + width + 1, n)
+    start = 0
+    while start < len(n):
+        # порция конфигураций, в которой не больше _MAX_TERMS слагаемых (но хотя бы одна конфигурация)
+        stop = start + max(1, int(np.searchsorted(np.cumsum(high[start:] - low[start:]), _MAX_TERMS,
+                                                  side='right')))
+        counts = high[start:stop] - low[start:stop]
+        offsets = np.cumsum(counts) - counts
+        config = np.repeat(np.arange(len(counts)), counts)
+        k = np.arange(int(counts.sum())) - offsets[config] + low[start:stop][config]
+        terms = _k_log(k, log_a[start:stop][config]) - log_factorials[k]
+        peak = np.maximum.reduceat(terms, offsets)
+        result[start:stop] = peak + np.log(np.add.reduceat(np.exp(terms - peak[config]), offsets))
+        start = stop
+    return result
+
+
+def _prepare(lambd, mu, n):
+    lambd, mu, n = np.broadcast_arrays(np.asarray(lambd, dtype=float), np.asarray(mu, dtype=float),
+                                       np.asarray(n, dtype=np.int64))
+    if np.any(n < 1):
+        raise Exception('Количество приборов должно быть не меньше 1')
+    with np.errstate(divide='ignore'):
+        log_a = np.log(lambd / mu)
+    return lambd.ravel(), mu.ravel(), n.ravel(), log_a.ravel(), lambd.shape
+
+
+def _log_tail_and_r0(log_a, n):
+    """ln (a^n / n! / (1 - rho)) и ln r0, для неустойчивых систем nan"""
+    rho = np.exp(log_a) / n
+    log_factorials = get_log_factorials(int(n.max()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_tail = np.where(rho < 1, _k_log(n, log_a) - log_factorials[n] - np.log1p(-rho), np.nan)
+        log_r0 = -np.logaddexp(_log_head_sum(log_a, n), log_tail)
+    return rho, log_tail, log_r0
+
+
+def get_metrics(lambd, mu, n) -> MMn:
+    """
+    Показатели СМО (M|M|n) в установившемся режиме
+
+    utilisation - загрузка прибора rho = lambd / (n * mu), wait_probability - вероятность ожидания (Эрланг C),
+    lq, wq - средние длина очереди и время ожидания, l, w - средние число заявок в СМО и время пребывания,
+    r0 - вероятность того, что СМО пуста
+
+    """
+    lambd, mu, n, log_a, shape = _prepare(lambd, mu, n)
+    rho, log_tail, log_r0 = _log_tail_and_r0(log_a, n)
+    wait_probability = np.exp(log_tail + log_r0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lq = wait_probability * rho / (1 - rho)
+        wq = lq / lambd
+    lq = np.where(lambd == 0, 0., lq)
+    wq = np.where(lambd == 0, 0., wq)
+    values = (rho, wait_probability, lq, wq, lq + lambd / mu, wq + 1 / mu, np.exp(log_r0))
+    return MMn(*(value.reshape(shape) for value in values))
+
+
+def erlang_c(lambd, mu, n) -> np.ndarray:
+    """Вероятность того, что поступившая заявка будет ждать в очереди"""
+    return get_metrics(lambd, mu, n).wait_probability
+
+
+def get_stationary_distribution(lambd, mu, n, length: int) -> np.ndarray:
+    """
+    Вероятности r_0..r_{length-1} того, что в СМО находится k заявок
+
+    Для массивов параметров возвращает массив формы (*форма параметров, length)
+
+    """
+    lambd, mu, n, log_a, shape = _prepare(lambd, mu, n)
+    rho, _, log_r0 = _log_tail_and_r0(log_a, n)
+    k = np.arange(length)
+    log_factorials = get_log_factorials(max(int(n.max()), length))
+    head_k = np.minimum(k, n[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_r = (log_r0[:, None] + _k_log(head_k, log_a[:, None]) - log_factorials[head_k]
+                 + _k_log(k - head_k, np.log(rho)[:, None]))
+    return np.exp(log_r).reshape(shape + (length,))
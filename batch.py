@@ -0,0 +1,131 @@
+"""
+Отчеты для всех вариантов файла условий
+
+- файл условий читается один раз (get_data.get_all_conditions)
+- каждый вариант - отдельная задача пула процессов: моделирование трех СМО и запись отчета
+- параметры варианта передаются явно, глобальные константы (constants) не меняются
+- отчет и файлы выборки варианта лежат в своем каталоге {output_dir}/{variant}
+- с --seed файлов выборки нет: вариант получает потомка SeedSequence(seed), его метаданные пишутся
+  в {output_dir}/{variant}/seed.json, и отчеты не зависят от числа процессов
+- после каждого варианта печатается прогресс, ошибка одного варианта не останавливает остальные
+
+Пример:
+    python batch.py --conditions lab_3.txt --output-dir reports --backend html --processes 8
+
+"""
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def create_variant_report(condition, output_dir: str, backend: str = 'docx', cache_dir: str | None = None,
+                          num_events: int | None = None, engine: str = 'list', seed=None) -> str:
+    """Отчет одного варианта в каталоге {output_dir}/{variant}, возвращает путь к отчету"""
+    from create_a_report import REPORT_NAMES, write_variant_report
+    from result_cache import ResultCache
+
+    directory = os.path.join(output_dir, condition.variant)
+    os.makedirs(directory, exist_ok=True)
+    doc_name = os.path.join(directory, REPORT_NAMES[backend])
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    write_variant_report(condition, doc_name, cache, backend, num_events, directory, engine, verbose=False,
+                         seed=seed)
+    return doc_name
+
+
+def _create_variant_report(args) -> str:
+    return create_variant_report(*args)
+
+
+def create_reports(path_to_cond: str = 'lab_3.txt', output_dir: str = 'reports', variants=None,
+                   backend: str = 'docx', cache_dir: str | None = None, num_events: int | None = None,
+                   engine: str = 'list', processes: int | None = None, verbose: bool = True,
+                   seed=None) -> dict[str, str]:
+    """
+    Создает отчеты вариантов variants (default - все варианты файла path_to_cond)
+
+    :param backend: формат отчета из create_a_report.REPORT_NAMES
+    :param cache_dir: общий для всех процессов каталог кэша результатов (result_cache), None - без кэша
+    :param num_events: количество событий (default constants.NUM_EVENTS)
+    :param processes: количество процессов, 1 - в текущем процессе
+    :param seed: начальное значение генераторов (целое число или SeedSequence) вместо файлов выборки,
+        поток варианта зависит только от seed и номера варианта
+    :return: {вариант: путь к отчету}
+
+    Если какие-то варианты не удались, после обработки остальных выбрасывается исключение со списком вариантов.
+
+    """
+    from create_a_report import REPORT_NAMES
+    from get_data import get_all_conditions
+
+    if backend not in REPORT_NAMES:
+        raise Exception(f'Неизвестный формат отчета {backend}, допустимы {list(REPORT_NAMES)}')
+    conditions = get_all_conditions(path_to_cond, variants)
+    if seed is not None:
+        from seeds import get_child, to_seed_sequence
+        seed = to_seed_sequence(seed)
+    tasks = {condition.variant: (condition, output_dir, backend, cache_dir, num_events, engine,
+                                 None if seed is None else get_child(seed, zlib.crc32(condition.variant.encode())))
+             for condition in conditions}
+    paths = {}
+    errors = {}
+    start = time.perf_counter()
+
+    def report(variant: str, path: str | None, error: BaseException | None):
+        if error is None:
+            paths[variant] = path
+        else:
+            errors[variant] = error
+        if verbose:
+            done = len(paths) + len(errors)
+            result = path if error is None else f'ошибка: {error!r}'
+            print(f'[{done}/{len(tasks)}, {time.perf_counter() - start:.1f} с] вариант {variant}: {result}',
+                  flush=True)
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) <= 1:
+        for variant, task in tasks.items():
+            try:
+                report(variant, _create_variant_report(task), None)
+            except Exception as error:
+                report(variant, None, error)
+    else:
+        with ProcessPoolExecutor(min(processes, len(tasks))) as executor:
+            futures = {executor.submit(_create_variant_report, task): variant for variant, task in tasks.items()}
+            for future in as_completed(futures):
+                error = future.exception()
+                report(futures[future], None if error is not None else future.result(), error)
+
+    if errors:
+        raise Exception(f'Не удалось создать отчеты вариантов {sorted(errors)}') from next(iter(errors.values()))
+    return {variant: paths[variant] for variant in tasks}
+
+
+def _get_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Отчеты для всех вариантов файла условий')
+    parser.add_argument('--conditions', default='lab_3.txt', help='файл условий')
+    parser.add_argument('--output-dir', default='reports', help='каталог отчетов')
+    parser.add_argument('--variants', nargs='*', default=None, help='варианты (default - все)')
+    parser.add_argument('--backend', default='docx', help='формат отчета: docx, csv, html, markdown')
+    parser.add_argument('--cache-dir', default=None, help='каталог кэша результатов')
+    parser.add_argument('--events', type=int, default=None, help='количество событий (default constants.NUM_EVENTS)')
+    parser.add_argument('--engine', default='list', help='движок моделирования: list, heap, numpy')
+    parser.add_argument('--processes', type=int, default=None, help='количество процессов (default - все ядра)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='начальное значение генераторов вместо файлов выборки table1_task{n}.txt')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _get_parser().parse_args(argv)
+    create_reports(args.conditions, args.output_dir, args.variants, args.backend, args.cache_dir, args.events,
+                   args.engine, args.processes, seed=args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+Замеры производительности моделирования и отчета
+
+- BENCHMARKS - замеряемые функции и оси, по которым они масштабируются: количество событий (10^2..10^7),
+  количество приборов (1..10^4), тип системы, движок
+- каждый случай выполняется в отдельном процессе, поэтому память и кэши предыдущих случаев не влияют на замер
+- время - минимум по повторам (повторы идут, пока не наберется MIN_TIME секунд), пиковая память -
+  отдельный проход под tracemalloc, только замеряемая функция без подготовки
+- если случай дольше max_seconds, большие количества событий для тех же остальных параметров пропускаются
+- результаты сохраняются в JSON, compare сравнивает их с сохраненной базой и отмечает замедления,
+  speedup показывает ускорение движков start_system относительно list на одних и тех же случаях
+
+Пример:
+    python benchmark.py run --output base.json
+    python benchmark.py run --output new.json --benchmarks start_system --events 1000 100000
+    python benchmark.py compare base.json new.json
+    python benchmark.py speedup new.json
+
+"""
+import json
+import os
+import sys
+import time
+
+BENCHMARKS = {  # замер: оси
+    'start_system': ('type_system', 'num_smo', 'num_events', 'engine'),
+    'get_frequency_table': ('type_system', 'num_smo', 'num_events'),
+    'get_vector_r': ('num_smo', 'num_events'),  # num_events - длина вектора r
+    'fill_table_for_report': ('num_events',),  # num_events - строк таблицы событий
+}
+EVENT_COUNTS = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+DEVICE_COUNTS = (1, 10, 100, 1000, 10000)
+TYPE_SYSTEMS = (1, 2, 3)
+ENGINES = ('list', 'heap', 'numpy')
+DEFAULTS = {'type_system': 3, 'num_smo': 10, 'num_events': 1000, 'engine': 'heap'}  # значения осей, не входящих в замер
+
+LOAD = 0.9  # загрузка прибора, параметры выбираются так, чтобы система была устойчивой при любом num_smo
+SEED = 1
+MIN_TIME = 0.2
+MAX_REPEAT = 5
+MAX_SECONDS = 60.
+THRESHOLD = 0.2  # относительное замедление, которое считается регрессией
+MIN_DIFF_SECONDS = 1e-3  # разница меньше этой считается шумом
+
+
+def get_parameters(num_smo: int):
+    """Параметры СМО с загрузкой LOAD: mu = 1, lambd = LOAD * num_smo"""
+    from constants import Parameters
+
+    lambd = LOAD * num_smo
+    return Parameters(num_smo, 1., 1 / lambd, lambd, 1.)
+
+
+def get_cases(benchmarks=tuple(BENCHMARKS), event_counts=EVENT_COUNTS, device_counts=DEVICE_COUNTS,
+              type_systems=TYPE_SYSTEMS, engines=ENGINES) -> list[dict]:
+    """Случаи замеров, для каждого набора остальных осей - по возрастанию количества событий"""
+    import itertools
+
+    values = {'type_system': type_systems, 'num_smo': device_counts, 'engine': engines}
+    cases = []
+    for benchmark in benchmarks:
+        if benchmark not in BENCHMARKS:
+            raise Exception(f'Неизвестный замер {benchmark}, допустимы {list(BENCHMARKS)}')
+        axes = [axis for axis in BENCHMARKS[benchmark] if axis != 'num_events']
+        for combination in itertools.product(*(values[axis] for axis in axes)):
+            for num_events in sorted(event_counts):
+                case = {'benchmark': benchmark, **DEFAULTS, **dict(zip(axes, combination)), 'num_events': num_events}
+                cases.append(case)
+    return cases
+
+
+def get_case_key(case: dict) -> tuple:
+    return tuple(case[name] for name in ('benchmark', 'type_system', 'num_smo', 'num_events', 'engine'))
+
+
+def _simulate(case: dict, streaming: bool = False):
+    import numpy as np
+    from sampler import get_samplers
+    from solution import get_engine
+
+    parameters = get_parameters(case['num_smo'])
+    samplers = get_samplers(case['type_system'], parameters, np.random.default_rng(SEED))
+    if case['engine'] == 'numpy':
+        return get_engine(case['engine'])(parameters.num_smo, case['type_system'], None, samplers)
+    return get_engine(case['engine'])(parameters.num_smo, case['type_system'], None, samplers, streaming=streaming)
+
+
+def _get_setup_and_function(case: dict):
+    """(подготовка, замеряемая функция от результата подготовки)"""
+    num_events = case['num_events']
+    if case['benchmark'] == 'start_system':
+        return lambda: _simulate(case), lambda smo: smo.start_system(num_events)
+
+    if case['benchmark'] == 'get_frequency_table':
+        def setup():
+            smo = _simulate(case)
+            smo.start_system(num_events)
+            return smo
+        return setup, lambda smo: smo.get_frequency_table()
+
+    if case['benchmark'] == 'get_vector_r':
+        from solution import get_vector_r
+        parameters = get_parameters(case['num_smo'])
+        return lambda: None, lambda _: get_vector_r(num_events, parameters)
+
+    from docx import Document
+    from docx.shared import Inches
+    from work_with_document import fill_table_for_report
+
+    smo = _simulate(case)
+    event_table = smo.start_system(num_events)[0]
+    widths = (Inches(0.4), Inches(1), Inches(0.3), Inches(0.3), Inches(1), Inches(1), Inches(0.3))
+    return Document, lambda document: fill_table_for_report(document, event_table, widths)
+
+
+def run_case(case: dict, memory: bool = True) -> dict:
+    """Замер одного случая в текущем процессе"""
+    setup, function = _get_setup_and_function(case)
+    wall_times = []
+    cpu_times = []
+    while not wall_times or (sum(wall_times) < MIN_TIME and len(wall_times) < MAX_REPEAT):
+        state = setup()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        function(state)
+        wall_times.append(time.perf_counter() - start_wall)
+        cpu_times.append(time.process_time() - start_cpu)
+
+    peak_memory = None
+    if memory:
+        import tracemalloc
+
+        state = setup()
+        tracemalloc.start()
+        function(state)
+        peak_memory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    wall_time = min(wall_times)
+    return {**case, 'status': 'ok', 'wall_time': wall_time, 'cpu_time': min(cpu_times),
+            'events_per_second': case['num_events'] / wall_time if wall_time > 0 else None,
+            'peak_memory_mb': peak_memory, 'repeats': len(wall_times)}
+
+
+def _run_case_in_process(case: dict, memory: bool, timeout: float) -> dict:
+    import subprocess
+
+    command = [sys.executable, os.path.abspath(__file__), 'case', json.dumps(case)]
+    if not memory:
+        command.append('--no-memory')
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {**case, 'status': 'timeout'}
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()
+        return {**case, 'status': 'error', 'error': error[-1] if error else f'код {process.returncode}'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run(cases: list[dict], memory: bool = True, max_seconds: float = MAX_SECONDS, verbose: bool = True) -> dict:
+    """
+    Выполняет случаи, каждый в отдельном процессе
+
+    Случай, который дольше max_seconds (или не уложился в 4 * max_seconds вместе с подготовкой),
+    отменяет случаи с большим количеством событий и теми же остальными осями - они отмечаются 'skipped'
+
+    """
+    import platform
+
+    import numpy as np
+
+    results = []
+    too_slow = set()
+    for number, case in enumerate(cases, 1):
+        key = (case['benchmark'], case['type_system'], case['num_smo'], case['engine'])  # без количества событий
+        if key in too_slow:
+            result = {**case, 'status': 'skipped'}
+        else:
+            result = _run_case_in_process(case, memory, 4 * max_seconds)
+            if result['status'] != 'ok' or result['wall_time'] > max_seconds:
+                too_slow.add(key)
+        results.append(result)
+        if verbose:
+            print(f'[{number}/{len(cases)}] {_format_result(result)}', flush=True)
+    return {
+        'meta': {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                 'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor(),
+                 'cpu_count': os.cpu_count(), 'seed': SEED, 'load': LOAD},
+        'results': results,
+    }
+
+
+def _format_case(case: dict) -> str:
+    axes = BENCHMARKS[case['benchmark']]
+    return f'{case["benchmark"]}(' + ', '.join(f'{axis}={case[axis]}' for axis in axes) + ')'
+
+
+def _format_result(result: dict) -> str:
+    if result['status'] != 'ok':
+        return f'{_format_case(result)}: {result["status"]} {result.get("error", "")}'.rstrip()
+    text = f'{_format_case(result)}: {result["wall_time"]:.4g} с, {result["events_per_second"]:.4g} событий/с'
+    if result['peak_memory_mb'] is not None:
+        text += f', {result["peak_memory_mb"]:.4g} МБ'
+    return text
+
+
+def save(report: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=1)
+
+
+def load(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(baseline: dict, current: dict, threshold: float = THRESHOLD) -> list[str]:
+    """
+    Регрессии current относительно baseline
+
+    Регрессия - время или пиковая память больше базовых более чем в 1 + threshold раз
+    (для времени - и больше чем на MIN_DIFF_SECONDS), или случай, который в базе выполнялся, а теперь нет
+
+    """
+    base = {get_case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = base.get(get_case_key(result))
+        if old is None or old['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f'{_format_case(result)}: {result["status"]}, в базе {old["wall_time"]:.4g} с')
+            continue
+        if (result['wall_time'] > old['wall_time'] * (1 + threshold)
+                and result['wall_time'] - old['wall_time'] > MIN_DIFF_SECONDS):
+            regressions.append(f'{_format_case(result)}: время {old["wall_time"]:.4g} -> {result["wall_time"]:.4g} с'
+                               f' (x{result["wall_time"] / old["wall_time"]:.2f})')
+        if (old['peak_memory_mb'] and result['peak_memory_mb'] is not None
+                and result['peak_memory_mb'] > old['peak_memory_mb'] * (1 + threshold)):
+            regressions.append(f'{_format_case(result)}: память {old["peak_memory_mb"]:.4g} -> '
+                               f'{result["peak_memory_mb"]:.4g} МБ')
+    return regressions
+
+
+def get_speedups(report: dict, baseline: str = 'list') -> list[str]:
+    """Во сколько раз start_system движков быстрее движка baseline при тех же type_system, num_smo, num_events"""
+    times = {}
+    for result in report['results']:
+        if result['benchmark'] == 'start_system' and result['status'] == 'ok':
+            times.setdefault(get_case_key(result)[1:4], {})[result['engine']] = result['wall_time']
+    lines = []
+    for (type_system, num_smo, num_events), engines in sorted(times.items()):
+        if baseline not in engines:
+            continue
+        speedups = ', '.join(f'{engine} x{engines[baseline] / wall_time:.3g}'
+                             for engine, wall_time in engines.items() if engine != baseline)
+        lines.append(f'type_system={type_system}, num_smo={num_smo}, num_events={num_events}: {speedups}')
+    return lines
+
+
+def _get_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Замеры производительности моделирования и отчета')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='выполнить замеры и сохранить JSON')
+    run_parser.add_argument('--output', default='benchmark.json', help='файл результатов')
+    run_parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), help='замеры')
+    run_parser.add_argument('--events', nargs='+', type=int, default=EVENT_COUNTS, help='количества событий')
+    run_parser.add_argument('--devices', nargs='+', type=int, default=DEVICE_COUNTS, help='количества приборов')
+    run_parser.add_argument('--types', nargs='+', type=int, default=TYPE_SYSTEMS, help='типы систем')
+    run_parser.add_argument('--engines', nargs='+', default=ENGINES, help='движки')
+    run_parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS,
+                            help='случай дольше этого отменяет случаи с большим количеством событий')
+    run_parser.add_argument('--no-memory', action='store_true', help='не замерять пиковую память')
+
+    compare_parser = commands.add_parser('compare', help='сравнить результаты с базой')
+    compare_parser.add_argument('baseline', help='файл базы')
+    compare_parser.add_argument('current', help='файл новых результатов')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD, help='допустимое замедление, доля')
+
+    speedup_parser = commands.add_parser('speedup', help='ускорение движков относительно базового')
+    speedup_parser.add_argument('results', help='файл результатов')
+    speedup_parser.add_argument('--baseline', default='list', help='базовый движок')
+
+    case_parser = commands.add_parser('case', help='один случай в текущем процессе, результат - JSON')
+    case_parser.add_argument('case', help='случай в JSON')
+    case_parser.add_argument('--no-memory', action='store_true')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _get_parser().parse_args(argv)
+    if args.command == 'case':
+        print(json.dumps(run_case(json.loads(args.case), not args.no_memory)))
+    elif args.command == 'run':
+        cases = get_cases(args.benchmarks, args.events, args.devices, args.types, args.engines)
+        save(run(cases, not args.no_memory, args.max_seconds), args.output)
+    elif args.command == 'speedup':
+        for line in get_speedups(load(args.results), args.baseline):
+            print(line)
+    else:
+        regressions = compare(load(args.baseline), load(args.current), args.threshold)
+        for regression in regressions:
+            print(regression)
+        print(f'Регрессий: {len(regressions)}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
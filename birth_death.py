@@ -0,0 +1,134 @@
+"""
+Моделирование СМО (M|M|n) как процесса рождения и гибели
+
+- моделируется только число заявок в СМО k: без приборов, заявок и таблиц
+- моделируется вложенная цепь скачков: каждый шаг - событие, в состоянии k с вероятностью
+  lambd / (lambd + mu * min(k, n)) приходит заявка, иначе уходит; время в состоянии k показательное
+  с интенсивностью lambd + mu * min(k, n), как и в Controller_SMO. Пустых шагов нет, поэтому стоимость
+  события не зависит от загрузки
+- вероятность скачка зависит от текущего состояния, поэтому сама цепь считается простым циклом Python
+  по блоку случайных чисел; длительности пребывания, частоты состояний по событиям (как get_frequency_table)
+  и доли времени в состояниях (сравниваются с solution.get_vector_r) считаются по блоку операциями NumPy
+- событие стоит около 0.25 мкс (замерено при загрузке 0.1 и 0.9 для n = 1..1000): в 20-35 раз меньше, чем
+  у Controller_SMO_heap, но всего в 2-7 раз меньше, чем у Controller_SMO_numpy (в 2 раза при n = 1),
+  и это только число заявок в СМО, без таблиц для отчета
+
+"""
+import numpy as np
+
+BLOCK_SIZE = 8192
+
+
+def _scan(k: int, num_smo: int, arrival_probabilities: list[float], uniforms: np.ndarray) -> list[int]:
+    """
+    Состояния после скачков из состояния k
+
+    arrival_probabilities[k] - вероятность прихода заявки в состоянии k для k = 0..num_smo (дальше не меняется)
+    """
+    high = arrival_probabilities[num_smo]
+    states = []
+    append = states.append
+    for uniform in uniforms.tolist():
+        if uniform < (arrival_probabilities[k] if k < num_smo else high):
+            k += 1
+        else:
+            k -= 1
+        append(k)
+    return states
+
+
+class BirthDeathChain:
+    """
+
+    Процесс рождения и гибели СМО (M|M|n)
+
+    Атрибуты
+    --------
+    num_smo : int
+            Количество приборов
+    lambd, mu : float
+            Интенсивности потока заявок и обслуживания
+    rng : np.random.Generator
+            Генератор случайных чисел
+    state : int (default 0)
+            Число заявок в СМО
+    time : float (default 0.)
+            Момент последнего события
+    num_events : int (default 0)
+            Количество событий (приход или уход заявки)
+    sum_status : int (default 0)
+            Сумма состояний СМО после событий
+    state_counts : np.ndarray
+            Количество событий, после которых СМО находилась в состоянии k
+    state_time : np.ndarray
+            Время пребывания СМО в состоянии k
+
+    """
+
+    def __init__(self, num_smo: int, lambd: float, mu: float, rng: np.random.Generator | None = None):
+        if num_smo < 1:
+            raise Exception('Количество приборов должно быть не меньше 1')
+        self.num_smo = num_smo
+        self.lambd = lambd
+        self.mu = mu
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.state = 0
+        self.time = 0.
+        self.num_events = 0
+        self.sum_status = 0
+        self.state_counts = np.zeros(1, dtype=np.int64)
+        self.state_time = np.zeros(1)
+        # интенсивность выхода из состояния k = 0..num_smo, дальше не меняется
+        self._rates = lambd + mu * np.arange(num_smo + 1)
+        self._arrival_probabilities = (lambd / self._rates).tolist()
+
+    def __repr__(self):
+        return f'BirthDeathChain(num_smo={self.num_smo}, lambd={self.lambd}, mu={self.mu}, ' \
+               f'событий: {self.num_events}, состояние: {self.state})'
+
+    def start_system(self, num_event: int):
+        """Моделирует num_event событий из пустой СМО"""
+        self.continue_system(num_event)
+
+    def continue_system(self, num_event: int):
+        """Продолжает моделирование до события с номером num_event"""
+        while self.num_events < num_event:
+            uniforms = self.rng.random(min(BLOCK_SIZE, num_event - self.num_events))
+            states = np.array(_scan(self.state, self.num_smo, self._arrival_probabilities, uniforms), dtype=np.int64)
+            self._add_events(states)
+
+    def _add_events(self, states: np.ndarray):
+        before = np.concatenate(([self.state], states[:-1]))
+        durations = self.rng.standard_exponential(len(states)) / self._rates[np.minimum(before, self.num_smo)]
+        size = max(len(self.state_counts), int(states.max()) + 1)
+        if size > len(self.state_counts):
+            self.state_counts = np.pad(self.state_counts, (0, size - len(self.state_counts)))
+            self.state_time = np.pad(self.state_time, (0, size - len(self.state_time)))
+        self.state_counts += np.bincount(states, minlength=size)
+        self.state_time += np.bincount(before, weights=durations, minlength=size)
+        self.time += float(durations.sum())
+        self.num_events += len(states)
+        self.sum_status += int(states.sum())
+        self.state = int(states[-1])
+
+    def get_frequency_table(self) -> list[float]:
+        """Доли событий, после которых СМО находилась в состоянии k (как Controller_SMO.get_frequency_table)"""
+        return (self.state_counts / self.num_events).tolist()
+
+    def get_state_probabilities(self) -> list[float]:
+        """Доли времени пребывания в состоянии k, оценка r_k (solution.get_vector_r)"""
+        return (self.state_time / self.time).tolist()
+
+    def get_mean_status(self) -> float:
+        """Среднее число заявок в СМО по событиям (как в таблице 5)"""
+        return self.sum_status / self.num_events
+
+
+def simulate_birth_death(num_events: int, parameters=None, seed=None) -> BirthDeathChain:
+    """Моделирует num_events событий СМО (M|M|n) с параметрами parameters (default constants)"""
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    chain = BirthDeathChain(parameters.num_smo, parameters.lambd, parameters.mu, np.random.default_rng(seed))
+    chain.start_system(num_events)
+    return chain
@@ -0,0 +1,66 @@
+"""
+Доверительные интервалы для среднего по независимым наблюдениям
+
+Квантиль распределения Стьюдента находится бисекцией по точной функции распределения
+для целого числа степеней свободы (Абрамовиц, Стиган 26.7.3, 26.7.4)
+
+"""
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+CONFIDENCE_LEVEL = 0.95
+
+
+def student_cdf(t: float, df: int) -> float:
+    """Функция распределения Стьюдента с df степенями свободы"""
+    theta = math.atan(abs(t) / math.sqrt(df))
+    sin, cos2 = math.sin(theta), math.cos(theta) ** 2
+    if df % 2:  # нечетное число степеней свободы
+        term, total = math.cos(theta), 0.
+        for k in range(1, (df - 1) // 2 + 1):
+            total += term
+            term *= cos2 * 2 * k / (2 * k + 1)
+        a = 2 / math.pi * (theta + sin * total) if df > 1 else 2 * theta / math.pi
+    else:
+        term, total = 1., 0.
+        for k in range(1, df // 2 + 1):
+            total += term
+            term *= cos2 * (2 * k - 1) / (2 * k)
+        a = sin * total
+    return 0.5 + math.copysign(a / 2, t)
+
+
+def student_quantile(p: float, df: int) -> float:
+    """Квантиль уровня p распределения Стьюдента с df степенями свободы"""
+    if df > 1000:
+        return NormalDist().inv_cdf(p)
+    lo, hi = -1., 1.
+    while student_cdf(lo, df) > p:
+        lo *= 2
+    while student_cdf(hi, df) < p:
+        hi *= 2
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if student_cdf(mid, df) < p:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def mean_confidence_interval(values, level: float = CONFIDENCE_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Среднее и полуширина доверительного интервала по первой оси values
+
+    Для одного наблюдения полуширина равна inf
+
+    """
+    values = np.asarray(values, dtype=float)
+    count = values.shape[0]
+    mean = values.mean(axis=0)
+    if count < 2:
+        return mean, np.full_like(mean, np.inf)
+    std = values.std(axis=0, ddof=1)
+    return mean, student_quantile((1 + level) / 2, count - 1) * std / math.sqrt(count)
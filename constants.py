@@ -1,3 +1,4 @@
+from collections import namedtuple
 
 NUM_FOR_ROUND = 5
 NUM_EVENTS = 100
@@ -8,6 +9,8 @@ DELTA_T = None  # время между приходом заявок
 LAMBD = None
 MU = None  # параметр показательного распределения
 
+Parameters = namedtuple('Parameters', ['num_smo', 'service_time', 'delta_t', 'lambd', 'mu'])
+
 
 def set_constants(num_smo, service_time, delta_t, lambd, mu):
     """Устанавливает значения констант."""
@@ -17,3 +20,8 @@ def set_constants(num_smo, service_time, delta_t, lambd, mu):
     DELTA_T = delta_t
     LAMBD = lambd
     MU = mu
+
+
+def get_parameters() -> Parameters:
+    """Возвращает текущие значения констант."""
+    return Parameters(NUM_SMO, SERVICE_TIME, DELTA_T, LAMBD, MU)
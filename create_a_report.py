@@ -1,16 +1,25 @@
-from docx import Document
-from docx.shared import Inches
+import os
 
-from Application import Application
-from Event import Event
-
-from constants import set_constants as set_c
-from solution import event_handler, get_data_for_an_calc
+from ColumnarTable import ColumnarTable
+from constants import Parameters, set_constants as set_c
+from result_cache import ResultCache, arrays_to_results, get_key, results_to_arrays
+from solution import event_handler, get_data_for_an_calc_from_results, get_results_for_an_calc
 from get_data import get_conditions
-from work_with_document import fill_table_for_report, fill_table_analysis_of_calculations
+from instrumentation import Metrics, phase
+
+REPORT_NAMES = {  # имя отчета по умолчанию для каждого формата
+    'docx': 'Report.doc',
+    'csv': 'Report_csv',
+    'html': 'Report.html',
+    'markdown': 'Report.md',
+}
 
 
-def write_report_on_task(n_task: int, document, tables: list[[list[Application] | list[Event]]], conditions: str):
+def write_report_on_task(n_task: int, document, tables: list[ColumnarTable], conditions: str, verbose: bool = True,
+                         metrics: Metrics | None = None):
+    from docx.shared import Inches
+    from work_with_document import fill_table_for_report
+
     document.add_heading(f' Задание {n_task + 1}', 2)
     document.add_paragraph(conditions)
     dic = {
@@ -20,41 +29,143 @@ def write_report_on_task(n_task: int, document, tables: list[[list[Application]
     }
     document.add_paragraph(dic[n_task+1])
     widths = (Inches(0.4), Inches(1), Inches(0.3), Inches(0.3), Inches(1), Inches(1), Inches(0.3))
-    fill_table_for_report(document, tables[0], widths)
+    with phase(metrics, 'tables'):
+        fill_table_for_report(document, tables[0], widths)
     document.add_paragraph(f'Таблица 2')
     widths = (Inches(0.4), Inches(1), Inches(0.3), Inches(0.3), Inches(1), Inches(1), Inches(0.3))
-    fill_table_for_report(document, tables[1], widths)
-    print(f'Выполнил задачу № {n_task + 1}')
+    with phase(metrics, 'tables'):
+        fill_table_for_report(document, tables[1], widths)
+    if verbose:
+        print(f'Выполнил задачу № {n_task + 1}')
+
+
+def get_data_for_task(n_task: int, cache: ResultCache | None = None, engine: str = 'list', parameters=None,
+                      num_events: int | None = None, directory: str = '', metrics: Metrics | None = None,
+                      seed=None) -> tuple:
+    """
+
+    Таблицы 1, 2 и данные для аналитического раздела одной СМО, из кэша, если они там есть
+
+    parameters (constants.Parameters) и num_events задаются явно или берутся из constants,
+    directory - каталог файла выборки table1_task{n}.txt, metrics - профилирование (instrumentation)
+    seed (SeedSequence варианта) - времена берутся из его потомка n_task (seeds), файл выборки не нужен
 
+    """
+    from constants import NUM_EVENTS, get_parameters
 
-def get_data_for_report() -> tuple:
+    parameters = get_parameters() if parameters is None else parameters
+    num_events = NUM_EVENTS if num_events is None else num_events
+    if seed is not None:
+        from seeds import get_child, to_metadata
+        seed = get_child(seed, n_task)
+        f_name, seed_metadata = None, to_metadata(seed)
+    else:
+        f_name, seed_metadata = os.path.join(directory, f'table1_task{n_task}.txt'), None
+    if cache is not None and (f_name is None or os.path.exists(f_name)):
+        with phase(metrics, 'cache'):
+            arrays = cache.get(get_key(parameters, n_task, num_events, engine, f_name, seed_metadata))
+        if arrays is not None:
+            return arrays_to_results(arrays)
+
+    smo, tables = event_handler(n_task, engine, parameters=parameters, num_events=num_events, directory=directory,
+                                metrics=metrics, seed=seed)
+    with phase(metrics, 'analysis'):
+        results = get_results_for_an_calc(smo)
+    if cache is not None:  # ключ считается после моделирования, когда файл выборки уже записан
+        with phase(metrics, 'cache'):
+            cache.put(get_key(parameters, n_task, num_events, engine, f_name, seed_metadata),
+                      results_to_arrays(tables, results))
+    return tables, results
+
+
+def get_data_for_report(cache: ResultCache | None = None, parameters=None, num_events: int | None = None,
+                        directory: str = '', engine: str = 'list', metrics: Metrics | None = None,
+                        seed=None) -> tuple:
     """  Получает данные для заполнения таблиц 1, 2 для задач 1, 2, 3, 4  """
 
-    smo1, tables_task_1 = event_handler(1)
-    smo2, tables_task_2 = event_handler(2)
-    smo3, tables_task_3 = event_handler(3)
-    analytic_calc = get_data_for_an_calc([smo1, smo2, smo3])
+    tables_task_1, results_1 = get_data_for_task(1, cache, engine, parameters, num_events, directory, metrics, seed)
+    tables_task_2, results_2 = get_data_for_task(2, cache, engine, parameters, num_events, directory, metrics, seed)
+    tables_task_3, results_3 = get_data_for_task(3, cache, engine, parameters, num_events, directory, metrics, seed)
+    with phase(metrics, 'analysis'):
+        analytic_calc = get_data_for_an_calc_from_results([results_1, results_2, results_3], parameters)
     return tables_task_1, tables_task_2, tables_task_3, analytic_calc
 
 
-def create_report(variant, path_to_cond='lab_3.txt', doc_name='Report.doc'):
-    """Заполняет черновую версию в файл doc_name"""
-    data = get_conditions(variant, path_to_cond)
-    variant = data.variant
-    name = data.name
-    set_c(*data.data)
-    data_for_report = get_data_for_report()
+def get_conditions_text(variant, parameters: Parameters) -> str:
+    """Строка условий варианта для отчета"""
+    num_smo, service_time, delta_t, lambd, mu = parameters
+    return f'Вариант №{variant}\n кол-во СМО = {num_smo},T об={service_time}, Tз={delta_t} lambda={lambd}, mu = {mu}'
 
-    from constants import NUM_SMO, SERVICE_TIME, DELTA_T, LAMBD, MU
 
-    conditions = f'Вариант №{variant}\n кол-во СМО = {NUM_SMO},T об={SERVICE_TIME}, Tз={DELTA_T} lambda={LAMBD}, mu = {MU}'
-    print(conditions)
+def write_variant_report(condition, doc_name: str, cache: ResultCache | None = None, backend: str = 'docx',
+                         num_events: int | None = None, directory: str = '', engine: str = 'list',
+                         verbose: bool = True, metrics: Metrics | None = None, seed=None):
+    """
 
-    document = Document()
-    document.add_paragraph(name)
-    document.add_paragraph(conditions)
-    for i in range(3):
-        write_report_on_task(i, document, data_for_report[i], conditions)
-    analytic_calc = data_for_report[3]
-    fill_table_analysis_of_calculations(document, analytic_calc)
-    document.save(doc_name)
+    Моделирует три СМО варианта condition (get_data.Condition) и записывает отчет в doc_name
+
+    Параметры варианта передаются явно, глобальные константы (constants) не меняются,
+    файлы выборки table1_task{n}.txt лежат в каталоге directory.
+    Если задан seed (целое число или SeedSequence), вместо файлов выборки в directory пишется seeds.SEED_FILE -
+    по нему отчет повторяется (seed=seeds.load_seed(...))
+
+    """
+    if backend not in REPORT_NAMES:
+        raise Exception(f'Неизвестный формат отчета {backend}, допустимы {list(REPORT_NAMES)}')
+    parameters = Parameters(*condition.data)
+    if seed is not None:
+        from seeds import SEED_FILE, save_seed, to_seed_sequence
+        seed = to_seed_sequence(seed)
+        save_seed(os.path.join(directory, SEED_FILE), seed)
+    data_for_report = get_data_for_report(cache, parameters, num_events, directory, engine, metrics, seed)
+
+    conditions = get_conditions_text(condition.variant, parameters)
+    if verbose:
+        print(conditions)
+
+    if backend != 'docx':
+        from report_backends import write_report
+        with phase(metrics, 'render'):
+            write_report(data_for_report, doc_name, backend, condition.name, conditions)
+        return
+
+    from docx import Document
+    from work_with_document import fill_table_analysis_of_calculations
+
+    with phase(metrics, 'render'):
+        document = Document()
+        document.add_paragraph(condition.name)
+        document.add_paragraph(conditions)
+        for i in range(3):
+            write_report_on_task(i, document, data_for_report[i], conditions, verbose, metrics)
+        analytic_calc = data_for_report[3]
+        fill_table_analysis_of_calculations(document, analytic_calc)
+    with phase(metrics, 'save'):
+        document.save(doc_name)
+
+
+def create_report(variant, path_to_cond='lab_3.txt', doc_name: str | None = None, cache_dir: str | None = None,
+                  backend: str = 'docx', metrics: Metrics | None = None, seed=None) -> Metrics | None:
+    """
+
+    Заполняет черновую версию в файл doc_name
+
+    cache_dir - каталог кэша результатов (result_cache), None - моделировать заново
+    backend - формат отчета: 'docx' (Word) или 'csv', 'html', 'markdown' (report_backends, без python-docx),
+    doc_name по умолчанию берется из REPORT_NAMES
+    metrics - профилирование по этапам и счетчики (instrumentation.Metrics), возвращается после заполнения
+    seed - начальное значение генераторов вместо файлов выборки table1_task{n}.txt (write_variant_report)
+
+    Для многих вариантов сразу - batch.create_reports
+
+    """
+    if backend not in REPORT_NAMES:
+        raise Exception(f'Неизвестный формат отчета {backend}, допустимы {list(REPORT_NAMES)}')
+    if doc_name is None:
+        doc_name = REPORT_NAMES[backend]
+    data = get_conditions(variant, path_to_cond)
+    set_c(*data.data)
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    with phase(metrics, 'create_report'):
+        write_variant_report(data, doc_name, cache, backend, metrics=metrics, seed=seed)
+    return metrics
@@ -0,0 +1,141 @@
+"""
+Ансамбль независимых копий СМО, моделируемых одновременно, для нестационарных вероятностей состояний
+
+- get_frequency_table дает частоты состояний по одной траектории; здесь оценивается P(в СМО k заявок в момент t)
+  на сетке моментов times по num_replications копиям, все начинают с пустой СМО в момент 0
+- состояние ансамбля хранится массивами по копиям (struct-of-arrays): free_time[r, i] - момент освобождения
+  прибора i в копии r, next_arrival[r] - момент прихода следующей заявки
+- копии продвигаются в ногу (lockstep) по номеру заявки: j-я заявка всех копий обслуживается одной операцией NumPy
+  (рекурсия Кифера-Вольфовица: заявка занимает прибор, который освобождается раньше, дисциплина FIFO),
+  цикл Python идет только по номерам заявок, пока все копии не выйдут за последний момент сетки
+- заявка находится в СМО на моментах сетки от прихода до ухода, поэтому число заявок на сетке накапливается
+  разностным массивом (+1 при приходе, -1 при уходе) через bincount, без циклов по копиям и моментам;
+  длина очереди - max(k - n, 0), число занятых приборов - min(k, n)
+
+"""
+import numpy as np
+
+from confidence import CONFIDENCE_LEVEL, mean_confidence_interval
+from sampler import Distribution, get_distributions
+
+NUM_REPLICATIONS = 10000
+CHUNK = 128  # заявок на один вызов генератора и одно накопление разностного массива
+
+
+class LockstepEnsemble:
+    """
+
+    Ансамбль копий СМО с num_smo приборами
+
+    Атрибуты
+    --------
+    num_smo : int
+            Количество приборов
+    arrival, service : Distribution
+            Распределения времени между заявками и времени обслуживания
+    times : np.ndarray
+            Неубывающая сетка моментов, на которых записывается состояние
+    num_replications : int (default NUM_REPLICATIONS)
+            Количество копий
+    free_time : np.ndarray
+            Момент освобождения прибора i в копии r, форма (num_replications, num_smo)
+    next_arrival : np.ndarray
+            Момент прихода следующей заявки в копии r
+    num_applications : int (default 0)
+            Количество заявок, пришедших в каждую копию
+
+    """
+
+    def __init__(self, num_smo: int, arrival: Distribution, service: Distribution, times,
+                 num_replications: int = NUM_REPLICATIONS, seed=None):
+        from seeds import ARRIVALS, SERVICES, get_generator, to_seed_sequence
+
+        if num_smo < 1:
+            raise Exception('Количество приборов должно быть не меньше 1')
+        self.times = np.asarray(times, dtype=float)
+        if self.times.ndim != 1 or not len(self.times) or np.any(np.diff(self.times) < 0):
+            raise Exception('Сетка моментов должна быть непустой и неубывающей')
+        self.num_smo = num_smo
+        self.arrival = arrival
+        self.service = service
+        self.num_replications = num_replications
+        seed_sequence = to_seed_sequence(seed)
+        self._arrival_rng = get_generator(seed_sequence, ARRIVALS)
+        self._service_rng = get_generator(seed_sequence, SERVICES)
+        self.free_time = np.zeros((num_replications, num_smo))
+        self.next_arrival = arrival.sample(self._arrival_rng, num_replications)
+        self.num_applications = 0
+        # _changes[g, r] - изменение числа заявок копии r на момент сетки g, строка len(times) - после сетки
+        self._changes = np.zeros((len(self.times) + 1, num_replications), dtype=np.int64)
+
+    def __repr__(self):
+        return f'LockstepEnsemble(num_smo={self.num_smo}, {self.arrival}, {self.service}, ' \
+               f'копий: {self.num_replications}, заявок: {self.num_applications})'
+
+    def run(self):
+        """Моделирует копии, пока следующая заявка каждой из них не придет позже последнего момента сетки"""
+        end = self.times[-1]
+        rows = np.arange(self.num_replications)
+        while self.next_arrival.min() <= end:
+            interarrival = self.arrival.sample(self._arrival_rng, CHUNK * self.num_replications)
+            service = self.service.sample(self._service_rng, CHUNK * self.num_replications)
+            interarrival = interarrival.reshape(CHUNK, self.num_replications)
+            service = service.reshape(CHUNK, self.num_replications)
+            arrivals = np.empty((CHUNK, self.num_replications))
+            departures = np.empty((CHUNK, self.num_replications))
+            num_done = 0
+            while num_done < CHUNK and self.next_arrival.min() <= end:
+                device = self.free_time.argmin(axis=1)
+                start = np.maximum(self.next_arrival, self.free_time[rows, device])
+                departures[num_done] = start + service[num_done]
+                self.free_time[rows, device] = departures[num_done]
+                arrivals[num_done] = self.next_arrival
+                self.next_arrival = self.next_arrival + interarrival[num_done]
+                num_done += 1
+            self._add_applications(arrivals[:num_done], departures[:num_done])
+        return self
+
+    def _add_applications(self, arrivals: np.ndarray, departures: np.ndarray):
+        """Учитывает заявки с моментами прихода и ухода формы (заявки, копии) в разностном массиве"""
+        size = self._changes.size
+        columns = np.arange(self.num_replications)
+        # заявка в СМО на моментах t с arrival <= t < departure
+        begin = np.searchsorted(self.times, arrivals, side='left') * self.num_replications + columns
+        finish = np.searchsorted(self.times, departures, side='left') * self.num_replications + columns
+        self._changes += (np.bincount(begin.ravel(), minlength=size)
+                          - np.bincount(finish.ravel(), minlength=size)).reshape(self._changes.shape)
+        self.num_applications += len(arrivals)
+
+    def get_states(self) -> np.ndarray:
+        """Число заявок в СМО копии r в момент times[g], форма (len(times), num_replications)"""
+        return np.cumsum(self._changes[:-1], axis=0)
+
+    def get_state_probabilities(self) -> np.ndarray:
+        """Доли копий, в которых в момент times[g] находится k заявок, форма (len(times), наибольшее k + 1)"""
+        states = self.get_states()
+        num_states = int(states.max()) + 1
+        offsets = np.arange(len(self.times))[:, None] * num_states
+        counts = np.bincount((states + offsets).ravel(), minlength=len(self.times) * num_states)
+        return counts.reshape(len(self.times), num_states) / self.num_replications
+
+    def get_mean_status(self, level: float = CONFIDENCE_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+        """Среднее число заявок в СМО в моменты times и полуширина доверительного интервала"""
+        return mean_confidence_interval(self.get_states().T, level)
+
+    def get_mean_queue(self, level: float = CONFIDENCE_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+        """Средняя длина очереди в моменты times и полуширина доверительного интервала"""
+        return mean_confidence_interval(np.maximum(self.get_states() - self.num_smo, 0).T, level)
+
+    def get_busy_share(self) -> np.ndarray:
+        """Средняя доля занятых приборов в моменты times"""
+        return np.minimum(self.get_states(), self.num_smo).mean(axis=1) / self.num_smo
+
+
+def simulate_ensemble(type_system: int, times, num_replications: int = NUM_REPLICATIONS, parameters=None,
+                      seed=None) -> LockstepEnsemble:
+    """Моделирует ансамбль СМО типа type_system с параметрами parameters (default constants) на сетке times"""
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    arrival, service = get_distributions(type_system, parameters)
+    return LockstepEnsemble(parameters.num_smo, arrival, service, times, num_replications, seed).run()
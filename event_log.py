@@ -0,0 +1,301 @@
+"""
+Запись таблиц событий и заявок на диск во время моделирования
+
+- строки копятся в буфере из chunk_size строк, заполненный буфер записывает фоновый поток,
+  а моделирование продолжает заполнять второй буфер
+- формат 'npy' - структурированный массив с dtype Event / Application, 'csv' - текст с заголовком
+- записанные таблицы читаются порциями: read_chunks(path, chunk_size) отдает массивы NumPy,
+  не загружая файл целиком
+
+EventLog - ступень между контроллером и StreamingStatistics, поэтому память не зависит от количества событий.
+
+"""
+import csv
+import queue
+import threading
+from collections.abc import Iterator
+
+import numpy as np
+
+from Application import Application
+from Event import Event
+from npy_file import NpyWriter
+
+CHUNK_SIZE = 65536
+FORMATS = ('npy', 'csv')
+
+
+class ChunkWriter:
+    """
+
+    Записывает строки структурированного массива порциями по chunk_size в фоновом потоке
+
+    Атрибуты
+    --------
+    path : str
+            Имя файла
+    dtype : np.dtype
+            Столбцы таблицы
+    chunk_size : int (default CHUNK_SIZE)
+            Количество строк в буфере
+    fmt : str (default 'npy')
+            Формат файла, 'npy' или 'csv'
+    num_rows : int (default 0)
+            Количество добавленных строк
+
+    Буферов два: пока один записывается, заполняется другой. Если запись отстает,
+    append ждет, пока освободится буфер.
+
+    Файл открывается (и перезаписывается) при записи первой порции или при close, поэтому ChunkWriter,
+    замененный загрузкой чекпойнта, не трогает файл, продолженный с чекпойнта.
+    При сериализации все добавленные строки дописываются в файл, а сохраняются имя файла и место,
+    до которого он записан; при загрузке файл открывается на этом месте.
+
+    """
+
+    def __init__(self, path: str, dtype: np.dtype, chunk_size: int = CHUNK_SIZE, fmt: str = 'npy'):
+        if fmt not in FORMATS:
+            raise Exception(f'Неизвестный формат {fmt}, допустимы {FORMATS}')
+        self.path = path
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self.num_rows = 0
+        self._file = None
+        self._start()
+
+    def __repr__(self):
+        return f'ChunkWriter({self.path}, {self.num_rows} строк)'
+
+    def __getstate__(self):
+        if self._size:
+            self._flush()
+        self._full_buffers.join()  # фоновый поток записал все заполненные буферы
+        self._raise_error()
+        state = {name: value for name, value in self.__dict__.items()
+                 if name in ('path', 'dtype', 'chunk_size', 'fmt', 'num_rows')}
+        if self.fmt == 'npy' or self._file is None:
+            state['_file'] = self._file
+        else:
+            self._file.flush()
+            state['_offset'] = self._file.tell()
+        return state
+
+    def __setstate__(self, state: dict):
+        state = state.copy()
+        offset = state.pop('_offset', None)
+        self.__dict__.update(state)
+        if offset is not None:
+            self._file = open(self.path, 'r+', newline='')
+            self._file.seek(offset)
+            self._file.truncate()
+            self._csv = csv.writer(self._file)
+        self._start()
+
+    def _start(self):
+        """Создает буферы и, если файл уже открыт, фоновый поток записи"""
+        self._free_buffers = queue.Queue()
+        for _ in range(2):
+            self._free_buffers.put(np.empty(self.chunk_size, dtype=self.dtype))
+        self._full_buffers = queue.Queue()
+        self._buffer = self._free_buffers.get()
+        self._size = 0
+        self._error: BaseException | None = None
+        self._thread = None
+        if self._file is not None:
+            self._start_thread()
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        """Открывает файл и запускает фоновый поток при первой записи"""
+        if self._file is not None:
+            return
+        if self.fmt == 'npy':
+            self._file = NpyWriter(self.path, self.dtype)
+        else:
+            self._file = open(self.path, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.dtype.names)
+        self._start_thread()
+
+    def append(self, *values):
+        """Добавляет строку, значения идут в порядке столбцов"""
+        self._buffer[self._size] = values
+        self._size += 1
+        self.num_rows += 1
+        if self._size == self.chunk_size:
+            self._flush()
+
+    def close(self):
+        """Записывает оставшиеся строки, дожидается фонового потока и закрывает файл"""
+        self._open()
+        if self._size:
+            self._flush()
+        self._full_buffers.put(None)
+        self._thread.join()
+        self._full_buffers.task_done()
+        self._file.close()
+        self._raise_error()
+
+    def _flush(self):
+        self._raise_error()
+        self._open()
+        self._full_buffers.put((self._buffer, self._size))
+        self._buffer = self._free_buffers.get()
+        self._size = 0
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise Exception(f'Ошибка записи {self.path}') from self._error
+
+    def _write_loop(self):
+        """Фоновый поток: записывает заполненные буферы и возвращает их в оборот"""
+        while (item := self._full_buffers.get()) is not None:
+            buffer, size = item
+            try:
+                if self._error is None:
+                    self._write(buffer[:size])
+            except BaseException as error:
+                self._error = error
+            self._free_buffers.put(buffer)
+            self._full_buffers.task_done()
+
+    def _write(self, rows: np.ndarray):
+        if self.fmt == 'npy':
+            self._file.write(rows)
+        else:
+            self._csv.writerows(rows.tolist())
+
+
+class EventLog:
+    """
+
+    Ступень конвейера, записывающая события и заявки на диск
+
+    Методы add_event, add_application и start_application совпадают с StreamingStatistics,
+    вызовы передаются дальше в next_stage (если он задан).
+    Сохраняется в чекпойнт контроллера вместе с ним: файлы дописываются до текущей строки,
+    при продолжении с чекпойнта запись идет с этого места.
+
+    Атрибуты
+    --------
+    prefix : str
+            Начало имен файлов {prefix}.events.{fmt} и {prefix}.applications.{fmt}
+    events : ChunkWriter
+            Таблица событий
+    applications : ChunkWriter
+            Таблица заявок
+    next_stage : StreamingStatistics | None (default None)
+            Следующая ступень
+    _pending : dict[int, list] (default {})
+            Строки заявок, которые ждут начала обслуживания, и строки после них.
+            Очередь FIFO, поэтому заявки пишутся по порядку номеров, а в памяти остаются только строки очереди
+
+    """
+
+    def __init__(self, prefix: str, chunk_size: int = CHUNK_SIZE, fmt: str = 'npy', next_stage=None):
+        self.prefix = prefix
+        events_path, applications_path = get_log_paths(prefix, fmt)
+        self.events = ChunkWriter(events_path, Event.dtype, chunk_size, fmt)
+        self.applications = ChunkWriter(applications_path, Application.dtype, chunk_size, fmt)
+        self.next_stage = next_stage
+        self._pending: dict[int, list] = {}
+        self._next_app = 1
+
+    def __repr__(self):
+        return f'EventLog({self.prefix}, событий: {self.events.num_rows}, заявок: {self.applications.num_rows})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def attach(self, next_stage):
+        """Задает следующую ступень и возвращает себя"""
+        self.next_stage = next_stage
+        return self
+
+    def add_event(self, *values):
+        """Записывает событие, значения идут в порядке столбцов Event"""
+        self.events.append(*values)
+        if self.next_stage is not None:
+            self.next_stage.add_event(*values)
+
+    def add_application(self, *values):
+        """Записывает поступившую заявку, значения идут в порядке столбцов Application"""
+        if self._pending or values[3] == -1:
+            self._pending[values[0]] = list(values)
+        else:
+            self.applications.append(*values)
+            self._next_app = values[0] + 1
+        if self.next_stage is not None:
+            self.next_stage.add_application(*values)
+
+    def start_application(self, num_app: int, app_time: float, start_service: float, service_time: float):
+        """Дописывает начало обслуживания заявки из очереди"""
+        row = self._pending[num_app]
+        row[3:] = [start_service - app_time, start_service, service_time, start_service + service_time]
+        self._write_started()
+        if self.next_stage is not None:
+            self.next_stage.start_application(num_app, app_time, start_service, service_time)
+
+    def close(self):
+        """Записывает заявки, оставшиеся в очереди, и закрывает файлы"""
+        for num_app in sorted(self._pending):
+            self.applications.append(*self._pending[num_app])
+        self._pending.clear()
+        self.events.close()
+        self.applications.close()
+
+    def _write_started(self):
+        while self._next_app in self._pending and self._pending[self._next_app][3] != -1:
+            self.applications.append(*self._pending.pop(self._next_app))
+            self._next_app += 1
+
+
+def get_log_paths(prefix: str, fmt: str = 'npy') -> tuple[str, str]:
+    """Имена файлов таблицы событий и таблицы заявок"""
+    return f'{prefix}.events.{fmt}', f'{prefix}.applications.{fmt}'
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE, dtype: np.dtype | None = None) -> Iterator[np.ndarray]:
+    """
+    Читает таблицу порциями по chunk_size строк
+
+    .npy открывается через np.memmap, порции - представления без копирования.
+    Для .csv нужен dtype (Event.dtype / Application.dtype), строки разбираются порциями.
+
+    """
+    if path.endswith('.npy'):
+        table = np.load(path, mmap_mode='r')
+        for start in range(0, len(table), chunk_size):
+            yield table[start:start + chunk_size]
+        return
+
+    if dtype is None:
+        raise Exception('Для чтения CSV нужен dtype')
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader)  # заголовок
+        rows = []
+        for row in reader:
+            rows.append(tuple(row))
+            if len(rows) == chunk_size:
+                yield np.array(rows, dtype=dtype)
+                rows = []
+        if rows:
+            yield np.array(rows, dtype=dtype)
+
+
+def read_events(prefix: str, chunk_size: int = CHUNK_SIZE, fmt: str = 'npy') -> Iterator[np.ndarray]:
+    """Порции таблицы событий"""
+    return read_chunks(get_log_paths(prefix, fmt)[0], chunk_size, Event.dtype)
+
+
+def read_applications(prefix: str, chunk_size: int = CHUNK_SIZE, fmt: str = 'npy') -> Iterator[np.ndarray]:
+    """Порции таблицы заявок"""
+    return read_chunks(get_log_paths(prefix, fmt)[1], chunk_size, Application.dtype)
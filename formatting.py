@@ -0,0 +1,71 @@
+"""
+Преобразование чисел и столбцов в строки для отчетов
+
+Не зависит от python-docx, используется и в Word отчете, и в report_backends
+
+"""
+import numpy as np
+
+from constants import NUM_FOR_ROUND
+
+
+def num_to_str(num: float | int, num_for_round=NUM_FOR_ROUND) -> str:
+    """
+
+    Преобразует число в строку округляя до NUM_FOR_ROUND знаков
+
+    Если число -0.1**num_for_round < num < 0.1**num_for_round то возвращает '0'
+
+    """
+
+    if isinstance(num, str):
+        return num
+    else:
+        eps = 0.1 ** num_for_round
+        if -eps < num < eps:
+            return '0'
+        else:
+            return str(np.round(num, num_for_round))
+
+
+def column_to_str(column: np.ndarray, num_for_round=NUM_FOR_ROUND) -> list[str]:
+    """
+
+    Преобразует столбец в строки так же, как num_to_str преобразует каждое число
+
+    -1 в столбце дробных чисел - это отметка "нет значения", она выводится целым числом
+
+    """
+
+    if column.dtype.kind in 'iu':
+        return [str(num) for num in column.tolist()]
+    result = _floats_to_str(column, num_for_round)
+    for i in np.flatnonzero(column == -1).tolist():
+        result[i] = '-1'
+    return result
+
+
+def _floats_to_str(column: np.ndarray, num_for_round=NUM_FOR_ROUND) -> list[str]:
+    eps = 0.1 ** num_for_round
+    result = [str(num) for num in np.round(column, num_for_round).tolist()]
+    for i in np.flatnonzero((-eps < column) & (column < eps)).tolist():
+        result[i] = '0'
+    return result
+
+
+def values_to_str(values: list, num_for_round=NUM_FOR_ROUND) -> list[str | None]:
+    """
+
+    Преобразует столбец значений разных типов так же, как num_to_str преобразует каждое значение
+
+    Дробные числа округляются одним вызовом np.round, строки и None остаются как есть
+
+    """
+
+    result = [value if value is None or isinstance(value, str) else str(value) for value in values]
+    floats = [i for i, value in enumerate(values) if isinstance(value, (float, np.floating))]
+    if floats:
+        for i, text in zip(floats, _floats_to_str(np.array([values[i] for i in floats], dtype=float),
+                                                  num_for_round)):
+            result[i] = text
+    return result
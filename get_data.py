@@ -4,15 +4,21 @@ import os
 
 class Condition:
     """Возвращает данные для отчета"""
-    def __init__(self, num_var: int, f_name: str):
+    def __init__(self, num_var: int, f_name: str, data: dict | None = None):
         self.variant = str(num_var)
-        self.get(f_name)
+        if data is None:
+            self.get(f_name)
+        else:
+            self._set(data)
 
     def get(self, f_name: str):
         if os.path.exists(f_name):
             with open(f_name, 'r') as file:
                 data = json.load(file)
 
+        self._set(data)
+
+    def _set(self, data: dict):
         self.name = data[str(self.variant)][0]
         self.data = data[str(self.variant)][1]
 
@@ -21,4 +27,16 @@ class Condition:
 
 
 def get_conditions(num_var: int, f_name: str):
-    return Condition(num_var, f_name)
\ No newline at end of file
+    return Condition(num_var, f_name)
+
+
+def get_all_conditions(f_name: str, variants=None) -> list[Condition]:
+    """Условия всех вариантов (или только variants), файл читается один раз"""
+    with open(f_name, 'r') as file:
+        data = json.load(file)
+    if variants is None:
+        variants = data
+    unknown = [variant for variant in map(str, variants) if variant not in data]
+    if unknown:
+        raise Exception(f'В {f_name} нет вариантов {unknown}')
+    return [Condition(variant, f_name, data) for variant in variants]
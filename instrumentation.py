@@ -0,0 +1,200 @@
+"""
+Профилирование по этапам и счетчики горячих мест
+
+- Metrics включается явно: контроллер СМО или create_report получают объект Metrics и оборачивают
+  свои методы только тогда, когда он передан, без него код моделирования не меняется и ничего не стоит
+- этапы (phase) - время по часам и процессорное время, количество вызовов, при trace_memory -
+  пиковая память по tracemalloc и снимок памяти в конце этапа
+- счетчики: опросы приборов, операции с очередью, события по типам
+
+Время вложенных этапов входит во время внешних.
+
+"""
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+CONTROLLER_PHASES = {  # метод контроллера: этап
+    'start_system': 'simulation',
+    '_get_selection': 'selection',
+    'simulate': 'kiefer_wolfowitz',  # Controller_SMO_numpy
+}
+CONTROLLER_COUNTERS = {  # метод контроллера: счетчики
+    '_search_free_device': ('device_scans',),
+    '_update_min_app_service_time': ('device_scans',),
+    'service_first_app': ('events_type_1',),
+    '_process_current_app': ('events_type_1',),
+    '_add_app_to_queue': ('events_type_1', 'queue_push'),
+    '_completes_app_processing': ('events_type_2',),
+    '_process_app_from_queue': ('queue_pop',),
+}
+
+
+class PhaseTime:
+    """
+
+    Накопленные показатели этапа
+
+    Атрибуты
+    --------
+    calls : int
+            Количество выполнений
+    wall : float
+            Время по часам, с
+    cpu : float
+            Процессорное время, с
+    peak_memory : int | None
+            Наибольшая выделенная память за время этапа, байт (только при trace_memory)
+
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.
+        self.cpu = 0.
+        self.peak_memory = None
+
+    def __repr__(self):
+        return f'PhaseTime(calls={self.calls}, wall={self.wall:.6f}, cpu={self.cpu:.6f})'
+
+
+class Metrics:
+    """
+
+    Показатели одного запуска
+
+    Атрибуты
+    --------
+    trace_memory : bool (default False)
+            Отслеживать память через tracemalloc (заметно замедляет выполнение)
+    phases : dict[str, PhaseTime]
+            Этапы
+    counters : Counter
+            Счетчики
+    snapshots : dict[str, tracemalloc.Snapshot]
+            Снимок памяти в конце последнего выполнения каждого этапа (только при trace_memory)
+
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases: dict[str, PhaseTime] = {}
+        self.counters = Counter()
+        self.snapshots: dict[str, tracemalloc.Snapshot] = {}
+        self._peaks: list[int] = []  # пики памяти открытых этапов, от внешнего к внутреннему
+        self._started_tracing = False
+
+    def __repr__(self):
+        return f'Metrics(этапов: {len(self.phases)}, счетчиков: {len(self.counters)})'
+
+    @contextmanager
+    def phase(self, name: str):
+        """Замеряет выполнение блока как этап name"""
+        if self.trace_memory:
+            self._start_memory()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+            stats = self.phases.setdefault(name, PhaseTime())
+            stats.calls += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            if self.trace_memory:
+                self.snapshots[name] = tracemalloc.take_snapshot()
+                stats.peak_memory = max(stats.peak_memory or 0, self._stop_memory())
+
+    def _start_memory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._peaks:  # пик внешнего этапа до начала вложенного
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _stop_memory(self) -> int:
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        elif self._started_tracing:  # tracemalloc, запущенный не здесь, не останавливается
+            tracemalloc.stop()
+            self._started_tracing = False
+        return peak
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def wrap_phase(self, obj, method: str, name: str):
+        """Заменяет метод объекта obj (только у этого объекта) на замеряемый как этап name"""
+        function = getattr(obj, method)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+        setattr(obj, method, wrapper)
+
+    def wrap_counters(self, obj, method: str, names: tuple[str, ...]):
+        """Заменяет метод объекта obj (только у этого объекта) на увеличивающий счетчики names при каждом вызове"""
+        function = getattr(obj, method)
+        counters = self.counters
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            for name in names:
+                counters[name] += 1
+            return function(*args, **kwargs)
+        setattr(obj, method, wrapper)
+
+    def instrument_controller(self, smo):
+        """
+        Оборачивает методы контроллера СМО: этапы CONTROLLER_PHASES, счетчики CONTROLLER_COUNTERS
+        и генерацию случайных величин (этап 'random_variates')
+
+        Методы, которых у контроллера нет (например, у Controller_SMO_numpy), пропускаются
+
+        """
+        for method, name in CONTROLLER_PHASES.items():
+            if hasattr(smo, method):
+                self.wrap_phase(smo, method, name)
+        for method, names in CONTROLLER_COUNTERS.items():
+            if hasattr(smo, method):
+                self.wrap_counters(smo, method, names)
+        for sampler in (smo.arrival_sampler, smo.service_sampler):
+            if hasattr(sampler, '_new_block'):
+                self.wrap_phase(sampler, '_new_block', 'random_variates')
+
+    def top_allocations(self, name: str, limit: int = 10) -> list[str]:
+        """Строки кода, выделившие больше всего памяти, по снимку этапа name"""
+        if name not in self.snapshots:
+            return []
+        return [str(stat) for stat in self.snapshots[name].statistics('lineno')[:limit]]
+
+    def to_dict(self) -> dict:
+        return {
+            'phases': {name: {'calls': stats.calls, 'wall': stats.wall, 'cpu': stats.cpu,
+                              'peak_memory': stats.peak_memory} for name, stats in self.phases.items()},
+            'counters': dict(self.counters),
+        }
+
+    def report(self) -> str:
+        """Таблица этапов и счетчиков"""
+        lines = [f'{"Этап":<20}{"Вызовов":>10}{"Время, с":>12}{"CPU, с":>12}{"Память, МБ":>12}']
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].wall):
+            memory = '' if stats.peak_memory is None else f'{stats.peak_memory / 2 ** 20:.2f}'
+            lines.append(f'{name:<20}{stats.calls:>10}{stats.wall:>12.4f}{stats.cpu:>12.4f}{memory:>12}')
+        if self.counters:
+            lines.append('')
+            lines.append(f'{"Счетчик":<20}{"Значение":>10}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{name:<20}{value:>10}')
+        return '\n'.join(lines)
+
+
+def phase(metrics: Metrics | None, name: str):
+    """metrics.phase(name) или пустой контекст, если metrics не задан"""
+    return nullcontext() if metrics is None else metrics.phase(name)
@@ -2,7 +2,7 @@ from create_a_report import create_report
 
 
 def main():
-    create_report(72)
+    create_report(72, cache_dir='.report_cache')
 
 
 if __name__ == '__main__':
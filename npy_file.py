@@ -0,0 +1,78 @@
+"""
+Потоковая запись одномерных массивов в формат .npy
+
+Заголовок имеет фиксированную длину, поэтому длина массива дописывается в него при закрытии,
+а записанный файл читается через np.load(path, mmap_mode='r').
+
+"""
+import numpy as np
+
+_MAGIC = b'\x93NUMPY\x01\x00'
+_MAX_LENGTH_DIGITS = 20
+
+
+def _get_header(dtype: np.dtype, length: int) -> str:
+    descr = np.lib.format.dtype_to_descr(dtype)
+    return f"{{'descr': {descr!r}, 'fortran_order': False, 'shape': ({length},), }}"
+
+
+def get_header_size(dtype) -> int:
+    """Длина заголовка .npy версии 1.0, кратная 64 байтам и достаточная для любой длины массива"""
+    header = _get_header(np.dtype(dtype), 10 ** _MAX_LENGTH_DIGITS)
+    return (len(_MAGIC) + 2 + len(header) + 1 + 63) // 64 * 64
+
+
+def write_npy_header(file, dtype, length: int):
+    """Записывает заголовок .npy версии 1.0 длиной get_header_size(dtype) байт"""
+    header_len = get_header_size(dtype) - len(_MAGIC) - 2
+    header = _get_header(np.dtype(dtype), length).ljust(header_len - 1) + '\n'
+    file.write(_MAGIC + header_len.to_bytes(2, 'little') + header.encode('latin1'))
+
+
+class NpyWriter:
+    """
+
+    Дописывает значения в файл .npy
+
+    Атрибуты
+    --------
+    dtype : np.dtype (default float64)
+            Тип элементов массива
+    length : int (default 0)
+            Количество записанных элементов
+
+    """
+
+    def __init__(self, path: str, dtype='<f8'):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(path, 'wb')
+        write_npy_header(self._file, self.dtype, 0)
+
+    def __getstate__(self):
+        """Вместо открытого файла сохраняется место, до которого он записан"""
+        self._file.flush()
+        state = self.__dict__.copy()
+        del state['_file']
+        state['_offset'] = self._file.tell()
+        return state
+
+    def __setstate__(self, state: dict):
+        """Файл открывается на сохраненном месте, записанное после него отбрасывается"""
+        state = state.copy()
+        offset = state.pop('_offset')
+        self.__dict__.update(state)
+        self._file = open(self.path, 'r+b')
+        self._file.seek(offset)
+        self._file.truncate()
+
+    def write(self, values: np.ndarray):
+        np.asarray(values, dtype=self.dtype).tofile(self._file)
+        self.length += len(values)
+
+    def close(self):
+        """Дописывает длину массива в заголовок и закрывает файл"""
+        self._file.seek(0)
+        write_npy_header(self._file, self.dtype, self.length)
+        self._file.close()
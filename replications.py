@@ -0,0 +1,80 @@
+"""
+Независимые повторения моделирования СМО
+
+- каждое повторение получает свой SeedSequence, порожденный из одного начального seed, с отдельными потоками
+  для времени между заявками и времени обслуживания (seeds)
+- повторения выполняются в пуле процессов (concurrent.futures импортируется только для него)
+- показатели таблиц 3, 5 и частоты состояний усредняются с доверительными интервалами
+
+"""
+import os
+
+import numpy as np
+
+from confidence import CONFIDENCE_LEVEL, mean_confidence_interval
+from seeds import get_samplers
+
+
+def run_replication(type_system: int, parameters, num_events: int, seed_sequence: np.random.SeedSequence,
+                    engine: str = 'list') -> dict[str, np.ndarray]:
+    """Одно повторение: показатели таблиц 3, 5 и частоты состояний"""
+    from solution import get_engine
+
+    samplers = get_samplers(type_system, parameters, seed_sequence)
+    smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers)
+    smo.start_system(num_events)
+    return {
+        'table_3': np.array(smo.get_data_for_report(), dtype=float),
+        'table_5': np.array(smo.get_column_for_table_5(), dtype=float),
+        'frequencies': np.array(smo.get_frequency_table(), dtype=float),
+    }
+
+
+def _run_replication(args) -> dict[str, np.ndarray]:
+    return run_replication(*args)
+
+
+def run_replications(type_system: int, num_replications: int, num_events: int | None = None, seed=None,
+                     parameters=None, engine: str = 'list', processes: int | None = None,
+                     level: float = CONFIDENCE_LEVEL) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Выполняет num_replications независимых повторений и объединяет их
+
+    Возвращает для 'table_3', 'table_5' и 'frequencies' пару (среднее, полуширина доверительного интервала).
+    Частоты состояний дополняются нулями до наибольшего наблюдавшегося состояния.
+    processes=1 выполняет повторения в текущем процессе.
+
+    """
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    if num_events is None:
+        from constants import NUM_EVENTS
+        num_events = NUM_EVENTS
+
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_replications)
+    tasks = [(type_system, parameters, num_events, seed_sequence, engine) for seed_sequence in seed_sequences]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        results = [_run_replication(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # пул нужен не всегда, а его импорт долгий
+
+        with ProcessPoolExecutor(processes) as executor:
+            chunksize = max(1, num_replications // (4 * processes))
+            results = list(executor.map(_run_replication, tasks, chunksize=chunksize))
+
+    return merge_replications(results, level)
+
+
+def merge_replications(results: list[dict[str, np.ndarray]],
+                       level: float = CONFIDENCE_LEVEL) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Средние и полуширины доверительных интервалов по результатам повторений"""
+    num_states = max(len(result['frequencies']) for result in results)
+    frequencies = [np.pad(result['frequencies'], (0, num_states - len(result['frequencies'])))
+                   for result in results]
+    return {
+        'table_3': mean_confidence_interval([result['table_3'] for result in results], level),
+        'table_5': mean_confidence_interval([result['table_5'] for result in results], level),
+        'frequencies': mean_confidence_interval(frequencies, level),
+    }
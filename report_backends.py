@@ -0,0 +1,248 @@
+"""
+Отчет в CSV, HTML или Markdown без python-docx
+
+- содержание то же, что у Word отчета create_report: таблицы 1, 2 каждой СМО и анализ результатов
+- таблицы пишутся порциями по chunk_size строк, числа переводятся в строки по столбцам (formatting),
+  поэтому память не зависит от длины таблиц
+- таблица событий или заявок может быть ColumnarTable, структурированным массивом (в том числе np.memmap)
+  или итератором таких массивов, например event_log.read_events
+
+"""
+import csv
+import html
+import os
+from collections.abc import Iterable, Iterator
+from itertools import chain, zip_longest
+
+import numpy as np
+
+from ColumnarTable import ColumnarTable
+from formatting import column_to_str, num_to_str, values_to_str
+
+CHUNK_SIZE = 65536
+SYSTEM_NAMES = {
+    1: 'Система массового обслуживания (D|M|n).',
+    2: 'Система массового обслуживания (M|D|n).',
+    3: 'Система массового обслуживания (M|M|n).',
+}
+TABLE_3_HEADER = ['Прибор', 'Поступило заявок', 'Время работы', 'Коэффициент простоя']
+TABLE_5_HEADER = ['Показатель', '(D|M|n)', '(M|D|n)', '(M|M|n)']
+TABLE_5_ROWS = ['Поступило заявок', 'Обслужено заявок', 'Среднее число заявок в СМО',
+                'Среднее время ожидания', 'Среднее время обслуживания']
+FREQUENCY_HEADER = ['Состояние', 'Частота']
+FREQUENCY_TASK_3_HEADER = ['Состояние', 'r', 'Частота', 'Отклонение']
+
+
+class ReportWriter:
+    """
+
+    Потоковая запись отчета: заголовки, абзацы и таблицы
+
+    table получает заголовок и итератор порций, порция - список строк таблицы из строк str (пустая ячейка - '')
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def heading(self, text: str, level: int):
+        raise NotImplementedError
+
+    def paragraph(self, text: str):
+        raise NotImplementedError
+
+    def table(self, header: list[str], chunks: Iterable[list[tuple[str, ...]]]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class HtmlWriter(ReportWriter):
+    """Один файл HTML"""
+
+    def __init__(self, path: str, title: str = 'Отчет'):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write(f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+                         f'</head>\n<body>\n')
+
+    def heading(self, text, level):
+        self._file.write(f'<h{level}>{html.escape(text.strip())}</h{level}>\n')
+
+    def paragraph(self, text):
+        self._file.write(f'<p>{"<br>".join(html.escape(line) for line in text.splitlines())}</p>\n')
+
+    def table(self, header, chunks):
+        cells = ''.join(f'<th>{html.escape(name)}</th>' for name in header)
+        self._file.write(f'<table border="1">\n<thead><tr>{cells}</tr></thead>\n<tbody>\n')
+        for rows in chunks:
+            if rows:
+                text = html.escape(_join_rows(rows), quote=False)
+                self._file.write('<tr><td>' + text.replace(_CELL_SEP, '</td><td>').replace(
+                    _ROW_SEP, '</td></tr>\n<tr><td>') + '</td></tr>\n')
+        self._file.write('</tbody>\n</table>\n')
+
+    def close(self):
+        self._file.write('</body>\n</html>\n')
+        self._file.close()
+
+
+class MarkdownWriter(ReportWriter):
+    """Один файл Markdown"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def heading(self, text, level):
+        self._file.write(f'{"#" * level} {text.strip()}\n\n')
+
+    def paragraph(self, text):
+        self._file.write('  \n'.join(text.splitlines()) + '\n\n')
+
+    def table(self, header, chunks):
+        self._file.write(_markdown_row(header) + '|---' * len(header) + '|\n')
+        for rows in chunks:
+            if rows:
+                text = _join_rows(rows).replace('|', '\\|')
+                self._file.write('| ' + text.replace(_CELL_SEP, ' | ').replace(_ROW_SEP, ' |\n| ') + ' |\n')
+        self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+
+_CELL_SEP = '\x00'
+_ROW_SEP = '\x01'
+
+
+def _join_rows(rows: list[tuple[str, ...]]) -> str:
+    """
+
+    Порция строк таблицы одной строкой с разделителями _CELL_SEP и _ROW_SEP
+
+    Экранирование и разметка применяются ко всей порции сразу, а не к каждой ячейке
+
+    """
+    return _ROW_SEP.join(map(_CELL_SEP.join, rows))
+
+
+def _markdown_row(row) -> str:
+    return '| ' + ' | '.join(text.replace('|', '\\|') for text in row) + ' |\n'
+
+
+class CsvWriter(ReportWriter):
+    """
+
+    Каталог: каждая таблица - отдельный файл table_NN.csv, заголовки и абзацы - в report.txt
+    со ссылками на файлы таблиц
+
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self._text = open(os.path.join(path, 'report.txt'), 'w', encoding='utf-8')
+        self._num_tables = 0
+
+    def heading(self, text, level):
+        self._text.write(f'{text.strip()}\n\n')
+
+    def paragraph(self, text):
+        self._text.write(f'{text}\n\n')
+
+    def table(self, header, chunks):
+        self._num_tables += 1
+        name = f'table_{self._num_tables:02d}.csv'
+        self._text.write(f'[{name}]\n\n')
+        with open(os.path.join(self.path, name), 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for rows in chunks:
+                writer.writerows(rows)
+
+    def close(self):
+        self._text.close()
+
+
+FORMATS = {
+    'csv': CsvWriter,
+    'html': HtmlWriter,
+    'markdown': MarkdownWriter,
+}
+
+
+def get_table_chunks(table, chunk_size: int = CHUNK_SIZE) -> tuple[list[str], Iterator[list[tuple[str, ...]]]]:
+    """Заголовок и порции строк таблицы событий или заявок"""
+    if isinstance(table, ColumnarTable):
+        table = table.data
+    if isinstance(table, np.ndarray):
+        arrays = (table[start:start + chunk_size] for start in range(0, len(table), chunk_size))
+        names = list(table.dtype.names)
+    else:
+        arrays = iter(table)
+        first = next(arrays, None)
+        if first is None:
+            return [], iter(())
+        arrays = chain([first], arrays)
+        names = list(first.dtype.names)
+    return names, (list(zip(*(column_to_str(np.asarray(array[name])) for name in names))) for array in arrays)
+
+
+def _get_rows(lines: list[list]) -> list[list[tuple[str, ...]]]:
+    """Одна порция из строк небольшой таблицы, значения переводятся в строки по столбцам"""
+    columns = [['' if text is None else text for text in values_to_str(list(column))]
+               for column in zip_longest(*lines)]
+    return [list(zip(*columns))]
+
+
+def write_analysis(writer: ReportWriter, analytic_calc: list):
+    """Анализ результатов, данные - как у work_with_document.fill_table_analysis_of_calculations"""
+    tables_3, vector_r, table_for_task_5, frequency_tables, frequency_table_task_3 = analytic_calc
+
+    writer.heading('Анализ результатов', 1)
+    for type_system, table in zip(SYSTEM_NAMES, tables_3):
+        writer.paragraph(SYSTEM_NAMES[type_system])
+        writer.table(TABLE_3_HEADER, _get_rows(table))
+        if type_system != 3:
+            writer.paragraph('Относительные частоты пребывания СМО в состояниях')
+            writer.table(FREQUENCY_HEADER, _get_rows(list(enumerate(frequency_tables[type_system - 1]))))
+    writer.paragraph('Задание 5')
+    rows = [[name, *values] for name, values in zip(TABLE_5_ROWS, zip(*table_for_task_5))]
+    writer.table(TABLE_5_HEADER, _get_rows(rows))
+
+    vec_r_text = ", ".join(num_to_str(float(num)) for num in vector_r)
+    writer.paragraph(f'r = ({vec_r_text})')
+    writer.table(FREQUENCY_TASK_3_HEADER, _get_rows(frequency_table_task_3))
+
+
+def write_report(data_for_report: tuple, path: str, fmt: str = 'html', name: str = '', conditions: str = '',
+                 chunk_size: int = CHUNK_SIZE):
+    """
+    Записывает отчет в формате fmt ('csv', 'html', 'markdown')
+
+    data_for_report - результат create_a_report.get_data_for_report: таблицы событий и заявок трех СМО
+    и данные анализа результатов
+
+    """
+    if fmt not in FORMATS:
+        raise Exception(f'Неизвестный формат отчета {fmt}, допустимы {list(FORMATS)}')
+    with FORMATS[fmt](path) as writer:
+        if name:
+            writer.paragraph(name)
+        if conditions:
+            writer.paragraph(conditions)
+        for type_system, tables in zip(SYSTEM_NAMES, data_for_report[:3]):
+            writer.heading(f'Задание {type_system}', 2)
+            writer.paragraph(SYSTEM_NAMES[type_system])
+            for number, table in enumerate(tables, 1):
+                writer.paragraph(f'Таблица {number}')
+                writer.table(*get_table_chunks(table, chunk_size))
+        write_analysis(writer, data_for_report[3])
@@ -0,0 +1,153 @@
+"""
+Кэш результатов моделирования для отчета
+
+- ключ - хэш SHA-256 от параметров варианта, типа системы, количества событий, движка, версии CACHE_VERSION
+  и содержимого файла выборки или метаданных seed (seeds.to_metadata) - они задают случайные времена
+- запись - файл {ключ}.npz с таблицами событий и заявок и данными для аналитического раздела
+- при превышении max_bytes удаляются записи, которые дольше всех не читались (LRU по времени изменения файла)
+- каталогом могут пользоваться несколько процессов сразу (batch): запись атомарна, а запись, удаленная
+  другим процессом, считается отсутствующей
+
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+CACHE_VERSION = 2  # увеличивается, когда меняются результаты моделирования или содержимое записей
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def get_key(parameters, type_system: int, num_events: int, engine: str, selection_path: str | None = None,
+            seed: dict | None = None) -> str:
+    """Ключ записи, файл выборки учитывается по содержимому, seed - метаданные seeds.to_metadata"""
+    digest = hashlib.sha256(json.dumps([CACHE_VERSION, list(parameters), type_system, num_events, engine]).encode())
+    if seed is not None:
+        digest.update(json.dumps(seed, sort_keys=True).encode())
+    if selection_path is not None and os.path.exists(selection_path):
+        with open(selection_path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+
+    Кэш записей {имя: массив NumPy} в каталоге directory
+
+    Атрибуты
+    --------
+    directory : str
+            Каталог кэша
+    max_bytes : int (default MAX_BYTES)
+            Наибольший суммарный размер записей
+
+    """
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f'ResultCache({self.directory}, записей: {len(self._get_entries())})'
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key: str) -> dict[str, np.ndarray] | None:
+        """Запись по ключу или None, если ее нет"""
+        path = self._get_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as file:
+                arrays = {name: file[name] for name in file.files}
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        try:
+            os.utime(path)  # запись использовалась последней
+        except FileNotFoundError:  # запись удалил другой процесс
+            pass
+        return arrays
+
+    def put(self, key: str, arrays: dict[str, np.ndarray]):
+        """Сохраняет запись и удаляет старые записи сверх max_bytes"""
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez_compressed(file, **arrays)
+            os.replace(tmp_path, self._get_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict(self._get_path(key))
+
+    def clear(self):
+        for path, _, _ in self._get_entries():
+            _remove(path)
+
+    def _get_entries(self) -> list[tuple[str, float, int]]:
+        """(путь, время последнего использования, размер) всех записей"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self, keep: str):
+        """Удаляет записи, которые дольше всех не использовались, кроме keep"""
+        entries = sorted(self._get_entries(), key=lambda entry: entry[1])
+        total = sum(entry[2] for entry in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                _remove(path)
+                total -= size
+
+
+def _remove(path: str):
+    """Удаляет файл, если его еще не удалил другой процесс"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_TABLE_3_DTYPE = np.dtype([('number', np.int64), ('num_applications_received', np.int64),
+                           ('operating_time', float), ('downtime_ratio', float)])
+_TABLE_5_DTYPE = np.dtype([('num_apps_received', np.int64), ('num_apps_served', np.int64), ('mean_status', float),
+                           ('mean_queue_time', float), ('mean_service_time', float)])
+
+
+def results_to_arrays(tables, results: dict[str, list]) -> dict[str, np.ndarray]:
+    """Запись кэша из таблиц событий и заявок и результата solution.get_results_for_an_calc"""
+    return {
+        'events': tables[0].data,
+        'applications': tables[1].data,
+        'table_3': np.array([tuple(row) for row in results['table_3']], dtype=_TABLE_3_DTYPE),
+        'table_5': np.array([tuple(results['table_5'])], dtype=_TABLE_5_DTYPE),
+        'frequencies': np.array(results['frequencies'], dtype=float),
+    }
+
+
+def arrays_to_results(arrays: dict[str, np.ndarray]):
+    """Таблицы событий и заявок и данные для аналитического раздела из записи кэша"""
+    from Application import Application
+    from ColumnarTable import ColumnarTable
+    from Event import Event
+
+    tables = [ColumnarTable.from_array(Event, arrays['events']),
+              ColumnarTable.from_array(Application, arrays['applications'])]
+    results = {
+        'table_3': [list(row) for row in arrays['table_3'].tolist()],
+        'table_5': list(arrays['table_5'][0].tolist()),
+        'frequencies': arrays['frequencies'].tolist(),
+    }
+    return tables, results
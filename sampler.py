@@ -0,0 +1,306 @@
+"""
+Генерация случайных времен для СМО
+
+- распределения (детерминированное, показательное, Эрланга, гиперэкспоненциальное, логнормальное)
+  генерируют сразу массив значений
+- BlockSampler заранее генерирует значения блоками и отдает по одному за O(1)
+- SYSTEM_TYPES сопоставляет типу системы распределения времени между заявками и времени обслуживания,
+  новый тип системы добавляется через register_system_type без изменения Controller_SMO
+
+"""
+from collections.abc import Callable
+
+import numpy as np
+
+BLOCK_SIZE = 8192
+
+
+class Distribution:
+    """Распределение неотрицательной случайной величины"""
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Возвращает size значений"""
+        raise NotImplementedError
+
+    def mean(self) -> float:
+        """Математическое ожидание"""
+        raise NotImplementedError
+
+    @property
+    def num_uniforms(self) -> int:
+        """Количество равномерных величин на одно значение в from_uniforms"""
+        return 1
+
+    def from_uniforms(self, uniforms: np.ndarray) -> np.ndarray:
+        """
+        Значения из равномерных на [0, 1) величин uniforms формы (size, num_uniforms)
+
+        Значение - неубывающая функция каждой величины (при остальных фиксированных), поэтому общие
+        и антитетические случайные числа (variance_reduction) дают положительно и отрицательно коррелированные значения
+        """
+        raise NotImplementedError
+
+
+class Deterministic(Distribution):
+    """Постоянная величина value"""
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def __repr__(self):
+        return f'Deterministic({self.value})'
+
+    def sample(self, rng, size):
+        return np.full(size, self.value, dtype=float)
+
+    def mean(self):
+        return self.value
+
+    def from_uniforms(self, uniforms):
+        return np.full(len(uniforms), self.value, dtype=float)
+
+
+class Exponential(Distribution):
+    """Показательное распределение с параметром rate"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def __repr__(self):
+        return f'Exponential({self.rate})'
+
+    def sample(self, rng, size):
+        return rng.exponential(1 / self.rate, size)
+
+    def mean(self):
+        return 1 / self.rate
+
+    def from_uniforms(self, uniforms):
+        return -np.log1p(-uniforms[:, 0]) / self.rate
+
+
+class Erlang(Distribution):
+    """Распределение Эрланга порядка k, сумма k показательных величин с параметром rate"""
+
+    def __init__(self, k: int, rate: float):
+        self.k = k
+        self.rate = rate
+
+    def __repr__(self):
+        return f'Erlang({self.k}, {self.rate})'
+
+    def sample(self, rng, size):
+        return rng.gamma(self.k, 1 / self.rate, size)
+
+    def mean(self):
+        return self.k / self.rate
+
+    @property
+    def num_uniforms(self):
+        return self.k
+
+    def from_uniforms(self, uniforms):
+        return -np.log1p(-uniforms).sum(axis=1) / self.rate
+
+
+class HyperExponential(Distribution):
+    """Смесь показательных распределений с параметрами rates и вероятностями probabilities"""
+
+    def __init__(self, probabilities: list[float], rates: list[float]):
+        self.probabilities = np.asarray(probabilities, dtype=float)
+        self.rates = np.asarray(rates, dtype=float)
+
+    def __repr__(self):
+        return f'HyperExponential({self.probabilities.tolist()}, {self.rates.tolist()})'
+
+    def sample(self, rng, size):
+        phase = rng.choice(len(self.rates), size, p=self.probabilities)
+        return rng.exponential(1., size) / self.rates[phase]
+
+    def mean(self):
+        return float(np.sum(self.probabilities / self.rates))
+
+    @property
+    def num_uniforms(self):
+        return 2
+
+    def from_uniforms(self, uniforms):
+        # первая величина - значение внутри фазы, вторая - выбор фазы
+        phase = np.minimum(np.searchsorted(np.cumsum(self.probabilities), uniforms[:, 1], side='right'),
+                           len(self.rates) - 1)
+        return -np.log1p(-uniforms[:, 0]) / self.rates[phase]
+
+
+class LogNormal(Distribution):
+    """Логнормальное распределение, mu и sigma - параметры нормального распределения логарифма"""
+
+    def __init__(self, mu: float, sigma: float):
+        self.mu = mu
+        self.sigma = sigma
+
+    def __repr__(self):
+        return f'LogNormal({self.mu}, {self.sigma})'
+
+    def sample(self, rng, size):
+        return rng.lognormal(self.mu, self.sigma, size)
+
+    def mean(self):
+        return float(np.exp(self.mu + self.sigma ** 2 / 2))
+
+    def from_uniforms(self, uniforms):
+        values = np.maximum(uniforms[:, 0], np.finfo(float).tiny)  # обратная функция в 0 не определена
+        return np.exp(self.mu + self.sigma * normal_inverse_cdf(values))
+
+
+# коэффициенты AS241 (Wichura, 1988), числитель и знаменатель от старшей степени к младшей
+_AS241_CENTRAL = (
+    (2509.0809287301226727, 33430.575583588128105, 67265.770927008700853, 45921.953931549871457,
+     13731.693765509461125, 1971.5909503065514427, 133.14166789178437745, 3.387132872796366608),
+    (5226.495278852545925, 28729.085735721942674, 39307.89580009271061, 21213.794301586595867,
+     5394.1960214247511077, 687.1870074920579083, 42.313330701600911252, 1.),
+)
+_AS241_INTERMEDIATE = (
+    (7.7454501427834140764e-4, 0.0227238449892691845833, 0.24178072517745061177, 1.27045825245236838258,
+     3.64784832476320460504, 5.7694972214606914055, 4.6303378461565452959, 1.42343711074968357734),
+    (1.05075007164441684324e-9, 5.475938084995344946e-4, 0.0151986665636164571966, 0.14810397642748007459,
+     0.68976733498510000455, 1.6763848301838038494, 2.05319162663775882187, 1.),
+)
+_AS241_TAIL = (
+    (2.01033439929228813265e-7, 2.71155556874348757815e-5, 0.0012426609473880784386, 0.026532189526576123093,
+     0.29656057182850489123, 1.7848265399172913358, 5.4637849111641143699, 6.6579046435011037772),
+    (2.04426310338993978564e-15, 1.4215117583164458887e-7, 1.8463183175100546818e-5, 7.868691311456132591e-4,
+     0.0148753612908506148525, 0.13692988092273580531, 0.59983220655588793769, 1.),
+)
+
+
+def normal_inverse_cdf(p: np.ndarray) -> np.ndarray:
+    """
+    Квантили стандартного нормального распределения для массива вероятностей p из (0, 1)
+
+    Алгоритм AS241 (как statistics.NormalDist.inv_cdf), но для всего массива сразу
+    """
+    p = np.asarray(p, dtype=float)
+    q = p - 0.5
+    result = np.empty_like(q)
+    central = np.abs(q) <= 0.425
+    r = 0.180625 - q[central] ** 2
+    result[central] = q[central] * np.polyval(_AS241_CENTRAL[0], r) / np.polyval(_AS241_CENTRAL[1], r)
+
+    r = np.sqrt(-np.log(np.minimum(p[~central], 1 - p[~central])))
+    tail = np.empty_like(r)
+    near = r <= 5
+    tail[near] = (np.polyval(_AS241_INTERMEDIATE[0], r[near] - 1.6)
+                  / np.polyval(_AS241_INTERMEDIATE[1], r[near] - 1.6))
+    tail[~near] = np.polyval(_AS241_TAIL[0], r[~near] - 5) / np.polyval(_AS241_TAIL[1], r[~near] - 5)
+    result[~central] = np.where(q[~central] < 0, -tail, tail)
+    return result
+
+
+class BlockSampler:
+    """
+
+    Выдает значения распределения по одному, генерируя их блоками по block_size
+
+    Атрибуты
+    --------
+    distribution : Distribution
+            Распределение
+    rng : np.random.Generator
+            Генератор случайных чисел
+    block_size : int (default BLOCK_SIZE)
+            Количество значений, генерируемых за раз
+
+    """
+
+    def __init__(self, distribution: Distribution, rng: np.random.Generator | None = None,
+                 block_size: int = BLOCK_SIZE):
+        self.distribution = distribution
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.block_size = block_size
+        self._block = iter(())
+
+    def __repr__(self):
+        return f'BlockSampler({self.distribution})'
+
+    def __getstate__(self):
+        """Из блока сохраняются только еще не выданные значения"""
+        rest = list(self._block)
+        self._block = iter(rest)
+        state = self.__dict__.copy()
+        state['_block'] = rest
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._block = iter(self._block)
+
+    def next(self) -> float:
+        """Возвращает следующее значение"""
+        try:
+            return next(self._block)
+        except StopIteration:
+            self._block = iter(self._new_block(self.block_size).tolist())
+            return next(self._block)
+
+    def take(self, size: int) -> np.ndarray:
+        """Возвращает size следующих значений массивом"""
+        rest = np.fromiter(self._block, dtype=float)
+        self._block = iter(())
+        if len(rest) >= size:
+            self._block = iter(rest[size:].tolist())
+            return rest[:size]
+        return np.concatenate((rest, self._new_block(size - len(rest))))
+
+    def _new_block(self, size: int) -> np.ndarray:
+        """Генерирует следующие size значений"""
+        return self.distribution.sample(self.rng, size)
+
+
+def _d_m_n(parameters) -> tuple[Distribution, Distribution]:
+    """Система массового обслуживания (D|M|n)"""
+    return Deterministic(parameters.delta_t), Exponential(parameters.mu)
+
+
+def _m_d_n(parameters) -> tuple[Distribution, Distribution]:
+    """Система массового обслуживания (M|D|n)"""
+    return Exponential(parameters.lambd), Deterministic(parameters.service_time)
+
+
+def _m_m_n(parameters) -> tuple[Distribution, Distribution]:
+    """Система массового обслуживания (M|M|n)"""
+    return Exponential(parameters.lambd), Exponential(parameters.mu)
+
+
+SYSTEM_TYPES: dict[int, Callable] = {
+    1: _d_m_n,
+    2: _m_d_n,
+    3: _m_m_n,
+}
+
+
+def register_system_type(type_system: int, distributions: Callable):
+    """
+    Добавляет тип системы
+
+    distributions(parameters) возвращает (распределение времени между заявками, распределение времени обслуживания)
+
+    """
+    SYSTEM_TYPES[type_system] = distributions
+
+
+def get_distributions(type_system: int, parameters=None) -> tuple[Distribution, Distribution]:
+    """Распределения времени между заявками и времени обслуживания для типа системы"""
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    if type_system not in SYSTEM_TYPES:
+        raise Exception(f'Неизвестный тип системы {type_system}')
+    return SYSTEM_TYPES[type_system](parameters)
+
+
+def get_samplers(type_system: int, parameters=None, rng: np.random.Generator | None = None,
+                 block_size: int = BLOCK_SIZE) -> tuple[BlockSampler, BlockSampler]:
+    """Генераторы времени между заявками и времени обслуживания для типа системы"""
+    rng = np.random.default_rng() if rng is None else rng
+    arrival, service = get_distributions(type_system, parameters)
+    return BlockSampler(arrival, rng, block_size), BlockSampler(service, rng, block_size)
@@ -0,0 +1,75 @@
+"""
+Воспроизводимость моделирования через начальные значения генераторов вместо файлов выборки
+
+- каждому потоку случайных чисел соответствует свой SeedSequence: потомок корневого с ключом пути
+  (вариант, задача, поток), поэтому поток не зависит от порядка вычислений и от того, в каком процессе
+  он используется - последовательный и параллельный запуск дают одни и те же результаты
+- время между заявками и время обслуживания берутся из двух отдельных генераторов PCG64 (ARRIVALS, SERVICES)
+- чтобы повторить запуск, достаточно метаданных корневого SeedSequence (несколько байт JSON, save_seed),
+  а не всех сгенерированных значений, как в table1_task{n}.txt
+
+"""
+import json
+
+import numpy as np
+
+from sampler import BLOCK_SIZE, BlockSampler, get_distributions
+
+ARRIVALS = 0  # ключ потока времени между заявками
+SERVICES = 1  # ключ потока времени обслуживания
+SEED_FILE = 'seed.json'
+
+
+def to_seed_sequence(seed=None) -> np.random.SeedSequence:
+    """SeedSequence из целого числа, SeedSequence или None (случайная энтропия)"""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def get_child(seed_sequence: np.random.SeedSequence, *keys: int) -> np.random.SeedSequence:
+    """
+    Потомок seed_sequence с ключом keys
+
+    В отличие от SeedSequence.spawn, не меняет seed_sequence и не зависит от того, сколько потомков
+    уже порождено: get_child(s, i) совпадает с i-м потомком s.spawn(n)
+    """
+    return np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + keys,
+                                  pool_size=seed_sequence.pool_size)
+
+
+def get_generator(seed_sequence: np.random.SeedSequence, *keys: int) -> np.random.Generator:
+    """Генератор PCG64 потока keys"""
+    return np.random.Generator(np.random.PCG64(get_child(seed_sequence, *keys)))
+
+
+def get_samplers(type_system: int, parameters, seed=None,
+                 block_size: int = BLOCK_SIZE) -> tuple[BlockSampler, BlockSampler]:
+    """Генераторы времени между заявками и времени обслуживания на отдельных потоках seed"""
+    seed_sequence = to_seed_sequence(seed)
+    arrival, service = get_distributions(type_system, parameters)
+    return (BlockSampler(arrival, get_generator(seed_sequence, ARRIVALS), block_size),
+            BlockSampler(service, get_generator(seed_sequence, SERVICES), block_size))
+
+
+def to_metadata(seed_sequence: np.random.SeedSequence) -> dict:
+    """Все, что нужно для повторения потоков seed_sequence"""
+    return {'bit_generator': 'PCG64', 'entropy': seed_sequence.entropy, 'spawn_key': list(seed_sequence.spawn_key),
+            'pool_size': seed_sequence.pool_size}
+
+
+def from_metadata(metadata: dict) -> np.random.SeedSequence:
+    if metadata.get('bit_generator', 'PCG64') != 'PCG64':
+        raise Exception(f'Неизвестный генератор {metadata["bit_generator"]}, поддерживается PCG64')
+    return np.random.SeedSequence(metadata['entropy'], spawn_key=tuple(metadata['spawn_key']),
+                                  pool_size=metadata['pool_size'])
+
+
+def save_seed(path: str, seed_sequence: np.random.SeedSequence):
+    with open(path, 'w') as file:
+        json.dump(to_metadata(seed_sequence), file)
+
+
+def load_seed(path: str) -> np.random.SeedSequence:
+    with open(path, 'r') as file:
+        return from_metadata(json.load(file))
@@ -0,0 +1,192 @@
+"""
+Двоичная трасса выборки вместо JSON файлов table1_task{n}.txt
+
+Трасса - пара файлов .npy с float64:
+    {prefix}.arrivals.npy - время между заявками (первое значение - момент прихода первой заявки)
+    {prefix}.services.npy - время обслуживания заявок
+
+Файлы открываются через np.memmap и читаются блоками по мере надобности.
+Запись идет потоково: заголовок .npy фиксированной длины перезаписывается при закрытии.
+
+"""
+import csv
+import json
+import os
+
+import numpy as np
+
+from npy_file import NpyWriter
+from sampler import BLOCK_SIZE, BlockSampler
+
+ARRIVALS_SUFFIX = '.arrivals.npy'
+SERVICES_SUFFIX = '.services.npy'
+
+
+def get_trace_paths(prefix: str) -> tuple[str, str]:
+    """Имена файлов времени между заявками и времени обслуживания"""
+    return prefix + ARRIVALS_SUFFIX, prefix + SERVICES_SUFFIX
+
+
+def trace_exists(prefix: str) -> bool:
+    return all(os.path.exists(path) for path in get_trace_paths(prefix))
+
+
+class TraceSampler(BlockSampler):
+    """
+
+    Выдает значения из файла трассы по порядку, читая его блоками через np.memmap
+
+    Атрибуты
+    --------
+    path : str
+            Файл трассы
+    values : np.memmap
+            Значения трассы
+    position : int
+            Номер следующего непрочитанного значения
+
+    """
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE):
+        super().__init__(None, None, block_size)
+        self.path = path
+        self.values = np.load(path, mmap_mode='r')
+        self.position = 0
+
+    def __repr__(self):
+        return f'TraceSampler({self.position} из {len(self.values)})'
+
+    def __getstate__(self):
+        """Трасса не копируется в состояние: сохраняются имя файла и позиция"""
+        state = super().__getstate__()
+        del state['values']
+        return state
+
+    def __setstate__(self, state: dict):
+        super().__setstate__(state)
+        self.values = np.load(self.path, mmap_mode='r')
+
+    def _new_block(self, size: int) -> np.ndarray:
+        """Следующие size значений, в конце трассы - сколько осталось"""
+        block = np.array(self.values[self.position:self.position + size])
+        if size and not len(block):
+            raise Exception(f'Трасса закончилась: в ней {len(self.values)} значений')
+        self.position += len(block)
+        return block
+
+
+class RecordingSampler(BlockSampler):
+    """BlockSampler, который дописывает каждый сгенерированный блок в файл трассы"""
+
+    def __init__(self, sampler: BlockSampler, path: str):
+        super().__init__(sampler.distribution, sampler.rng, sampler.block_size)
+        self._writer = NpyWriter(path)
+
+    def _new_block(self, size: int) -> np.ndarray:
+        block = super()._new_block(size)
+        self._writer.write(block)
+        return block
+
+    def close(self):
+        """Дописывает заголовок файла трассы"""
+        self._writer.close()
+
+
+def open_trace(prefix: str, block_size: int = BLOCK_SIZE) -> tuple[TraceSampler, TraceSampler]:
+    """Генераторы времени между заявками и времени обслуживания, читающие трассу"""
+    arrivals, services = get_trace_paths(prefix)
+    return TraceSampler(arrivals, block_size), TraceSampler(services, block_size)
+
+
+def record_trace(samplers: tuple[BlockSampler, BlockSampler], prefix: str) -> tuple[RecordingSampler, RecordingSampler]:
+    """
+    Генераторы, записывающие все сгенерированные значения в трассу
+
+    После моделирования у обоих надо вызвать close(). В трассу попадают целые блоки,
+    поэтому она может быть длиннее, чем нужно для повторения запуска.
+
+    """
+    arrivals, services = get_trace_paths(prefix)
+    return RecordingSampler(samplers[0], arrivals), RecordingSampler(samplers[1], services)
+
+
+def write_trace(prefix: str, time_between_apps, service_times):
+    """Записывает трассу из готовых массивов"""
+    arrivals, services = get_trace_paths(prefix)
+    np.save(arrivals, np.asarray(time_between_apps, dtype='<f8'))
+    np.save(services, np.asarray(service_times, dtype='<f8'))
+
+
+def selection_to_arrays(selection: dict[str, list[float]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Время между заявками и время обслуживания из выборки Controller_SMO
+
+    Выборка - это {'1': [приход 1-й заявки, ее обслуживание, время до 2-й заявки],
+    'номер события прихода k-й заявки': [ее обслуживание, время до (k + 1)-й заявки], ...}
+
+    """
+    keys = sorted(selection, key=int)
+    first = selection[keys[0]]
+    time_between_apps = np.array([first[0], first[2]] + [selection[key][1] for key in keys[1:]])
+    service_times = np.array([first[1]] + [selection[key][0] for key in keys[1:]])
+    return time_between_apps, service_times
+
+
+def selection_to_trace(f_name: str, prefix: str):
+    """Переводит JSON выборку Controller_SMO в трассу"""
+    with open(f_name, 'r') as file:
+        selection = json.load(file)
+    write_trace(prefix, *selection_to_arrays(selection))
+
+
+def trace_to_selection(prefix: str, f_name: str, num_devices: int, num_events: int, type_system: int = 1):
+    """
+    Переводит трассу в JSON выборку Controller_SMO
+
+    Ключи выборки - номера событий прихода заявок, поэтому для перевода моделируются num_events событий
+    СМО с num_devices приборами. Тип системы на результат не влияет, все времена берутся из трассы.
+
+    """
+    from Controller_SMO_numpy import Controller_SMO_numpy
+
+    if os.path.exists(f_name):
+        raise Exception(f'Файл {f_name} уже существует')
+    smo = Controller_SMO_numpy(num_devices, type_system, f_name, open_trace(prefix))
+    smo.start_system(num_events)
+
+
+def trace_to_csv(prefix: str, f_name: str, chunk_size: int = BLOCK_SIZE):
+    """Записывает трассу в CSV со столбцами time_between_apps, service_time"""
+    arrivals, services = (np.load(path, mmap_mode='r') for path in get_trace_paths(prefix))
+    with open(f_name, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['time_between_apps', 'service_time'])
+        for start in range(0, max(len(arrivals), len(services)), chunk_size):
+            chunk_arrivals = arrivals[start:start + chunk_size].tolist()
+            chunk_services = services[start:start + chunk_size].tolist()
+            chunk_services += [''] * (len(chunk_arrivals) - len(chunk_services))
+            chunk_arrivals += [''] * (len(chunk_services) - len(chunk_arrivals))
+            writer.writerows(zip(chunk_arrivals, chunk_services))
+
+
+def csv_to_trace(f_name: str, prefix: str, chunk_size: int = BLOCK_SIZE):
+    """Переводит CSV со столбцами time_between_apps, service_time в трассу, пустые ячейки пропускаются"""
+    arrivals_path, services_path = get_trace_paths(prefix)
+    arrivals, services = NpyWriter(arrivals_path), NpyWriter(services_path)
+    with open(f_name, 'r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader)  # заголовок
+        chunk_arrivals, chunk_services = [], []
+        for row in reader:
+            if row[0]:
+                chunk_arrivals.append(float(row[0]))
+            if len(row) > 1 and row[1]:
+                chunk_services.append(float(row[1]))
+            if len(chunk_arrivals) >= chunk_size:
+                arrivals.write(np.array(chunk_arrivals))
+                services.write(np.array(chunk_services))
+                chunk_arrivals, chunk_services = [], []
+        arrivals.write(np.array(chunk_arrivals))
+        services.write(np.array(chunk_services))
+    arrivals.close()
+    services.close()
@@ -0,0 +1,177 @@
+"""
+Моделирование СМО без отчета
+
+- на уровне модуля нет тяжелых импортов: движок, генераторы и пул процессов загружаются при вызове run,
+  python-docx и модули отчета не загружаются вовсе
+- IMPORT_BUDGET_MS - допустимое время импорта модулей моделирования SIMULATION_MODULES (то, что загружает
+  процесс пула при первой задаче) вместе с NumPy, проверяется ключом --check-import-time
+  (python -X importtime в отдельном процессе). Большая часть времени - импорт NumPy, без которого моделирование
+  не обходится; concurrent.futures с multiprocessing (еще около 40 мс) загружаются, только когда нужен
+  пул процессов
+
+Пример:
+    python simulate.py --type 3 --num-smo 3 --lambd 2 --mu 0.9 --events 10000 --seed 1
+    python simulate.py --type 1 --variant 72 --replications 20 --processes 4
+    python simulate.py --type 2 --variant 72 --precision 0.05
+
+"""
+import sys
+
+IMPORT_BUDGET_MS = 300  # обычно 190-230 мс, из них NumPy 160-190 мс; запас на колебания
+SIMULATION_MODULES = ('simulate', 'replications', 'solution', 'Controller_SMO_heap')
+HEAVY_MODULES = ('docx', 'work_with_document', 'report_backends', 'create_a_report', 'analytic_mmn')
+REQUIRED_PARAMETERS = {  # параметры, которые читает sampler.get_distributions для типа системы
+    1: ('num_smo', 'delta_t', 'mu'),
+    2: ('num_smo', 'lambd', 'service_time'),
+    3: ('num_smo', 'lambd', 'mu'),
+}
+
+
+def run(type_system: int, parameters, num_events: int, engine: str = 'heap', seed=None, num_replications: int = 1,
+        processes: int | None = 1, relative_error: float | None = None, checkpoint: str | None = None,
+        checkpoint_interval: int | None = None) -> dict[str, list]:
+    """
+    Моделирует СМО типа type_system с параметрами parameters (constants.Parameters)
+
+    Возвращает показатели таблиц 3, 5 и частоты состояний ('table_3', 'table_5', 'frequencies').
+    При num_replications > 1 показатели усредняются по независимым повторениям (replications),
+    а для каждого добавляется полуширина доверительного интервала ('table_3_error' и т.д.)
+    С relative_error длина прогона выбирается правилом остановки (stopping_rule), num_events - наименьшая длина,
+    результат правила - в 'stopping'
+    С checkpoint один прогон идет в потоковом режиме с сохранением состояния в файл checkpoint каждые
+    checkpoint_interval событий; если файл уже есть, прогон продолжается с сохраненного события
+
+    """
+    if relative_error is not None:
+        from stopping_rule import simulate_until_precision
+        smo, stopping = simulate_until_precision(type_system, parameters, seed, engine, relative_error,
+                                                 min_events=num_events)
+        return {'table_3': smo.get_data_for_report(), 'table_5': smo.get_column_for_table_5(),
+                'frequencies': smo.get_frequency_table(), 'stopping': stopping._asdict()}
+
+    if checkpoint is not None:
+        from seeds import get_samplers
+        from solution import get_engine
+        if engine == 'numpy':
+            raise Exception('Движок numpy не поддерживает чекпойнты, нужен list или heap')
+        samplers = get_samplers(type_system, parameters, seed)
+        smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers, streaming=True)
+        smo.start_system(num_events, checkpoint, checkpoint_interval)
+        return {'table_3': smo.get_data_for_report(), 'table_5': smo.get_column_for_table_5(),
+                'frequencies': smo.get_frequency_table()}
+
+    if num_replications > 1:
+        from replications import run_replications
+        results = run_replications(type_system, num_replications, num_events, seed, parameters, engine, processes)
+        output = {}
+        for name, (mean, error) in results.items():
+            output[name] = mean.tolist()
+            output[f'{name}_error'] = error.tolist()
+        return output
+
+    import numpy as np
+    from replications import run_replication
+    results = run_replication(type_system, parameters, num_events, np.random.SeedSequence(seed), engine)
+    return {name: values.tolist() for name, values in results.items()}
+
+
+def get_import_time(modules=SIMULATION_MODULES) -> tuple[float, list[str]]:
+    """
+    Время импорта modules в новом процессе, мс, и загруженные при этом модули из HEAVY_MODULES
+
+    Время берется из вывода python -X importtime: сумма накопленных времен модулей верхнего уровня
+    (модуль, импортированный другим из modules, уже учтен во времени импортировавшего)
+
+    """
+    import os
+    import subprocess
+
+    code = f'import sys, {", ".join(modules)}; print(*(name for name in {HEAVY_MODULES!r} if name in sys.modules))'
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    import_time = 0
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3:
+            continue
+        if fields[2][1:] in modules:  # верхний уровень - без отступа
+            import_time += int(fields[1])
+    return import_time / 1000, process.stdout.split()
+
+
+def check_import_time(budget_ms: float = IMPORT_BUDGET_MS) -> bool:
+    """Печатает время импорта SIMULATION_MODULES и проверяет бюджет и то, что тяжелые модули не загружены"""
+    import_time, heavy = get_import_time()
+    print(f'Импорт {", ".join(SIMULATION_MODULES)}: {import_time:.1f} мс, бюджет {budget_ms} мс')
+    if heavy:
+        print(f'Загружены лишние модули: {", ".join(heavy)}')
+    return import_time <= budget_ms and not heavy
+
+
+def _get_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Моделирование СМО без отчета, результат - JSON')
+    parser.add_argument('--type', type=int, default=3, dest='type_system', help='тип системы: 1 - D|M|n, '
+                        '2 - M|D|n, 3 - M|M|n')
+    parser.add_argument('--events', type=int, default=None, help='количество событий (default constants.NUM_EVENTS)')
+    parser.add_argument('--engine', default='heap', help='движок моделирования: list, heap, numpy')
+    parser.add_argument('--seed', type=int, default=None, help='начальное значение генератора')
+    parser.add_argument('--replications', type=int, default=1, help='количество независимых повторений')
+    parser.add_argument('--processes', type=int, default=1, help='количество процессов для повторений')
+    parser.add_argument('--precision', type=float, default=None,
+                        help='моделировать, пока полуширина доверительного интервала не станет меньше этой доли '
+                             'среднего (stopping_rule), --events - наименьшая длина прогона')
+    parser.add_argument('--checkpoint', default=None,
+                        help='файл чекпойнта: сохранять состояние прогона и продолжать с него, если файл есть')
+    parser.add_argument('--checkpoint-interval', type=int, default=None,
+                        help='сохранять чекпойнт каждые столько событий (default - только в конце)')
+    parser.add_argument('--variant', type=int, default=None, help='вариант из файла условий')
+    parser.add_argument('--conditions', default='lab_3.txt', help='файл условий')
+    for name in ('num_smo', 'service_time', 'delta_t', 'lambd', 'mu'):
+        parser.add_argument(f'--{name.replace("_", "-")}', type=int if name == 'num_smo' else float, default=None,
+                            help='параметр СМО, заменяет значение из варианта')
+    parser.add_argument('--output', default=None, help='файл результата (default - стандартный вывод)')
+    parser.add_argument('--check-import-time', action='store_true',
+                        help=f'проверить, что импорт модулей моделирования занимает не больше {IMPORT_BUDGET_MS} мс')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _get_parser().parse_args(argv)
+    if args.check_import_time:
+        return 0 if check_import_time() else 1
+
+    import json
+    from constants import NUM_EVENTS, Parameters
+
+    values = dict.fromkeys(Parameters._fields)
+    if args.variant is not None:
+        from get_data import get_conditions
+        values.update(zip(Parameters._fields, get_conditions(args.variant, args.conditions).data))
+    for name in Parameters._fields:
+        if getattr(args, name) is not None:
+            values[name] = getattr(args, name)
+    # неиспользуемые типом системы параметры остаются None; для типов, добавленных register_system_type, нужны все
+    required = REQUIRED_PARAMETERS.get(args.type_system, Parameters._fields)
+    missing = [name for name in required if values[name] is None]
+    if missing:
+        raise Exception(f'Не заданы параметры {missing}, нужен --variant или ключи --{missing[0].replace("_", "-")}')
+    parameters = Parameters(**values)
+
+    num_events = NUM_EVENTS if args.events is None else args.events
+    result = run(args.type_system, parameters, num_events, args.engine, args.seed, args.replications, args.processes,
+                 args.precision, args.checkpoint, args.checkpoint_interval)
+    output = {'type_system': args.type_system, 'parameters': parameters._asdict(), 'num_events': num_events,
+              'engine': args.engine, 'seed': args.seed, 'num_replications': args.replications, **result}
+    if args.output is None:
+        json.dump(output, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(output, file, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
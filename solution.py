@@ -3,18 +3,61 @@
 Содержит решение 1-3 задач
 Вычисление таблиц аналитического раздела
 
+Модули движков и аналитических формул импортируются по требованию, чтобы процессы,
+которым нужно только моделирование, запускались быстрее
+
 """
-import math
-from Controller_SMO import Controller_SMO
+from importlib import import_module
+
+ENGINES = {  # движок: (модуль, класс)
+    'list': ('Controller_SMO', 'Controller_SMO'),  # опрос всех приборов на каждом событии
+    'heap': ('Controller_SMO_heap', 'Controller_SMO_heap'),  # календарь событий на куче
+    'numpy': ('Controller_SMO_numpy', 'Controller_SMO_numpy'),  # рекурсия Кифера-Вольфовица
+}
+
+
+def get_engine(engine: str):
+    """Класс контроллера СМО для движка из ENGINES, модуль импортируется при первом вызове"""
+    if engine not in ENGINES:
+        raise Exception(f'Неизвестный движок {engine}, допустимы {list(ENGINES)}')
+    module, class_name = ENGINES[engine]
+    return getattr(import_module(module), class_name)
+
 
+def event_handler(n_task: int, engine: str = 'list', trace: str | None = None, parameters=None,
+                  num_events: int | None = None, directory: str = '', metrics=None, seed=None):
+    """
+
+    Обработчик событий. Заполняет таблицы 1 и 2
+
+    trace - префикс двоичной трассы (selection_trace), тогда времена берутся из нее, а не из table1_task{n}.txt
+    parameters (constants.Parameters) и num_events задаются явно или берутся из constants,
+    directory - каталог файла выборки table1_task{n}.txt, metrics - профилирование (instrumentation.Metrics)
+    seed (целое число или SeedSequence) - времена берутся из потоков seeds.get_samplers, файл выборки не пишется
+
+    """
+    import os
 
-def event_handler(n_task: int):
-    """Обработчик событий. Заполняет таблицы 1 и 2"""
     from constants import NUM_EVENTS, NUM_SMO
 
-    f_name = f'table1_task{n_task}.txt'
-    smo = Controller_SMO(NUM_SMO, n_task, f_name)
-    result = smo.start_system(NUM_EVENTS)
+    num_smo = NUM_SMO if parameters is None else parameters.num_smo
+    num_events = NUM_EVENTS if num_events is None else num_events
+    if seed is not None:
+        from constants import get_parameters
+        from seeds import get_samplers
+        samplers = get_samplers(n_task, get_parameters() if parameters is None else parameters, seed)
+        smo = get_engine(engine)(num_smo, n_task, None, samplers, metrics=metrics)
+    elif trace is None:
+        samplers = None
+        if parameters is not None:
+            from sampler import get_samplers
+            samplers = get_samplers(n_task, parameters)
+        smo = get_engine(engine)(num_smo, n_task, os.path.join(directory, f'table1_task{n_task}.txt'), samplers,
+                                 metrics=metrics)
+    else:
+        from selection_trace import open_trace
+        smo = get_engine(engine)(num_smo, n_task, None, open_trace(trace), metrics=metrics)
+    result = smo.start_system(num_events)
 
     return smo, result
 
@@ -33,25 +76,14 @@ def get_frequency_table(smo):
     return smo.get_frequency_table()
 
 
-def get_vector_r(length):
-    from constants import MU, LAMBD, NUM_SMO
-    vector = []
-    p = LAMBD / MU
-    v = p / NUM_SMO
-    r0 = 0
-    for k in range(NUM_SMO):
-        r0 += p ** k / math.factorial(k)
-    r0 = (r0 + (p ** NUM_SMO / math.factorial(NUM_SMO)) * (1 / (1 - v))) ** (-1)
-
-    vector.append(r0)
-
-    for k in range(1, NUM_SMO + 1):
-        vector.append((r0 * p ** k) / math.factorial(k))
-
-    for l in range(1, length - NUM_SMO):
-        vector.append((v ** l) * vector[NUM_SMO])
-
-    return vector
+def get_vector_r(length, parameters=None):
+    """Вероятности r_0..r_{L-1} СМО (M|M|n), L = max(length, n + 1), параметры - из parameters или constants"""
+    from analytic_mmn import get_stationary_distribution
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    return get_stationary_distribution(parameters.lambd, parameters.mu, parameters.num_smo,
+                                       max(length, parameters.num_smo + 1)).tolist()
 
 
 def get_frequency_table_task_3(vector_r, vector_v):
@@ -70,6 +102,15 @@ def get_frequency_table_task_3(vector_r, vector_v):
     return table
 
 
+def get_results_for_an_calc(smo) -> dict[str, list]:
+    """Данные одной СМО для аналитического раздела: таблица 3, столбец таблицы 5 и частоты состояний"""
+    return {
+        'table_3': get_table_with_device_data(smo),
+        'table_5': get_data_for_table_5(smo),
+        'frequencies': get_frequency_table(smo),
+    }
+
+
 def get_data_for_an_calc(smo_list):
     """
     Формирует данные для отчета в аналитическом разделе
@@ -77,17 +118,18 @@ def get_data_for_an_calc(smo_list):
     В отчете 6 таблиц и 1 вектор r(список)
 
     """
-    # с данными о приборах
-    table_3 = []
-    table_for_task_5 = []
+    return get_data_for_an_calc_from_results([get_results_for_an_calc(smo) for smo in smo_list[:3]])
 
-    for i in range(3):
-        table_3.append(get_table_with_device_data(smo_list[i]))
-        table_for_task_5.append(get_data_for_table_5(smo_list[i]))
 
-    frequency_tables = [get_frequency_table(smo) for smo in smo_list]
+def get_data_for_an_calc_from_results(results: list[dict[str, list]], parameters=None):
+    """То же, что get_data_for_an_calc, по результатам get_results_for_an_calc трех СМО с параметрами parameters"""
+    # с данными о приборах
+    table_3 = [result['table_3'] for result in results]
+    table_for_task_5 = [result['table_5'] for result in results]
+
+    frequency_tables = [result['frequencies'] for result in results]
 
-    vector_r = get_vector_r(len(frequency_tables[2]))
+    vector_r = get_vector_r(len(frequency_tables[2]), parameters)
 
     frequency_table_task_3 = get_frequency_table_task_3(vector_r, frequency_tables[2])
 
@@ -0,0 +1,200 @@
+"""
+Последовательное правило остановки моделирования
+
+- наблюдения (состояние СМО после каждого события, время ожидания каждой заявки) усредняются
+  по микропакетам из micro_batch значений прямо во время моделирования, память - O(событий / micro_batch)
+- конец переходного режима находится по правилу MSER (Уайт, 1997) на средних микропакетов: отбрасывается
+  начало ряда, при котором стандартная ошибка среднего оставшейся части минимальна
+- после отбрасывания остаток делится на num_batches пакетов, по средним пакетов строится доверительный
+  интервал (метод пакетных средних)
+- моделирование продолжается (количество событий растет в growth раз), пока полуширина интервала
+  каждого показателя не станет меньше relative_error от его среднего, но не дольше max_events событий
+
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from confidence import CONFIDENCE_LEVEL, mean_confidence_interval
+
+METRICS = ('number_in_system', 'wait_time')  # состояние СМО по событиям, время ожидания по заявкам
+MICRO_BATCH = 5  # MSER-5
+NUM_BATCHES = 20
+RELATIVE_ERROR = 0.05
+MIN_EVENTS = 10000
+MAX_EVENTS = 10 ** 7
+GROWTH = 1.5
+
+# converged - достигнута ли точность, num_events - количество смоделированных событий,
+# warmup - {показатель: отброшено наблюдений переходного режима} (None - наблюдений еще слишком мало),
+# mean, half_width - {показатель: среднее и полуширина доверительного интервала после отбрасывания}
+StoppingResult = namedtuple('StoppingResult', ['converged', 'num_events', 'warmup', 'mean', 'half_width'])
+
+
+class BatchSeries:
+    """
+
+    Средние последовательных микропакетов из size наблюдений
+
+    Атрибуты
+    --------
+    size : int
+            Количество наблюдений в микропакете
+    means : list[float] (default [])
+            Средние заполненных микропакетов
+
+    """
+    __slots__ = ('size', 'means', '_count', '_total')
+
+    def __init__(self, size: int = MICRO_BATCH):
+        self.size = size
+        self.means: list[float] = []
+        self._count = 0
+        self._total = 0.
+
+    def __repr__(self):
+        return f'BatchSeries(size={self.size}, пакетов: {len(self.means)})'
+
+    def add(self, value: float):
+        self._total += value
+        self._count += 1
+        if self._count == self.size:
+            self.means.append(self._total / self.size)
+            self._count = 0
+            self._total = 0.
+
+
+class BatchStage:
+    """
+
+    Ступень конвейера контроллера СМО (как event_log.EventLog), собирающая наблюдения METRICS
+    в микропакеты. Передается контроллеру через event_log, вызовы передаются дальше в next_stage
+
+    Атрибуты
+    --------
+    series : dict[str, BatchSeries]
+            Ряды средних микропакетов по показателям
+    next_stage : StreamingStatistics | None (default None)
+            Следующая ступень
+
+    """
+
+    def __init__(self, micro_batch: int = MICRO_BATCH, next_stage=None):
+        self.series = {name: BatchSeries(micro_batch) for name in METRICS}
+        self.next_stage = next_stage
+        self._number_in_system = self.series['number_in_system'].add
+        self._wait_time = self.series['wait_time'].add
+
+    def __repr__(self):
+        return f'BatchStage({self.series})'
+
+    def attach(self, next_stage):
+        """Задает следующую ступень и возвращает себя"""
+        self.next_stage = next_stage
+        return self
+
+    def add_event(self, *values):
+        self._number_in_system(values[3])
+        if self.next_stage is not None:
+            self.next_stage.add_event(*values)
+
+    def add_application(self, *values):
+        if values[3] != -1:  # заявка сразу поступила на обслуживание
+            self._wait_time(values[3])
+        if self.next_stage is not None:
+            self.next_stage.add_application(*values)
+
+    def start_application(self, num_app: int, app_time: float, start_service: float, service_time: float):
+        self._wait_time(start_service - app_time)
+        if self.next_stage is not None:
+            self.next_stage.start_application(num_app, app_time, start_service, service_time)
+
+
+def mser_truncation(values) -> int | None:
+    """
+    Количество начальных значений, которые надо отбросить по правилу MSER
+
+    Минимизируется sum (x_i - среднее остатка)^2 / (длина остатка)^2 по началу d из первой половины ряда
+    (d <= n // 2): остаток короче половины ряда слишком мал, чтобы по нему судить. Для редких наблюдений
+    (почти все времена ожидания при малой загрузке нулевые) минимум по всему ряду лежал бы в нулевом хвосте.
+    Для рядов короче 4 значений возвращается None
+
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 4:
+        return None
+    values = values - values.mean()  # меньше потеря точности в разности сумм
+    length = np.arange(n, 0, -1)[:n // 2 + 1]  # длина остатка для d = 0..n // 2
+    suffix_sum = np.cumsum(values[::-1])[::-1][:n // 2 + 1]
+    suffix_squares = np.cumsum((values ** 2)[::-1])[::-1][:n // 2 + 1]
+    mser = (suffix_squares - suffix_sum ** 2 / length) / length ** 2
+    return int(np.argmin(mser))
+
+
+def batch_means(values, num_batches: int = NUM_BATCHES, level: float = CONFIDENCE_LEVEL) -> tuple[float, float]:
+    """
+    Среднее и полуширина доверительного интервала по num_batches пакетам равной длины
+
+    Лишние значения отбрасываются с начала ряда, где сильнее влияние переходного режима
+
+    """
+    values = np.asarray(values, dtype=float)
+    size = len(values) // num_batches
+    if size == 0:
+        return float(values.mean()) if len(values) else np.nan, np.inf
+    batches = values[len(values) - size * num_batches:].reshape(num_batches, size).mean(axis=1)
+    mean, half_width = mean_confidence_interval(batches, level)
+    return float(mean), float(half_width)
+
+
+def check_precision(stage: BatchStage, relative_error: float = RELATIVE_ERROR, num_batches: int = NUM_BATCHES,
+                    level: float = CONFIDENCE_LEVEL) -> tuple[bool, dict, dict, dict]:
+    """(точность достигнута, warmup, mean, half_width) по наблюдениям stage, как в StoppingResult"""
+    converged = True
+    warmup, means, half_widths = {}, {}, {}
+    for name, series in stage.series.items():
+        truncation = mser_truncation(series.means)
+        if truncation is None or len(series.means) - truncation < num_batches:
+            converged = False
+            warmup[name], means[name], half_widths[name] = None, np.nan, np.inf
+            continue
+        warmup[name] = truncation * series.size
+        means[name], half_widths[name] = batch_means(series.means[truncation:], num_batches, level)
+        converged = converged and half_widths[name] <= relative_error * abs(means[name])
+    return converged, warmup, means, half_widths
+
+
+def simulate_until_precision(type_system: int, parameters=None, seed=None, engine: str = 'heap',
+                             relative_error: float = RELATIVE_ERROR, level: float = CONFIDENCE_LEVEL,
+                             min_events: int = MIN_EVENTS, max_events: int = MAX_EVENTS, growth: float = GROWTH,
+                             micro_batch: int = MICRO_BATCH, num_batches: int = NUM_BATCHES):
+    """
+    Моделирует СМО, пока показатели METRICS не будут оценены с точностью relative_error
+
+    Контроллер работает в потоковом режиме (таблицы не хранятся), после остановки его методы
+    get_data_for_report, get_column_for_table_5, get_frequency_table дают показатели по всем событиям.
+    Возвращает (контроллер, StoppingResult)
+
+    """
+    from seeds import get_samplers
+    from solution import get_engine
+
+    if engine == 'numpy':
+        raise Exception('Движок numpy не умеет продолжать моделирование, нужен list или heap')
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+
+    stage = BatchStage(micro_batch)
+    samplers = get_samplers(type_system, parameters, seed)
+    smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers, event_log=stage)
+    num_events = min(min_events, max_events)
+    smo.start_system(num_events)
+    while True:
+        converged, warmup, means, half_widths = check_precision(stage, relative_error, num_batches, level)
+        if converged or num_events >= max_events:
+            break
+        num_events = min(max_events, max(num_events + 1, int(num_events * growth)))
+        smo.continue_system(num_events)
+    return smo, StoppingResult(converged, num_events, warmup, means, half_widths)
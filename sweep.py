@@ -0,0 +1,223 @@
+"""
+Расчет показателей СМО по сетке параметров (num_smo, service_time, delta_t, lambd, mu)
+
+- для (M|M|n) показатели считаются по аналитическим формулам (analytic_mmn), сразу для всех клеток,
+  для (D|M|n) и (M|D|n) - численно (analytic_dmn_mdn), по клетке за вызов
+- для остальных типов систем клетки моделируются в пуле процессов, в потоковом режиме
+- результат - ColumnarTable со строкой на каждую пару (тип системы, клетка сетки)
+- посчитанные клетки дописываются в кэш (файл JSON lines) и при повторном запуске не пересчитываются
+
+Глобальные константы (constants) не меняются, параметры передаются явно.
+
+"""
+import itertools
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ColumnarTable import ColumnarTable
+from analytic_dmn_mdn import get_metrics as get_metrics_gmn
+from analytic_mmn import get_metrics
+from constants import Parameters
+from sampler import get_distributions
+from seeds import get_samplers
+
+ANALYTIC_TYPES = (1, 2, 3)  # типы систем, для которых есть аналитическое решение
+METRICS = ('utilisation', 'wait_probability', 'lq', 'wq', 'l', 'w')
+
+
+class SweepRow:
+    """
+
+    Строка результата sweep
+
+    Атрибуты
+    --------
+    type_system : int
+            Тип системы
+    num_smo, service_time, delta_t, lambd, mu
+            Параметры клетки сетки
+    method : str
+            'analytic' или 'simulation'
+    utilisation : float
+            Загрузка прибора
+    wait_probability : float
+            Доля времени, когда заняты все приборы (для пуассоновского потока совпадает с вероятностью ожидания)
+    lq, wq : float
+            Средние длина очереди и время ожидания
+    l, w : float
+            Средние число заявок в СМО и время пребывания
+
+    """
+    dtype = np.dtype([('type_system', np.int64), ('num_smo', np.int64), ('service_time', float), ('delta_t', float),
+                      ('lambd', float), ('mu', float), ('method', 'U10')] + [(name, float) for name in METRICS])
+
+
+def get_cells(grid: dict) -> list[Parameters]:
+    """
+    Клетки сетки - все сочетания значений
+
+    grid - словарь {имя поля Parameters: значения}, недостающие поля берутся из constants
+
+    """
+    from constants import get_parameters
+
+    unknown = set(grid) - set(Parameters._fields)
+    if unknown:
+        raise Exception(f'Неизвестные параметры {sorted(unknown)}, допустимы {Parameters._fields}')
+    defaults = get_parameters()
+    values = [list(np.atleast_1d(grid[name])) if name in grid else [getattr(defaults, name)]
+              for name in Parameters._fields]
+    return [Parameters(*(value.item() if isinstance(value, np.generic) else value for value in cell))
+            for cell in itertools.product(*values)]
+
+
+def _get_cell_key(type_system: int, parameters: Parameters, method: str, num_events: int,
+                  num_replications: int, seed, engine: str) -> str:
+    """Ключ клетки в кэше"""
+    if method == 'analytic':
+        return json.dumps([type_system, list(parameters), method])
+    return json.dumps([type_system, list(parameters), method, num_events, num_replications, seed, engine])
+
+
+def _get_seed_sequence(seed, key: str) -> np.random.SeedSequence:
+    """Поток случайных чисел клетки, зависит только от seed и самой клетки, а не от состава сетки"""
+    return np.random.SeedSequence(seed, spawn_key=(zlib.crc32(key.encode()),))
+
+
+def get_state_times(smo) -> np.ndarray:
+    """Время пребывания СМО в каждом из состояний"""
+    statistics = getattr(smo, 'statistics', None)  # у Controller_SMO_numpy только таблица событий
+    if statistics is not None:
+        return np.array(statistics.state_time)
+    event_time = smo.event_table['event_time']
+    status = smo.event_table['status_system'][:-1]
+    return np.bincount(status, weights=np.diff(event_time))
+
+
+def _get_metrics_from_state_times(state_times: np.ndarray, num_smo: int, lambd: float) -> list[float]:
+    """Показатели по доле времени в состояниях, времена - по формуле Литтла"""
+    probability = state_times / state_times.sum()
+    k = np.arange(len(probability))
+    l = float(probability @ k)
+    lq = float(probability @ np.maximum(k - num_smo, 0))
+    return [float(probability @ np.minimum(k, num_smo)) / num_smo, float(probability[num_smo:].sum()),
+            lq, lq / lambd, l, l / lambd]
+
+
+def simulate_cell(type_system: int, parameters: Parameters, num_events: int, num_replications: int,
+                  seed_sequence: np.random.SeedSequence, engine: str = 'heap') -> list[float]:
+    """Показатели METRICS одной клетки, усредненные по num_replications повторениям"""
+    from solution import get_engine
+
+    lambd = 1 / get_distributions(type_system, parameters)[0].mean()
+    results = []
+    for replication_seed in seed_sequence.spawn(num_replications):
+        samplers = get_samplers(type_system, parameters, replication_seed)
+        if engine == 'numpy':
+            smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers)
+        else:
+            smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers, streaming=True)
+        smo.start_system(num_events)
+        results.append(_get_metrics_from_state_times(get_state_times(smo), parameters.num_smo, lambd))
+    return np.mean(results, axis=0).tolist()
+
+
+def _simulate_cell(args) -> list[float]:
+    return simulate_cell(*args)
+
+
+def _load_cache(cache_path: str | None) -> dict[str, list[float]]:
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    cache = {}
+    with open(cache_path, 'r') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                cache[record['key']] = record['metrics']
+    return cache
+
+
+def sweep(grid: dict, type_systems=(1, 2, 3), num_events: int | None = None, num_replications: int = 1,
+          seed=None, engine: str = 'heap', processes: int | None = None, cache_path: str | None = None,
+          analytic: bool = True) -> ColumnarTable:
+    """
+    Считает показатели для всех клеток grid и всех типов систем
+
+    :param grid: {имя поля Parameters: значения}, например {'num_smo': range(1, 20), 'lambd': [0.5, 1, 2]}
+    :param type_systems: типы систем
+    :param num_events: количество событий в одном повторении моделирования (default constants.NUM_EVENTS)
+    :param num_replications: количество повторений на клетку, показатели усредняются
+    :param seed: начальное значение генератора, поток клетки зависит от seed и параметров клетки
+    :param engine: движок моделирования из solution.ENGINES
+    :param processes: количество процессов, 1 - моделировать в текущем процессе
+    :param cache_path: файл кэша (JSON lines), None - без кэша
+    :param analytic: считать типы ANALYTIC_TYPES по формулам, False - моделировать все типы
+    :return: ColumnarTable строк SweepRow
+
+    """
+    if num_events is None:
+        from constants import NUM_EVENTS
+        num_events = NUM_EVENTS
+    cells = get_cells(grid)
+    cache = _load_cache(cache_path)
+    cache_file = open(cache_path, 'a') if cache_path is not None else None
+
+    def store(key: str, metrics: list[float]):
+        cache[key] = metrics
+        if cache_file is not None:
+            cache_file.write(json.dumps({'key': key, 'metrics': metrics}) + '\n')
+            cache_file.flush()
+
+    rows = []  # (тип системы, параметры, метод, ключ)
+    for type_system in type_systems:
+        method = 'analytic' if analytic and type_system in ANALYTIC_TYPES else 'simulation'
+        for parameters in cells:
+            key = _get_cell_key(type_system, parameters, method, num_events, num_replications, seed, engine)
+            rows.append((type_system, parameters, method, key))
+
+    try:
+        analytic_rows = [row for row in rows if row[2] == 'analytic' and row[0] != 3 and row[3] not in cache]
+        for row in analytic_rows:
+            metrics = get_metrics_gmn(row[0], row[1])
+            store(row[3], [float(getattr(metrics, name)) for name in METRICS])
+
+        analytic_rows = [row for row in rows if row[2] == 'analytic' and row[0] == 3 and row[3] not in cache]
+        if analytic_rows:
+            parameters = [row[1] for row in analytic_rows]
+            metrics = get_metrics([cell.lambd for cell in parameters], [cell.mu for cell in parameters],
+                                  [cell.num_smo for cell in parameters])
+            for i, row in enumerate(analytic_rows):
+                store(row[3], [float(getattr(metrics, name)[i]) for name in METRICS])
+
+        pending = {row[3]: row for row in rows if row[2] == 'simulation' and row[3] not in cache}
+        simulation_rows = list(pending.values())
+        tasks = [(row[0], row[1], num_events, num_replications, _get_seed_sequence(seed, row[3]), engine)
+                 for row in simulation_rows]
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(tasks) <= 1:
+            results = map(_simulate_cell, tasks)
+            for row, metrics in zip(simulation_rows, results):
+                store(row[3], metrics)
+        else:
+            with ProcessPoolExecutor(processes) as executor:
+                chunksize = max(1, len(tasks) // (4 * processes))
+                for row, metrics in zip(simulation_rows, executor.map(_simulate_cell, tasks, chunksize=chunksize)):
+                    store(row[3], metrics)
+    finally:
+        if cache_file is not None:
+            cache_file.close()
+
+    columns = {name: [] for name in SweepRow.dtype.names}
+    for type_system, parameters, method, key in rows:
+        columns['type_system'].append(type_system)
+        for name, value in zip(Parameters._fields, parameters):
+            columns[name].append(value)
+        columns['method'].append(method)
+        for name, value in zip(METRICS, cache[key]):
+            columns[name].append(value)
+    return ColumnarTable.from_columns(SweepRow, {name: np.array(values) for name, values in columns.items()})
@@ -0,0 +1,15 @@
+"""Модули лабораторной лежат в корне репозитория, тесты импортируют их оттуда"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def parameters():
+    """Параметры СМО для тестов: 3 прибора, загрузка около 0.8"""
+    from constants import Parameters
+
+    return Parameters(3, 1.1, 0.4, 2.5, 1.)
@@ -0,0 +1,21 @@
+"""Процесс рождения и гибели сходится к стационарному распределению (M|M|n)"""
+import numpy as np
+import pytest
+
+from analytic_mmn import get_stationary_distribution
+from birth_death import simulate_birth_death
+
+
+def test_state_probabilities_match_stationary(parameters):
+    chain = simulate_birth_death(200000, parameters, seed=3)
+    probabilities = np.array(chain.get_state_probabilities())
+    expected = get_stationary_distribution(parameters.lambd, parameters.mu, parameters.num_smo, len(probabilities))
+    np.testing.assert_allclose(probabilities, expected, atol=0.01)
+
+
+def test_stops_at_requested_event(parameters):
+    chain = simulate_birth_death(1000, parameters, seed=4)
+    chain.continue_system(12345)
+    assert chain.num_events == 12345
+    assert sum(chain.get_frequency_table()) == pytest.approx(1.)
+    assert chain.state_counts.sum() == chain.num_events
@@ -0,0 +1,64 @@
+"""Моделирование, продолженное с чекпойнта, совпадает с непрерывным"""
+import filecmp
+import pickle
+
+import numpy as np
+import pytest
+
+from event_log import EventLog, get_log_paths
+from seeds import get_samplers
+from selection_trace import open_trace, write_trace
+from solution import get_engine
+
+NUM_EVENTS = 3000
+
+
+def create(parameters, engine: str, type_system: int = 3, **kwargs):
+    samplers = get_samplers(type_system, parameters, 9)
+    return get_engine(engine)(parameters.num_smo, type_system, None, samplers, **kwargs)
+
+
+@pytest.mark.parametrize('engine', ['list', 'heap'])
+def test_resume_matches_uninterrupted(tmp_path, parameters, engine):
+    checkpoint = str(tmp_path / 'smo.pkl')
+    uninterrupted = create(parameters, engine)
+    uninterrupted.start_system(NUM_EVENTS)
+    create(parameters, engine).start_system(NUM_EVENTS // 3, checkpoint=checkpoint)
+    resumed = create(parameters, engine)
+    resumed.start_system(NUM_EVENTS, checkpoint=checkpoint, checkpoint_interval=500)
+
+    assert resumed.get_column_for_table_5() == uninterrupted.get_column_for_table_5()
+    assert resumed.get_frequency_table() == uninterrupted.get_frequency_table()
+    assert resumed.get_data_for_report() == uninterrupted.get_data_for_report()
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'csv'])
+def test_resume_with_event_log(tmp_path, parameters, fmt):
+    checkpoint = str(tmp_path / 'smo.pkl')
+    smo = create(parameters, 'heap', event_log=EventLog(str(tmp_path / 'uninterrupted'), chunk_size=700, fmt=fmt))
+    smo.start_system(NUM_EVENTS)
+    smo._add_event.__self__.close()
+
+    interrupted = create(parameters, 'heap', event_log=EventLog(str(tmp_path / 'resumed'), chunk_size=700, fmt=fmt))
+    interrupted.start_system(NUM_EVENTS // 3, checkpoint=checkpoint)
+    interrupted._add_event.__self__.close()  # записанное после чекпойнта отбрасывается при продолжении
+    resumed = create(parameters, 'heap', event_log=EventLog(str(tmp_path / 'resumed'), chunk_size=700, fmt=fmt))
+    resumed.start_system(NUM_EVENTS, checkpoint=checkpoint, checkpoint_interval=500)
+    resumed._add_event.__self__.close()
+
+    for expected, actual in zip(get_log_paths(str(tmp_path / 'uninterrupted'), fmt),
+                                get_log_paths(str(tmp_path / 'resumed'), fmt)):
+        assert filecmp.cmp(expected, actual, shallow=False)
+
+
+def test_trace_sampler_pickles_position(tmp_path):
+    rng = np.random.default_rng(2)
+    prefix = str(tmp_path / 'trace')
+    write_trace(prefix, rng.exponential(0.4, 100000), rng.exponential(1., 100000))
+    sampler = open_trace(prefix, block_size=100)[0]
+    for _ in range(150):
+        sampler.next()
+    data = pickle.dumps(sampler)
+    assert len(data) < 100000  # трасса не копируется в чекпойнт
+    restored = pickle.loads(data)
+    np.testing.assert_array_equal([restored.next() for _ in range(300)], [sampler.next() for _ in range(300)])
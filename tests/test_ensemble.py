@@ -0,0 +1,25 @@
+"""Ансамбль копий СМО (M|M|n) согласуется с численным нестационарным решением"""
+import numpy as np
+import pytest
+
+from ensemble import simulate_ensemble
+from transient_mmn import get_transient_mean, get_transient_probabilities
+
+TIMES = [0.25, 0.5, 1., 2., 4.]
+
+
+def test_mean_status_within_interval_of_transient_mean(parameters):
+    ensemble = simulate_ensemble(3, TIMES, num_replications=4000, parameters=parameters, seed=8)
+    mean, half_width = ensemble.get_mean_status()
+    assert np.all(np.abs(mean - get_transient_mean(TIMES, parameters)) <= half_width)
+
+
+def test_state_probabilities_match_transient(parameters):
+    ensemble = simulate_ensemble(3, TIMES, num_replications=4000, parameters=parameters, seed=9)
+    shares = ensemble.get_state_probabilities()
+    exact = get_transient_probabilities(TIMES, parameters)
+    size = max(shares.shape[1], exact.shape[1])
+    shares, exact = (np.pad(value, ((0, 0), (0, size - value.shape[1]))) for value in (shares, exact))
+    # стандартное отклонение доли по 4000 копиям не больше 0.008
+    np.testing.assert_allclose(shares, exact, atol=0.03)
+    assert shares.sum(axis=1) == pytest.approx(1.)
@@ -0,0 +1,30 @@
+"""Движки heap и numpy совпадают с исходным list на одних и тех же случайных временах"""
+import numpy as np
+import pytest
+
+from Controller_SMO import Controller_SMO
+from Controller_SMO_heap import Controller_SMO_heap
+from Controller_SMO_numpy import Controller_SMO_numpy
+from seeds import get_samplers
+
+NUM_EVENTS = 2000
+
+
+def simulate(controller, parameters, type_system: int, seed: int = 7):
+    smo = controller(parameters.num_smo, type_system, None, get_samplers(type_system, parameters, seed))
+    smo.start_system(NUM_EVENTS)
+    return smo
+
+
+@pytest.mark.parametrize('controller', [Controller_SMO_heap, Controller_SMO_numpy])
+@pytest.mark.parametrize('num_smo', [1, 3])
+@pytest.mark.parametrize('type_system', [1, 2, 3])
+def test_engine_matches_list(parameters, controller, num_smo, type_system):
+    parameters = parameters._replace(num_smo=num_smo)  # один прибор перегружен, очередь растет
+    fast = simulate(controller, parameters, type_system)
+    baseline = simulate(Controller_SMO, parameters, type_system)
+    np.testing.assert_allclose(fast.get_column_for_table_5(), baseline.get_column_for_table_5())
+    np.testing.assert_allclose(fast.get_frequency_table(), baseline.get_frequency_table())
+    # время работы приборов heap и numpy считают по целым интервалам обслуживания, поэтому сравниваются только заявки
+    np.testing.assert_array_equal(np.array(fast.get_data_for_report())[:, :2],
+                                  np.array(baseline.get_data_for_report())[:, :2])
@@ -0,0 +1,32 @@
+"""Данные отчета из кэша совпадают с данными нового моделирования"""
+import numpy as np
+
+from create_a_report import get_data_for_task
+from result_cache import ResultCache
+
+NUM_EVENTS = 500
+
+
+def test_cache_hit_matches_miss(tmp_path, monkeypatch, parameters):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    seed = np.random.SeedSequence(5)
+    tables, results = get_data_for_task(2, cache, parameters=parameters, num_events=NUM_EVENTS, seed=seed)
+    assert len(cache._get_entries()) == 1
+
+    def simulate(*args, **kwargs):
+        raise AssertionError('при попадании в кэш моделирование не нужно')
+
+    monkeypatch.setattr('create_a_report.event_handler', simulate)
+    cached_tables, cached_results = get_data_for_task(2, cache, parameters=parameters, num_events=NUM_EVENTS,
+                                                      seed=seed)
+    for table, cached_table in zip(tables, cached_tables):
+        np.testing.assert_array_equal(cached_table.data, table.data)
+    assert cached_results == results
+
+
+def test_key_depends_on_seed(tmp_path, parameters):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    for entropy in (1, 2):
+        get_data_for_task(1, cache, parameters=parameters, num_events=NUM_EVENTS,
+                          seed=np.random.SeedSequence(entropy))
+    assert len(cache._get_entries()) == 2
@@ -0,0 +1,27 @@
+"""Правило остановки: отбрасывание переходного режима и остановка по точности"""
+import numpy as np
+
+from constants import Parameters
+from stopping_rule import mser_truncation, simulate_until_precision
+
+
+def test_mser_drops_transient():
+    rng = np.random.default_rng(1)
+    values = np.concatenate((np.linspace(10, 1, 50), 1 + rng.normal(0, 0.1, 950)))
+    assert 40 <= mser_truncation(values) <= 60
+
+
+def test_mser_sparse_series():
+    """Почти все значения нулевые: минимум ищется только в первой половине ряда"""
+    values = np.zeros(1000)
+    values[::25] = 1.
+    assert mser_truncation(values) <= 500
+    assert mser_truncation(np.zeros(100)) == 0
+
+
+def test_low_load_stops_early():
+    """(D|M|n) с малой загрузкой: почти все времена ожидания нулевые, а точность достигается быстро"""
+    smo, result = simulate_until_precision(1, Parameters(3, 1., 1., 2., .9), seed=1, relative_error=0.3,
+                                           max_events=10 ** 6)
+    assert result.converged
+    assert result.num_events < 10 ** 5
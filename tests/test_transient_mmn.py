@@ -0,0 +1,60 @@
+"""Нестационарные вероятности (M|M|n): точность и сходимость к стационарному распределению"""
+import numpy as np
+
+from analytic_mmn import get_stationary_distribution
+from constants import Parameters
+from transient_mmn import get_generator, get_transient_mean, get_transient_probabilities
+
+
+def expm(matrix: np.ndarray) -> np.ndarray:
+    """Экспонента матрицы возведением в квадрат ряда Тейлора"""
+    squarings = max(0, int(np.ceil(np.log2(np.abs(matrix).sum(axis=1).max()))) + 1)
+    scaled = matrix / 2 ** squarings
+    result = term = np.eye(len(matrix))
+    for j in range(1, 30):
+        term = term @ scaled / j
+        result = result + term
+    for _ in range(squarings):
+        result = result @ result
+    return result
+
+
+def test_matches_matrix_exponential(parameters):
+    times = [0.3, 1.5, 4.]
+    num_states = 80
+    lower, diagonal, upper = get_generator(parameters.num_smo, parameters.lambd, parameters.mu, num_states)
+    generator = np.diag(diagonal) + np.diag(upper, 1) + np.diag(lower, -1)
+    probabilities = get_transient_probabilities(times, parameters)
+    for t, row in zip(times, probabilities):
+        expected = expm(generator * t)[0]
+        size = max(len(row), num_states)
+        assert np.abs(np.pad(row, (0, size - len(row))) - np.pad(expected, (0, size - num_states))).sum() < 1e-9
+
+
+def test_converges_to_stationary(parameters):
+    tolerance = 1e-10
+    probabilities = get_transient_probabilities([1e3, 1e6], parameters, tolerance=tolerance)
+    stationary = get_stationary_distribution(parameters.lambd, parameters.mu, parameters.num_smo,
+                                             probabilities.shape[1])
+    assert np.abs(probabilities - stationary).sum(axis=1).max() <= tolerance
+
+
+def test_starts_from_initial_distribution(parameters):
+    initial = np.array([0., 0., 0., 0., 0., 1.])
+    probabilities = get_transient_probabilities([0., 0.1], parameters, initial)
+    np.testing.assert_allclose(probabilities[0][:len(initial)], initial)
+    assert get_transient_mean([0.], parameters, initial)[0] == 5.
+    assert abs(probabilities[1].sum() - 1) < 1e-9
+
+
+def test_long_horizon_near_full_load_keeps_tolerance():
+    """При загрузке около 1 стационарное распределение не достигается, ошибка все равно в пределах допуска"""
+    parameters = Parameters(2, 1., 1., 1.9, 1.)
+    times = np.linspace(0, 2e3, 5)
+    probabilities = get_transient_probabilities(times, parameters)
+    reference = get_transient_probabilities(times, parameters, tolerance=1e-13)
+    size = max(probabilities.shape[1], reference.shape[1])
+    probabilities, reference = (np.pad(value, ((0, 0), (0, size - value.shape[1])))
+                                for value in (probabilities, reference))
+    assert np.abs(probabilities - reference).sum(axis=1).max() <= 1e-10
+    assert (1 - probabilities.sum(axis=1)).max() <= 1e-10
@@ -0,0 +1,81 @@
+"""Понижение дисперсии: среднее выданных значений, контрольные переменные, общие случайные числа"""
+import pickle
+
+import numpy as np
+
+import variance_reduction
+from confidence import mean_confidence_interval
+from constants import Parameters
+
+PARAMETERS = Parameters(2, 1.1, 0.4, 1.5, 1.)
+
+
+def test_sampler_mean_counts_handed_out_values():
+    sampler, _ = variance_reduction.get_samplers(3, PARAMETERS, np.random.SeedSequence(4), block_size=100)
+    values = [sampler.next() for _ in range(250)]
+    assert np.isclose(sampler.get_mean(), np.mean(values))
+    values += list(sampler.take(30)) + list(sampler.take(300))
+    assert np.isclose(sampler.get_mean(), np.mean(values))
+    values += [sampler.next() for _ in range(7)]
+    restored = pickle.loads(pickle.dumps(sampler))
+    assert np.isclose(restored.get_mean(), np.mean(values))
+
+
+def test_antithetic_streams_are_negatively_correlated():
+    seed_sequence = np.random.SeedSequence(6)
+    plain, _ = variance_reduction.get_samplers(3, PARAMETERS, seed_sequence)
+    mirrored, _ = variance_reduction.get_samplers(3, PARAMETERS, seed_sequence, antithetic=True)
+    assert np.corrcoef(plain.take(10000), mirrored.take(10000))[0, 1] < -0.5
+
+
+def test_control_variates_narrow_related_metric():
+    rng = np.random.default_rng(0)
+    controls = rng.normal(size=(30, 2))
+    values = controls @ [1., 2.] + 0.1 * rng.normal(size=30)
+    _, plain_half_width = mean_confidence_interval(values)
+    _, half_width = variance_reduction.control_variate_interval(values, controls)
+    assert half_width < plain_half_width / 5
+
+
+def test_control_variate_coverage_on_null_data():
+    """Контрольные величины не связаны с показателем: покрытие интервала остается номинальным"""
+    rng = np.random.default_rng(1)
+    covered = 0
+    num_trials = 4000
+    for _ in range(num_trials):
+        _, half_width = estimate = variance_reduction.control_variate_interval(rng.normal(size=10),
+                                                                               rng.normal(size=(10, 2)))
+        covered += abs(estimate[0]) <= half_width
+    assert 0.943 <= covered / num_trials <= 0.957  # выбор по ширине интервала давал 0.940
+
+
+def test_control_targets_fixed_in_advance():
+    rng = np.random.default_rng(2)
+    num_observations = 12
+    systems = [(3, 2)]
+    observations = [{(3, 2): {'table_3': rng.normal(size=(2, 4)), 'table_5': rng.normal(size=5),
+                              'frequencies': rng.random(4)},
+                     'controls': rng.normal(size=len(variance_reduction.CONTROLS))}
+                    for _ in range(num_observations)]
+    result = variance_reduction.merge_observations(observations, systems, np.zeros(len(variance_reduction.CONTROLS)))
+    mean, half_width = result['systems'][(3, 2)]['table_5']
+    table_5 = np.array([observation[(3, 2)]['table_5'] for observation in observations])
+    controls = np.array([observation['controls'] for observation in observations])
+
+    plain = mean_confidence_interval(table_5[:, 0])  # у счетчика заявок контрольных величин нет
+    np.testing.assert_allclose((mean[0], half_width[0]), plain)
+    number_in_system = variance_reduction.CONTROLS.index('number_in_system')
+    expected = variance_reduction.control_variate_interval(table_5[:, 2], controls[:, [number_in_system]])
+    np.testing.assert_allclose((mean[2], half_width[2]), expected)
+
+
+def test_common_random_numbers_narrow_differences():
+    result = variance_reduction.run_replications((3,), num_observations=8, num_events=1000, seed=1,
+                                                 parameters=PARAMETERS, num_smo_values=(2, 3), processes=1,
+                                                 control_variates=False)
+    _, difference_half_width = result['differences'][((3, 2), (3, 3))]['table_5']
+    _, half_width_2 = result['systems'][(3, 2)]['table_5']
+    _, half_width_3 = result['systems'][(3, 3)]['table_5']
+    mean_status = 2  # столбец среднего числа заявок в СМО
+    # при независимых прогонах полуширина разности была бы около hypot полуширин
+    assert difference_half_width[mean_status] < np.hypot(half_width_2[mean_status], half_width_3[mean_status])
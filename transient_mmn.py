@@ -0,0 +1,160 @@
+"""
+Нестационарные вероятности состояний СМО (M|M|n) равномерным прореживанием (uniformization)
+
+- генератор процесса рождения и гибели на состояниях 0..K-1 трехдиагональный и хранится диагоналями
+  (как разреженный формат DIA), умножение на вектор - O(K) операций NumPy
+- p(t + h) = sum_j e^(-q h) (q h)^j / j! * p P^j, P = I + Q / q, q = lambd + n * mu; шаг h не длиннее
+  MAX_JUMPS / q, чтобы e^(-q h) не уходило в ноль, ряд обрывается, когда оценка его остатка меньше допуска шага
+- из состояния K-1 приход заявки уводит вероятность из усеченного пространства (она теряется), поэтому
+  ошибка усечения равна потерянной вероятности; если на шаге потеряно больше допуска, K удваивается
+  и шаг считается заново. Потерянная вероятность копится по слагаемым ряда (доля lambd / q последнего
+  состояния каждого p P^j), а не разностью сумм, поэтому она точна и при допуске шага меньше ошибки округления
+- ошибки остатков рядов и усечения вместе не больше tolerance на всей сетке
+- для устойчивой СМО, как только p(t) отличается от стационарного распределения (get_vector_r) меньше,
+  чем на остаток допуска, дальше возвращается стационарное: расстояние по вариации до него не растет со временем,
+  поэтому большие t считаются так же быстро, как малые
+- до перехода на стационарное распределение работа пропорциональна q * t * K: при n = 300..500 и загрузке 0.9
+  это десятые доли секунды, а не миллисекунды; при загрузке около 1 переходный режим длится долго
+  (время релаксации порядка 1 / (sqrt(n mu) - sqrt(lambd))^2), и время счета растет вместе с t:
+  n = 100, lambd = 99.5, mu = 1 на сетке до t = 10^4 - K около 8500 и несколько минут
+
+"""
+import math
+
+import numpy as np
+
+TOLERANCE = 1e-10
+MAX_JUMPS = 500.  # наибольшее среднее число шагов прореживания за один шаг по времени
+MIN_STATES = 32  # начальный запас состояний сверх числа приборов
+CHUNK = 64  # слагаемых ряда на одно умножение матриц
+
+
+def get_generator(num_smo: int, lambd: float, mu: float, num_states: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Генератор Q процесса на состояниях 0..num_states-1 диагоналями (нижняя, главная, верхняя)
+
+    lower[k] = Q[k+1, k] = mu * min(k+1, n), upper[k] = Q[k, k+1] = lambd, diagonal[k] = -(lambd + mu * min(k, n));
+    в последнем состоянии приход заявки выводит из усеченного пространства
+
+    """
+    k = np.arange(num_states)
+    lower = mu * np.minimum(k[1:], num_smo).astype(float)
+    diagonal = -(lambd + mu * np.minimum(k, num_smo).astype(float))
+    upper = np.full(num_states - 1, float(lambd))
+    return lower, diagonal, upper
+
+
+def _multiply(p: np.ndarray, lower: np.ndarray, diagonal: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Строка p, умноженная на трехдиагональную матрицу"""
+    result = p * diagonal
+    result[1:] += p[:-1] * upper
+    result[:-1] += p[1:] * lower
+    return result
+
+
+def _uniformized_steps(p: np.ndarray, jumps: np.ndarray, matrix: tuple,
+                       tolerance: float) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    p e^(Q h) для нескольких h сразу рядом по степеням P = I + Q / q, jumps = q h
+
+    Слагаемые p P^j общие для всех h, отличаются только веса Пуассона, поэтому они копятся порциями по CHUNK
+    и складываются умножением матриц. Ряд обрывается, когда остаток весов для наибольшего h
+    (у остальных он меньше) не больше tolerance.
+    Возвращает (результаты формы (len(jumps), K), вероятности, ушедшие из усеченного пространства, оценка остатка)
+
+    """
+    weights = np.exp(-jumps)
+    result = np.outer(weights, p)
+    lost = np.zeros_like(jumps)
+    leaked = 0.  # ушло из состояния K-1 за j шагов
+    outflow = matrix[2][-1]  # lambd / q
+    largest = int(np.argmax(jumps))
+    term = p
+    chunk_weights, chunk_terms = [], []
+    j = 0
+    while True:
+        ratio = jumps[largest] / (j + 1)  # отношение следующего веса к текущему
+        tail = weights[largest] * ratio / (1 - ratio) if ratio < 1 else np.inf  # остаток не больше прогрессии
+        if tail <= tolerance or len(chunk_terms) == CHUNK:
+            if chunk_terms:
+                result += np.array(chunk_weights).T @ np.array(chunk_terms)
+                chunk_weights, chunk_terms = [], []
+            if tail <= tolerance:
+                return result, lost, tail
+        leaked += max(float(term[-1]), 0.) * outflow
+        term = _multiply(term, *matrix)
+        j += 1
+        weights = weights * jumps / j
+        lost += weights * leaked
+        chunk_weights.append(weights)
+        chunk_terms.append(term)
+
+
+def get_transient_probabilities(times, parameters=None, initial=None, tolerance: float = TOLERANCE) -> np.ndarray:
+    """
+    Вероятности того, что в момент times[g] в СМО (M|M|n) находится k заявок
+
+    parameters (constants.Parameters, default constants) задают NUM_SMO, LAMBD, MU, initial - распределение
+    в момент 0 (default пустая СМО). Возвращает массив формы (len(times), K), K подбирается по tolerance;
+    каждая строка отличается от точного распределения по сумме модулей не больше чем на tolerance
+
+    """
+    from analytic_mmn import get_stationary_distribution
+
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    num_smo, lambd, mu = parameters.num_smo, parameters.lambd, parameters.mu
+    times = np.asarray(times, dtype=float)
+    if times.ndim != 1 or np.any(times < 0) or np.any(np.diff(times) < 0):
+        raise Exception('Сетка моментов должна быть неотрицательной и неубывающей')
+    p = np.array([1.]) if initial is None else np.asarray(initial, dtype=float)
+    num_states = max(len(p), num_smo + MIN_STATES)
+    p = np.pad(p, (0, num_states - len(p)))
+
+    rate = lambd + num_smo * mu
+    scale = tolerance / 2 / times[-1] if len(times) and times[-1] > 0 else 0.  # допуск на единицу времени
+    stable = lambd < num_smo * mu
+    matrix = limit = stationary = None
+    error = 0.  # оценка расстояния p от точного распределения
+    rows = []
+    t = 0.
+    g = 0
+    while g < len(times):
+        if stationary is not None or times[g] <= t:
+            rows.append(p if stationary is None else stationary)
+            g += 1
+            continue
+        # окно (t, end]: один ряд на все моменты сетки окна и его конец
+        end = min(times[-1], t + MAX_JUMPS / rate)
+        num_points = int(np.searchsorted(times, end, side='right')) - g
+        jumps = rate * (np.append(times[g:g + num_points], end) - t)
+        step_tolerance = scale * (end - t)
+        while True:
+            if matrix is None:
+                matrix = tuple(diagonal / rate for diagonal in get_generator(num_smo, lambd, mu, num_states))
+                matrix[1][:] += 1  # P = I + Q / q
+                limit = get_stationary_distribution(lambd, mu, num_smo, num_states) if stable else None
+            results, lost, tail = _uniformized_steps(p, jumps, matrix, step_tolerance)
+            lost = float(lost.max())
+            if lost <= step_tolerance:
+                break
+            p = np.pad(p, (0, num_states))
+            num_states *= 2
+            matrix = None
+        error += tail + lost
+        rows.extend(results[:-1])
+        p = results[-1]
+        t = end
+        g += num_points
+        if limit is not None and error + np.abs(p - limit).sum() + (1 - limit.sum()) <= tolerance:
+            stationary = limit
+
+    length = max((len(row) for row in rows), default=num_states)
+    return np.array([np.pad(row, (0, length - len(row))) for row in rows])
+
+
+def get_transient_mean(times, parameters=None, initial=None, tolerance: float = TOLERANCE) -> np.ndarray:
+    """Среднее число заявок в СМО в моменты times"""
+    probabilities = get_transient_probabilities(times, parameters, initial, tolerance)
+    return probabilities @ np.arange(probabilities.shape[1])
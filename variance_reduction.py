@@ -0,0 +1,297 @@
+"""
+Понижение дисперсии при моделировании СМО
+
+- общие случайные числа: время между заявками и время обслуживания получаются обратным преобразованием
+  (Distribution.from_uniforms) из двух отдельных потоков равномерных величин, которые зависят только от seed.
+  СМО разных типов и с разным количеством приборов при одном seed получают одни и те же числа: k-я заявка
+  приходит после k-й равномерной величины потока прихода и обслуживается по k-й величине потока обслуживания,
+  поэтому разности показателей между системами шумят гораздо меньше, чем при независимых прогонах
+- антитетические пары: второй прогон пары использует величины 1 - u, наблюдение - среднее пары
+- контрольные переменные: в каждом наблюдении (M|M|n) моделируется на тех же случайных числах (если тип 3
+  есть среди типов, используется его прогон). Ожидания контрольных величин известны: среднее время между
+  заявками 1 / lambd, обслуживания 1 / mu, доля времени пустой СМО r_0 (solution.get_vector_r) и среднее
+  число заявок в СМО. Показатели поправляются регрессией на отклонения контрольных величин от ожиданий
+  (метод наименьших квадратов по наблюдениям). Какие контрольные величины поправляют показатель, задано
+  заранее (CONTROL_TARGETS): выбор по полученной ширине интервала на тех же наблюдениях занижал бы покрытие
+
+Ожидания контрольных величин, связанных с состояниями, - стационарные, прогоны начинаются с пустой СМО,
+поэтому смещение поправки - порядка длительности переходного режима / длины прогона.
+
+"""
+import math
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from confidence import CONFIDENCE_LEVEL, student_quantile
+from sampler import BLOCK_SIZE, BlockSampler, get_distributions
+from seeds import ARRIVALS, SERVICES, get_generator
+
+CONTROLS = ('interarrival_time', 'service_time', 'empty_share', 'number_in_system')
+TABLES = ('table_3', 'table_5', 'frequencies')
+# контрольные величины показателей: кортеж - для всех значений таблицы, словарь - по столбцам (нет столбца -
+# обычное среднее); счетчики заявок таблицы 5 при заданном количестве событий почти не шумят
+CONTROL_TARGETS = {
+    'table_3': ('service_time', 'empty_share'),  # время работы и простой приборов
+    'table_5': {2: ('number_in_system',), 3: ('number_in_system',), 4: ('service_time',)},
+    'frequencies': ('empty_share', 'number_in_system'),
+}
+_MIRROR = 1 - 2 ** -53  # 1 - u переводит сетку значений Generator.random в себя, 0 и 1 не появляются
+
+
+class VarianceReducedSampler(BlockSampler):
+    """
+
+    BlockSampler, получающий значения обратным преобразованием из своего потока равномерных величин
+
+    Атрибуты
+    --------
+    antithetic : bool (default False)
+            Использовать величины 1 - u вместо u
+    generated : int (default 0)
+            Количество сгенерированных значений
+    total : float (default 0.)
+            Сумма сгенерированных значений
+
+    """
+
+    def __init__(self, distribution, rng: np.random.Generator | None = None, antithetic: bool = False,
+                 block_size: int = BLOCK_SIZE):
+        super().__init__(distribution, rng, block_size)
+        self.antithetic = antithetic
+        self.generated = 0
+        self.total = 0.
+        self._rest_sums = np.zeros(0)  # _rest_sums[r - 1] - сумма последних r значений блока
+
+    def __repr__(self):
+        return f'VarianceReducedSampler({self.distribution}, antithetic={self.antithetic})'
+
+    def _new_block(self, size: int) -> np.ndarray:
+        uniforms = self.rng.random((size, self.distribution.num_uniforms))
+        if self.antithetic:
+            uniforms = _MIRROR - uniforms
+        values = self.distribution.from_uniforms(uniforms)
+        self.generated += size
+        self.total += float(values.sum())
+        self._rest_sums = np.cumsum(values[::-1])
+        return values
+
+    def get_mean(self) -> float:
+        """
+        Среднее выданных значений (сгенерированные, но еще не выданные не учитываются)
+
+        Невыданные значения - всегда конец последнего блока, их количество дает length_hint итератора,
+        а сумму - _rest_sums, поэтому блок не перебирается
+        """
+        rest = operator.length_hint(self._block)
+        rest_sum = float(self._rest_sums[rest - 1]) if rest else 0.
+        return (self.total - rest_sum) / (self.generated - rest)
+
+
+def get_samplers(type_system: int, parameters, seed_sequence: np.random.SeedSequence, antithetic: bool = False,
+                 block_size: int = BLOCK_SIZE) -> tuple[VarianceReducedSampler, VarianceReducedSampler]:
+    """Генераторы времени между заявками и времени обслуживания на общих для всех систем потоках seed_sequence"""
+    arrival, service = get_distributions(type_system, parameters)
+    return (VarianceReducedSampler(arrival, get_generator(seed_sequence, ARRIVALS), antithetic, block_size),
+            VarianceReducedSampler(service, get_generator(seed_sequence, SERVICES), antithetic, block_size))
+
+
+def _simulate(type_system: int, parameters, num_events: int, seed_sequence: np.random.SeedSequence,
+              engine: str, antithetic: bool):
+    from solution import get_engine
+
+    if engine == 'numpy':
+        raise Exception('Движок numpy не поддерживает общие случайные числа, нужен list или heap')
+    samplers = get_samplers(type_system, parameters, seed_sequence, antithetic)
+    smo = get_engine(engine)(parameters.num_smo, type_system, None, samplers, streaming=True)
+    smo.start_system(num_events)
+    return smo
+
+
+def get_control_means(parameters) -> np.ndarray:
+    """Известные ожидания контрольных величин CONTROLS для (M|M|n) с параметрами parameters"""
+    from analytic_mmn import get_metrics
+    from solution import get_vector_r
+
+    if parameters.lambd >= parameters.num_smo * parameters.mu:
+        raise Exception('Контрольные переменные требуют устойчивой (M|M|n): lambd < num_smo * mu')
+    return np.array([1 / parameters.lambd, 1 / parameters.mu, get_vector_r(1, parameters)[0],
+                     float(get_metrics(parameters.lambd, parameters.mu, parameters.num_smo).l)])
+
+
+def _get_controls(smo) -> np.ndarray:
+    """Значения контрольных величин CONTROLS по прогону (M|M|n)"""
+    state_time = np.array(smo.statistics.state_time)
+    share = state_time / state_time.sum()
+    return np.array([smo.arrival_sampler.get_mean(), smo.service_sampler.get_mean(), share[0],
+                     float(share @ np.arange(len(share)))])
+
+
+def _pad_mean(values: list[np.ndarray]) -> np.ndarray:
+    """Среднее массивов разной длины, недостающие значения - нули (частоты состояний)"""
+    size = max(len(value) for value in values)
+    return np.mean([np.pad(value, (0, size - len(value))) for value in values], axis=0)
+
+
+def run_observation(systems, parameters, num_events: int, seed_sequence: np.random.SeedSequence,
+                    engine: str = 'heap', antithetic: bool = False, control_variates: bool = True) -> dict:
+    """
+    Одно наблюдение: все системы systems - пары (тип системы, количество приборов) - на общих случайных числах
+
+    Остальные параметры берутся из parameters. Возвращает {система: {'table_3', 'table_5', 'frequencies'}}
+    и 'controls' - значения CONTROLS прогона (M|M|n) с parameters (None без control_variates).
+    С antithetic значения - средние пары прогонов на u и 1 - u.
+
+    """
+    runs = (False, True) if antithetic else (False,)
+    control_system = (3, parameters.num_smo)
+    observation = {}
+    controls = []
+    for system in sorted(set(systems) | ({control_system} if control_variates else set())):
+        type_system, num_smo = system
+        tables = {name: [] for name in TABLES}
+        for mirrored in runs:
+            smo = _simulate(type_system, parameters._replace(num_smo=num_smo), num_events, seed_sequence, engine,
+                            mirrored)
+            tables['table_3'].append(np.array(smo.get_data_for_report(), dtype=float))
+            tables['table_5'].append(np.array(smo.get_column_for_table_5(), dtype=float))
+            tables['frequencies'].append(np.array(smo.get_frequency_table(), dtype=float))
+            if system == control_system and control_variates:
+                controls.append(_get_controls(smo))
+        if system in systems:
+            observation[system] = {name: _pad_mean(values) for name, values in tables.items()}
+    observation['controls'] = np.mean(controls, axis=0) if control_variates else None
+    return observation
+
+
+def _run_observation(args) -> dict:
+    return run_observation(*args)
+
+
+def control_variate_interval(values, controls=None, level: float = CONFIDENCE_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Среднее и полуширина доверительного интервала по первой оси values с поправкой на контрольные величины
+
+    controls - отклонения контрольных величин от их ожиданий, форма (наблюдений, контрольных величин).
+    Оценка: mean(values) - mean(controls) @ beta, beta - регрессия values на controls по наблюдениям.
+    Без controls - обычный интервал по Стьюденту
+
+    """
+    values = np.asarray(values, dtype=float)
+    count = values.shape[0]
+    flat = values.reshape(count, -1)
+    mean = flat.mean(axis=0)
+    centered = flat - mean
+    if controls is None:
+        controls = np.zeros((count, 0))
+    controls = np.asarray(controls, dtype=float)
+    control_mean = controls.mean(axis=0)
+    control_centered = controls - control_mean
+    beta, _, rank, _ = np.linalg.lstsq(control_centered, centered, rcond=None) if controls.shape[1] \
+        else (np.zeros((0, flat.shape[1])), None, 0, None)
+    df = count - rank - 1
+    estimate = mean - control_mean @ beta
+    if df < 1:
+        return estimate.reshape(values.shape[1:]), np.full(values.shape[1:], np.inf)
+    residuals = centered - control_centered @ beta
+    residual_variance = (residuals ** 2).sum(axis=0) / df
+    # дисперсия оценки с поправкой: s^2 * (1 / n + c' (C'C)^-1 c), c - среднее отклонений контрольных величин
+    inflation = 1 / count
+    if rank:
+        inflation += float(control_mean @ np.linalg.pinv(control_centered.T @ control_centered) @ control_mean)
+    half_width = student_quantile((1 + level) / 2, df) * np.sqrt(residual_variance * inflation)
+    return estimate.reshape(values.shape[1:]), half_width.reshape(values.shape[1:])
+
+
+def _target_interval(name: str, values, controls: np.ndarray | None,
+                     level: float = CONFIDENCE_LEVEL) -> tuple[np.ndarray, np.ndarray]:
+    """control_variate_interval таблицы name с контрольными величинами CONTROL_TARGETS[name]"""
+    if controls is None:
+        return control_variate_interval(values, None, level)
+    targets = CONTROL_TARGETS[name]
+    if not isinstance(targets, dict):
+        return control_variate_interval(values, controls[:, [CONTROLS.index(target) for target in targets]], level)
+    values = np.asarray(values, dtype=float)
+    estimate, half_width = np.empty(values.shape[1:]), np.empty(values.shape[1:])
+    for column in range(values.shape[1]):
+        columns = [CONTROLS.index(target) for target in targets.get(column, ())]
+        estimate[column], half_width[column] = control_variate_interval(
+            values[:, column], controls[:, columns] if columns else None, level)
+    return estimate, half_width
+
+
+def merge_observations(observations: list[dict], systems, control_means: np.ndarray | None = None,
+                       level: float = CONFIDENCE_LEVEL) -> dict:
+    """
+    Средние и полуширины доверительных интервалов по наблюдениям run_observation
+
+    Возвращает {'systems': {система: {таблица: (среднее, полуширина)}},
+                'differences': {(система a, система b): {таблица: (среднее, полуширина)}}} - разности показателей
+    a - b (таблица 3 - только при одинаковом количестве приборов), которые благодаря общим случайным числам
+    оцениваются точнее, чем показатели по отдельности.
+    control_means - ожидания CONTROLS (get_control_means), None - без контрольных переменных;
+    показатели поправляются контрольными величинами CONTROL_TARGETS
+
+    """
+    controls = None if control_means is None else \
+        np.array([observation['controls'] for observation in observations]) - control_means
+    tables = {}
+    for system in systems:
+        tables[system] = {name: [observation[system][name] for observation in observations] for name in TABLES}
+        size = max(len(value) for value in tables[system]['frequencies'])
+        tables[system]['frequencies'] = [np.pad(value, (0, size - len(value)))
+                                         for value in tables[system]['frequencies']]
+    result = {system: {name: _target_interval(name, values, controls, level)
+                       for name, values in tables[system].items()}
+              for system in systems}
+    differences = {}
+    for i, a in enumerate(systems):
+        for b in systems[i + 1:]:
+            names = ('table_3', 'table_5') if a[1] == b[1] else ('table_5',)
+            differences[(a, b)] = {name: _target_interval(name, np.subtract(tables[a][name], tables[b][name]),
+                                                          controls, level)
+                                   for name in names}
+    return {'systems': result, 'differences': differences}
+
+
+def run_replications(type_systems=(1, 2, 3), num_observations: int = 10, num_events: int | None = None, seed=None,
+                     parameters=None, num_smo_values=None, engine: str = 'heap', processes: int | None = None,
+                     antithetic: bool = False, control_variates: bool = True,
+                     level: float = CONFIDENCE_LEVEL) -> dict:
+    """
+    Повторения моделирования с общими случайными числами, антитетическими парами и контрольными переменными
+
+    :param type_systems: типы систем
+    :param num_observations: количество наблюдений, с antithetic каждое - пара прогонов
+    :param num_smo_values: количества приборов (default - parameters.num_smo), моделируются все сочетания
+                           с type_systems
+    :param antithetic: наблюдение - пара антитетических прогонов
+    :param control_variates: поправлять показатели на контрольные величины CONTROLS
+    :return: как у merge_observations, системы - пары (тип системы, количество приборов)
+
+    Для контрольных переменных нужно больше наблюдений, чем len(CONTROLS) + 1, а чтобы квантиль Стьюдента
+    не расширял интервал, - хотя бы 20.
+
+    """
+    if parameters is None:
+        from constants import get_parameters
+        parameters = get_parameters()
+    if num_events is None:
+        from constants import NUM_EVENTS
+        num_events = NUM_EVENTS
+    systems = [(type_system, num_smo) for type_system in type_systems
+               for num_smo in (num_smo_values or (parameters.num_smo,))]
+    control_means = get_control_means(parameters) if control_variates else None
+
+    tasks = [(systems, parameters, num_events, seed_sequence, engine, antithetic, control_variates)
+             for seed_sequence in np.random.SeedSequence(seed).spawn(num_observations)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        observations = [_run_observation(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            chunksize = max(1, math.ceil(num_observations / (4 * processes)))
+            observations = list(executor.map(_run_observation, tasks, chunksize=chunksize))
+    return merge_observations(observations, systems, control_means, level)
@@ -1,33 +1,22 @@
 """
 В модуле находятся функции для заполнения word документа
 
+Таблицы заполняются целиком: значения переводятся в строки по столбцам, а строки таблицы
+добавляются копированием шаблона строки, без обхода ячеек через python-docx.
+
 """
-import numpy as np
+import re
+from copy import deepcopy
+from itertools import zip_longest
 
+from ColumnarTable import ColumnarTable
 from ListWrapper import ListWrapper
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.shared import Pt, Inches
 from docx.enum.table import WD_TABLE_ALIGNMENT
 
-from constants import NUM_FOR_ROUND
-
-
-def num_to_str(num: float | int, num_for_round=NUM_FOR_ROUND) -> str:
-    """
-
-    Преобразует число в строку округляя до NUM_FOR_ROUND знаков
-
-    Если число -0.1**num_for_round < num < 0.1**num_for_round то возвращает '0'
-
-    """
-
-    if isinstance(num, str):
-        return num
-    else:
-        eps = 0.1 ** num_for_round
-        if -eps < num < eps:
-            return '0'
-        else:
-            return str(np.round(num, num_for_round))
+from formatting import column_to_str, num_to_str, values_to_str
 
 
 def _set_col_widths(table, widths):
@@ -45,18 +34,84 @@ def set_size_fount(paragraph, size: int):
 
 
 def fill_table_for_report(document, data, widths):
-    """Создает таблицу в документе и заполняет ее."""
+    """
+
+    Создает таблицу в документе и заполняет ее.
+
+    data - ColumnarTable (читается по столбцам) или список строк с методом get_data_for_report.
+    Первая строка таблицы остается пустой
 
-    table = document.add_table(rows=len(data) + 1, cols=len(data[0]), style='Table Grid')
+    """
+
+    if isinstance(data, ColumnarTable):
+        num_cols = len(data.names)
+        columns = [column_to_str(data[name]) for name in data.names]
+    else:
+        num_cols = len(data[0])
+        columns = [values_to_str(list(column))
+                   for column in zip_longest(*(line.get_data_for_report() for line in data))]
+    table = document.add_table(rows=1, cols=num_cols, style='Table Grid')
     table.alignment = WD_TABLE_ALIGNMENT.CENTER
     _set_col_widths(table, widths)
-    for i, line in enumerate(data):
-        for j, num in enumerate(line.get_data_for_report()):
-            table.rows[i + 1].cells[j].text = num_to_str(num)
+    _append_rows(table, columns)
 
     return table
 
 
+_NAMESPACES = re.compile(r' xmlns:\w+="[^"]*"')
+_WHITESPACE = re.compile(r'\s')
+_SPECIAL_CHARS = re.compile(r'[\t\n\r]')
+_W_T = qn('w:t')
+_XML_SPACE = qn('xml:space')
+
+
+def _append_rows(table, columns: list[list[str | None]]):
+    """
+
+    Дописывает в таблицу строки со значениями columns
+
+    Каждая строка - копия шаблона строки (ячейки с шириной из первой строки таблицы и пустым текстом),
+    в которой меняется только текст. XML ячейки получается таким же, как после cell.text = text.
+    Ячейки, в тексте которых есть табуляция или перевод строки, заполняются через python-docx
+
+    """
+
+    first_row = table._tbl.tr_lst[0]
+    cell_props = [_NAMESPACES.sub('', tc.tcPr.xml) if tc.tcPr is not None else '' for tc in first_row.tc_lst]
+    cell_props += [''] * (len(columns) - len(cell_props))
+    cells = ''.join(f'<w:tc>{props}<w:p><w:r><w:t/></w:r></w:p></w:tc>' for props in cell_props)
+    template = parse_xml(f'<w:tbl {nsdecls("w")}><w:tr>{cells}</w:tr></w:tbl>')[0]
+    plain = [all(text and not _WHITESPACE.search(text) for text in column) for column in columns]
+
+    special = []
+    tbl = table._tbl
+    for i, line in enumerate(zip(*columns), 1):
+        tr = deepcopy(template)
+        for j, (t, text) in enumerate(zip(list(tr.iter(_W_T)), line)):
+            if plain[j]:
+                t.text = text
+            elif not _set_text(t, text):
+                special.append((i, j, text))
+        tbl.append(tr)
+    for i, j, text in special:
+        table.cell(i, j).text = text
+
+
+def _set_text(t, text: str | None) -> bool:
+    """Записывает text в элемент w:t шаблона, False - текст надо записать через python-docx"""
+    r = t.getparent()
+    if text is None or _SPECIAL_CHARS.search(text):
+        r.getparent().remove(r)
+        return text is None
+    if not text:
+        r.remove(t)
+        return True
+    if text != text.strip():
+        t.set(_XML_SPACE, 'preserve')
+    t.text = text
+    return True
+
+
 def list_to_list_wrapper(table):
     lst = []
     for el in table: